@@ -1,32 +1,44 @@
 import json
+import logging
 import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
 import dotenv
 
 # LLM imports
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+from agents.classifier_agent.stub_llm import StubLLM
+from core.cache.intent_cache import IntentCache
+from core.memory.redis_client import MemoryStore
+from core.observability.metrics import REGISTRY
+from core.schemas.registry import get_schema_registry, looks_like_json
+from core.text.intent_model import IntentModel
+from core.text.intent_scorer import IntentScore, IntentScorer
+from core.text.keyword_matcher import get_keyword_matcher
+from core.text.reducer import ContentReducer
+
 dotenv.load_dotenv()
 
-class ClassifierAgent:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
-        self.intent_labels = ["RFQ", "Complaint", "Invoice", "Regulation", "Fraud Risk"]
-        # For fallback rule-based detection
-        self.intent_examples = {
-            "RFQ": ["request for quote", "quotation", "quote needed", "rfq"],
-            "Complaint": ["not satisfied", "complaint", "issue", "problem", "bad experience", "unsatisfied"],
-            "Invoice": ["invoice", "bill", "amount due", "payment due", "billed"],
-            "Regulation": ["regulation", "compliance", "policy", "gdpr", "fda"],
-            "Fraud Risk": ["fraud", "suspicious", "unauthorized", "risk", "scam"]
-        }
+logger = logging.getLogger(__name__)
 
-    def generate_few_shot_prompt(self, content: str) -> str:
-        return f"""
-You are a business document classifier. Classify this document into one of:
-[RFQ, Complaint, Invoice, Regulation, Fraud Risk]
+# Local intent model, trained with `python -m agents.classifier_agent.train_intent_model`; the tier is
+# skipped when the file does not exist
+INTENT_MODEL_PATH = os.getenv(
+    "INTENT_MODEL_PATH", os.path.join(os.path.dirname(__file__), "..", "..", "models", "intent_model.npz")
+)
+# The model decides on its own at or above this probability
+INTENT_MODEL_THRESHOLD = float(os.getenv("INTENT_MODEL_THRESHOLD", "0.8"))
+
+# Bump whenever the prompts below change so cached intents are not reused
+PROMPT_VERSION = "few-shot-v1"
+BATCH_PROMPT_VERSION = "few-shot-multi-v1"
 
-Here are some examples:
+FEW_SHOT_EXAMPLES = """Here are some examples:
 
 Example 1:
 Content: "Please send me a quote for 100 units of product X."
@@ -47,13 +59,117 @@ Label: Regulation
 Example 5:
 Content: "We have detected unauthorized activity. This may be fraud."
 Label: Fraud Risk
+"""
 
+FEW_SHOT_TEMPLATE = """
+You are a business document classifier. Classify this document into one of:
+[RFQ, Complaint, Invoice, Regulation, Fraud Risk]
+
+""" + FEW_SHOT_EXAMPLES + """
 Now classify the following document. Respond with only the label.
 Content:
 {content}
 """
 
-    def detect_format(self, file_path, content):
+# Labelled by the tier that decided the intent: schema, rules, model, llm (including cache hits) or fallback
+INTENT_SECONDS = REGISTRY.histogram("classifier_intent_seconds", "Intent detection time by resolution path", ("path",))
+INTENT_DECISIONS = REGISTRY.counter(
+    "classifier_intent_decisions_total", "Intents by the cascade tier that decided them", ("tier",)
+)
+# Estimated tokens of each document going to the LLM, before ("original") and after ("sent") reduction
+CONTENT_TOKENS = REGISTRY.histogram(
+    "classifier_llm_content_tokens", "Estimated document tokens before and after reduction for the LLM", ("stage",),
+    buckets=(100, 250, 500, 1000, 1500, 2000, 4000, 8000, 16000, 32000, 64000, 128000, 512000, 2000000)
+)
+REDUCED_DOCUMENTS = REGISTRY.counter(
+    "classifier_llm_reduced_documents_total", "Documents shortened to the token budget before the LLM call"
+)
+
+_BATCH_ANSWER = re.compile(r"^\s*(\d+)\s*[:.)\-]\s*(.+?)\s*$", re.MULTILINE)
+
+class ClassifierAgent:
+    def __init__(self):
+        self.intent_labels = ["RFQ", "Complaint", "Invoice", "Regulation", "Fraud Risk"]
+        # Keyword rules (config/keyword_rules.json), weighted by config/intent_weights.json
+        self.keyword_matcher = get_keyword_matcher()
+        self.intent_examples = self.keyword_matcher.rule_sets["intent"]
+        self.intent_scorer = IntentScorer(matcher=self.keyword_matcher)
+        self.intent_model = self.load_intent_model(INTENT_MODEL_PATH)
+        self.intent_model_threshold = INTENT_MODEL_THRESHOLD
+        # Partner JSON schemas (config/json_schemas.json), shared with the JSON agent
+        self.schema_registry = get_schema_registry()
+        # CLASSIFIER_LLM=stub swaps Gemini for an offline, rule-based stand-in
+        if os.getenv("CLASSIFIER_LLM", "gemini") == "stub":
+            self.model_name = "stub"
+            self.llm = StubLLM(self.intent_examples)
+        else:
+            self.model_name = "gemini-2.0-flash"
+            self.llm = ChatGoogleGenerativeAI(model=self.model_name)
+        self.chain = ChatPromptTemplate.from_template(FEW_SHOT_TEMPLATE) | self.llm
+        self.intent_cache = IntentCache(conn=MemoryStore().conn)
+        # Bounds what each document contributes to a prompt (LLM_CONTENT_TOKEN_BUDGET)
+        self.content_reducer = ContentReducer(matcher=self.keyword_matcher)
+        # Decisions per tier, for the LLM-skip ratio
+        self.decisions: Counter = Counter()
+        self._decisions_lock = threading.Lock()
+
+    @staticmethod
+    def load_intent_model(path) -> Optional[IntentModel]:
+        if not os.path.exists(path):
+            return None
+        try:
+            return IntentModel.load(path)
+        except Exception as e:
+            logger.warning(f"Intent model {path} not loaded: {str(e)}")
+            return None
+
+    def reduce_for_llm(self, content: str) -> str:
+        """The document as sent to the LLM: within the token budget, without quoted replies and signatures."""
+        reduced = self.content_reducer.reduce(content)
+        CONTENT_TOKENS.observe(reduced.original_tokens, stage="original")
+        CONTENT_TOKENS.observe(reduced.tokens, stage="sent")
+        if reduced.reduced:
+            REDUCED_DOCUMENTS.inc()
+        return reduced.text
+
+    def generate_few_shot_prompt(self, content: str) -> str:
+        return FEW_SHOT_TEMPLATE.format(content=self.reduce_for_llm(content))
+
+    def generate_batch_prompt(self, contents) -> str:
+        documents = "\n".join(
+            f"<<<DOCUMENT {i}>>>\n{content}\n<<<END DOCUMENT {i}>>>"
+            for i, content in enumerate(contents, 1)
+        )
+        return f"""
+You are a business document classifier. Classify each document below into one of:
+[RFQ, Complaint, Invoice, Regulation, Fraud Risk]
+
+{FEW_SHOT_EXAMPLES}
+Now classify the following {len(contents)} documents. Respond with exactly one line per
+document in the form "<document number>: <label>" and nothing else.
+
+{documents}
+"""
+
+    def parse_label(self, text):
+        for label in self.intent_labels:
+            if label.lower() in text.lower():
+                return label
+        return None
+
+    def parse_batch_labels(self, text, count):
+        labels = [None] * count
+        for number, answer in _BATCH_ANSWER.findall(text):
+            index = int(number) - 1
+            if 0 <= index < count:
+                labels[index] = self.parse_label(answer)
+        return labels
+
+    def analyze_json(self, content):
+        """Parses and schema-matches JSON-looking content once; None for anything else."""
+        return self.schema_registry.analyze(content) if looks_like_json(content) else None
+
+    def detect_format(self, file_path, content, analysis=None):
         ext = os.path.splitext(file_path)[1].lower()
         if ext == ".json":
             return "JSON"
@@ -61,50 +177,114 @@ Content:
             return "Email"
         elif ext == ".pdf":
             return "PDF"
-        try:
-            json.loads(content)
+        analysis = analysis or self.analyze_json(content)
+        if analysis is not None and analysis.valid_json:
             return "JSON"
-        except Exception:
-            pass
         if "From:" in content and "Subject:" in content:
             return "Email"
         return "Unknown"
 
-    def detect_intent(self, content):
-        # --- 1. Schema Matching for JSON ---
-        try:
-            data = json.loads(content)
-            # Invoice schema
-            if all(key in data for key in ["order_id", "customer", "amount"]):
-                return "Invoice"
-            # RFQ schema
-            if all(key in data for key in ["rfq_id", "customer", "items"]):
-                return "RFQ"
-            # Add more schemas as needed
-        except Exception:
-            pass
+    def match_schema(self, content, analysis=None):
+        analysis = analysis or self.analyze_json(content)
+        return analysis.intent if analysis is not None else None
+
+    def intent_cache_key(self, content, prompt_version=PROMPT_VERSION):
+        return self.intent_cache.make_key(content, self.model_name, prompt_version)
 
-        # --- 2. LLM with Few-Shot Prompt ---
-        prompt_str = self.generate_few_shot_prompt(content)
-        prompt = ChatPromptTemplate.from_template(prompt_str)
-        chain = prompt | self.llm
+    def llm_intent(self, content):
+        cache_key = self.intent_cache_key(content)
+        cached = self.intent_cache.get(cache_key)
+        if cached:
+            return cached
         try:
-            result = chain.invoke({"content": content}).content.strip()
-            for label in self.intent_labels:
-                if label.lower() in result.lower():
-                    return label
+            label = self.parse_label(self.chain.invoke({"content": self.reduce_for_llm(content)}).content.strip())
         except Exception:
-            pass
-
-        # --- 3. Fallback: Rule-based intent detection ---
-        content_lower = content.lower()
-        for intent, keywords in self.intent_examples.items():
-            for kw in keywords:
-                if kw in content_lower:
-                    return intent
-        return "Unknown"
+            return None
+        if label:
+            self.intent_cache.set(cache_key, label)
+        return label
+
+    def fallback_intent(self, content, score: Optional[IntentScore] = None):
+        score = score or self.intent_scorer.score(content)
+        return score.label or "Unknown"
+
+    # --- Cascade tiers, shared with IntentBatchScheduler ---
+    @staticmethod
+    def decision(intent, tier, reason, confidence=None) -> Dict:
+        return {"intent": intent, "tier": tier, "reason": reason, "confidence": confidence}
 
-    def classify(self, file_path, content):
-        fmt = self.detect_format(file_path, content)
-        intent = self.detect_intent(content)
-        return {"format": fmt, "intent": intent}
+    def schema_decision(self, content, analysis=None) -> Optional[Dict]:
+        analysis = analysis or self.analyze_json(content)
+        if analysis is None or not analysis.intent:
+            return None
+        return self.decision(analysis.intent, "schema", f"matched JSON schema {analysis.schema.name}", 1.0)
+
+    def rule_decision(self, score: IntentScore) -> Optional[Dict]:
+        if not score.decisive:
+            return None
+        return self.decision(score.label, "rules", score.reason, score.confidence)
+
+    def model_decision(self, content) -> Optional[Dict]:
+        if self.intent_model is None:
+            return None
+        label, probability = self.intent_model.predict(content)
+        if probability < self.intent_model_threshold:
+            return None
+        reason = f"{self.intent_model.name} probability {probability:.2f} >= {self.intent_model_threshold:.2f}"
+        return self.decision(label, "model", reason, round(probability, 4))
+
+    def llm_decision(self, label, score: IntentScore) -> Dict:
+        """The LLM's label, or the best rule label when it gave none."""
+        if label:
+            return self.decision(label, "llm", f"rules inconclusive: {score.reason}")
+        return self.decision(
+            self.fallback_intent("", score), "fallback", f"no LLM label, rules: {score.reason}", score.confidence
+        )
+
+    def record_decision(self, decision: Dict, start: float):
+        INTENT_SECONDS.observe(time.perf_counter() - start, path=decision["tier"])
+        INTENT_DECISIONS.inc(tier=decision["tier"])
+        with self._decisions_lock:
+            self.decisions[decision["tier"]] += 1
+
+    def decide_intent(self, content, analysis=None) -> Dict:
+        start = time.perf_counter()
+        # --- 1. Schema Matching for JSON ---
+        decision = self.schema_decision(content, analysis)
+
+        # --- 2. Weighted keyword rules, when confident and unambiguous ---
+        if decision is None:
+            score = self.intent_scorer.score(content)
+            decision = self.rule_decision(score)
+
+        # --- 3. Local intent model, when confident ---
+        if decision is None:
+            decision = self.model_decision(content)
+
+        # --- 4. LLM with Few-Shot Prompt (skipped on a cache hit), else the best rule label ---
+        if decision is None:
+            decision = self.llm_decision(self.llm_intent(content), score)
+
+        self.record_decision(decision, start)
+        return decision
+
+    def detect_intent(self, content, analysis=None):
+        return self.decide_intent(content, analysis)["intent"]
+
+    def classify(self, file_path, content, analysis=None):
+        analysis = analysis or self.analyze_json(content)
+        fmt = self.detect_format(file_path, content, analysis)
+        decision = self.decide_intent(content, analysis)
+        return {"format": fmt, "intent": decision.pop("intent"), "decision": decision}
+
+    def cascade_stats(self) -> Dict[str, float]:
+        """Decisions per tier; llm_skip_ratio is the share decided without asking the LLM (schema, rules or model)."""
+        with self._decisions_lock:
+            decisions = dict(self.decisions)
+        total = sum(decisions.values())
+        skipped = decisions.get("schema", 0) + decisions.get("rules", 0) + decisions.get("model", 0)
+        stats = {
+            f"{tier}_decisions": decisions.get(tier, 0) for tier in ("schema", "rules", "model", "llm", "fallback")
+        }
+        stats["llm_skip_ratio"] = skipped / total if total else 0.0
+        return stats
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from agents.classifier_agent.classifier import BATCH_PROMPT_VERSION, PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+class IntentBatchScheduler:
+    """
+    Sits in front of ClassifierAgent and coalesces concurrent LLM intent
+    requests. Requests are gathered for up to `max_wait_ms` or `max_batch`
+    documents and sent as one LLM call, either a single multi-document prompt
+    (mode "multi", one request against the provider quota per batch) or a
+    `chain.abatch` fan-out (mode "abatch"). Each caller gets its own label back.
+    Up to `max_in_flight` batches are sent concurrently, all drawing on the
+    same token bucket, so collecting the next batch never waits on the LLM.
+
+    Schema matches and intent-cache hits never reach the queue, and documents
+    the LLM could not label fall back to the classifier's keyword rules.
+    """
+
+    def __init__(self, classifier, executor, max_batch: Optional[int] = None, max_wait_ms: Optional[float] = None,
+                 mode: Optional[str] = None, rate_limiter: Optional[TokenBucket] = None,
+                 max_in_flight: Optional[int] = None):
+        self.classifier = classifier
+        self.executor = executor
+        self.max_batch = max_batch or int(os.getenv("CLASSIFIER_BATCH_SIZE", "16"))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv("CLASSIFIER_BATCH_WAIT_MS", "5"))) / 1000
+        self.mode = mode or os.getenv("CLASSIFIER_BATCH_MODE", "multi")
+        self.prompt_version = BATCH_PROMPT_VERSION if self.mode == "multi" else PROMPT_VERSION
+        self.rate_limiter = rate_limiter or TokenBucket(float(os.getenv("LLM_RATE_LIMIT_RPS", "10")))
+        self.max_in_flight = max_in_flight or int(os.getenv("CLASSIFIER_MAX_INFLIGHT_BATCHES", "8"))
+        self.batches = 0
+        self.batched_documents = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._worker = asyncio.create_task(self._run())
+
+    async def _collect(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Fills `batch` in place, so requests already taken off the queue are known if the worker is cancelled."""
+        batch.append(await self._queue.get())
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _call_llm(self, contents: List[str]) -> List[Optional[str]]:
+        await self.rate_limiter.acquire()
+        if self.mode == "multi" and len(contents) > 1:
+            prompt = self.classifier.generate_batch_prompt(contents)
+            response = await self.classifier.llm.ainvoke(prompt)
+            return self.classifier.parse_batch_labels(response.content, len(contents))
+        responses = await self.classifier.chain.abatch(
+            [{"content": content} for content in contents], return_exceptions=True
+        )
+        return [
+            None if isinstance(response, Exception) else self.classifier.parse_label(response.content.strip())
+            for response in responses
+        ]
+
+    async def _run(self):
+        batch: List[Tuple[str, asyncio.Future]] = []
+        try:
+            while True:
+                batch = []
+                await self._collect(batch)
+                await self._slots.acquire()
+                task = asyncio.create_task(self._send(batch))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+        except asyncio.CancelledError:
+            self._cancel(future for _, future in batch)
+            raise
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Identical documents in one batch are only sent once
+        waiters: Dict[str, List[asyncio.Future]] = {}
+        for content, future in batch:
+            waiters.setdefault(content, []).append(future)
+        contents = list(waiters)
+        try:
+            try:
+                labels = await self._call_llm(contents)
+            except Exception as e:
+                logger.error(f"Batched intent detection failed: {str(e)}")
+                labels = [None] * len(contents)
+            self.batches += 1
+            self.batched_documents += len(contents)
+            for content, label in zip(contents, labels):
+                for future in waiters[content]:
+                    if not future.done():
+                        future.set_result(label)
+        finally:
+            self._slots.release()
+            self._cancel(future for _, future in batch)
+
+    @staticmethod
+    def _cancel(futures: Iterable[asyncio.Future]):
+        for future in futures:
+            if not future.done():
+                future.cancel()
+
+    async def llm_intent(self, content: str) -> Optional[str]:
+        cache_key = self.classifier.intent_cache_key(content, self.prompt_version)
+        cached = await self.executor.run("classify", self.classifier.intent_cache.get, cache_key)
+        if cached:
+            return cached
+
+        # Reduced before queueing, so a batch prompt is bounded by batch size x token budget
+        reduced = await self.executor.run("classify", self.classifier.reduce_for_llm, content)
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((reduced, future))
+        label = await future
+        if label:
+            await self.executor.run("classify", self.classifier.intent_cache.set, cache_key, label)
+        return label
+
+    async def decide_intent(self, content: str, analysis=None) -> Dict:
+        start = time.perf_counter()
+        # --- 1. Schema Matching for JSON ---
+        decision = await self.executor.run("classify", self.classifier.schema_decision, content, analysis)
+
+        # --- 2. Weighted keyword rules, when confident and unambiguous ---
+        if decision is None:
+            score = await self.executor.run("classify", self.classifier.intent_scorer.score, content)
+            decision = self.classifier.rule_decision(score)
+
+        # --- 3. Local intent model, when confident ---
+        if decision is None:
+            decision = await self.executor.run("classify", self.classifier.model_decision, content)
+
+        # --- 4. Batched LLM call, else the best rule label ---
+        if decision is None:
+            decision = self.classifier.llm_decision(await self.llm_intent(content), score)
+
+        self.classifier.record_decision(decision, start)
+        return decision
+
+    async def detect_intent(self, content: str, analysis=None) -> str:
+        return (await self.decide_intent(content, analysis))["intent"]
+
+    async def classify(self, file_path: str, content: str, analysis=None) -> Dict:
+        if analysis is None:
+            analysis = await self.executor.run("classify", self.classifier.analyze_json, content)
+        fmt = await self.executor.run("classify", self.classifier.detect_format, file_path, content, analysis)
+        decision = await self.decide_intent(content, analysis)
+        return {"format": fmt, "intent": decision.pop("intent"), "decision": decision}
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "documents": self.batched_documents,
+            "avg_batch_size": self.batched_documents / self.batches if self.batches else 0.0,
+        }
+
+    async def aclose(self):
+        """Stops the worker; queued and in-flight requests are cancelled rather than left waiting."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        for task in list(self._in_flight):
+            task.cancel()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            self._cancel([self._queue.get_nowait()[1]])
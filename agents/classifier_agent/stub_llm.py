@@ -0,0 +1,49 @@
+import asyncio
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableConfig
+
+_DOCUMENT = re.compile(r"<<<DOCUMENT (\d+)>>>\n(.*?)\n<<<END DOCUMENT \1>>>", re.DOTALL)
+
+
+class StubLLM(Runnable):
+    """
+    Offline stand-in for the Gemini chat model, used for tests, benchmarks and
+    local development (CLASSIFIER_LLM=stub). Labels documents with keyword
+    rules, understands both the single and the multi-document prompt, and can
+    simulate provider latency.
+    """
+
+    def __init__(self, rules: Dict[str, List[str]], latency: float = 0.0):
+        self.rules = rules
+        self.latency = latency
+        self.calls = 0
+
+    def _label(self, content: str) -> str:
+        content_lower = content.lower()
+        for label, keywords in self.rules.items():
+            if any(kw in content_lower for kw in keywords):
+                return label
+        return "Unknown"
+
+    def _respond(self, input: Any) -> AIMessage:
+        self.calls += 1
+        text = input.to_string() if isinstance(input, PromptValue) else str(input)
+        documents = _DOCUMENT.findall(text)
+        if documents:
+            return AIMessage(content="\n".join(f"{n}: {self._label(doc)}" for n, doc in documents))
+        return AIMessage(content=self._label(text.rsplit("Content:", 1)[-1]))
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AIMessage:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(input)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AIMessage:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(input)
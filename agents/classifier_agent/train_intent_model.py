@@ -0,0 +1,167 @@
+"""
+Trains and evaluates the local intent model served by ClassifierAgent.
+
+    python -m agents.classifier_agent.train_intent_model train --traces --dir samples
+    python -m agents.classifier_agent.train_intent_model evaluate --traces
+
+Labelled documents come from the Redis `trace:*` hashes (the text the
+agents logged plus `metadata.classification.intent`) and/or document
+directories: labels from a manifest.json (as written by benchmarks.corpus)
+when present, otherwise from the LLM. Only trace labels decided by the LLM
+are used (traces from before tiered decisions count as LLM); labels from the
+schema, the rules, the intent model itself or the rules fallback are left
+out. A deterministic share of documents is held out; training
+prints the evaluation report on it and stores it in the model file.
+Running `train` again refreshes the model in place.
+"""
+import argparse
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from agents.classifier_agent.classifier import INTENT_MODEL_PATH, INTENT_MODEL_THRESHOLD, ClassifierAgent
+from agents.pdf_agent.extraction import PDFTextExtractor
+from core.memory.redis_client import MemoryStore, _parse_trace
+from core.text.intent_model import IntentModel, evaluate, train
+
+# (id, text, label, label source)
+Example = Tuple[str, str, str, str]
+
+
+def trace_text(trace: Dict[str, Any]) -> Optional[str]:
+    """The document text an agent logged in its trace: email subject and body, PDF text or JSON data."""
+    email = trace.get("email_agent_fields")
+    if isinstance(email, dict) and email.get("body"):
+        return f"Subject: {email.get('subject', '')}\n\n{email['body']}"
+    pdf = trace.get("pdf_agent_fields")
+    if isinstance(pdf, dict) and pdf.get("text"):
+        return pdf["text"]
+    metadata = trace.get("metadata")
+    if isinstance(metadata, dict) and metadata.get("data") is not None:
+        return json.dumps(metadata["data"])
+    return None
+
+
+def trace_examples(conn, batch_size: int = 500) -> Iterator[Example]:
+    """Labelled documents from the `trace:*` hashes, read with one pipelined round trip per batch."""
+    keys = conn.scan_iter(match="trace:*", count=batch_size)
+    while True:
+        batch = [key for _, key in zip(range(batch_size), keys)]
+        if not batch:
+            return
+        pipe = conn.pipeline(transaction=False)
+        for key in batch:
+            pipe.hgetall(key)
+        for key, data in zip(batch, pipe.execute()):
+            trace = _parse_trace(data) or {}
+            metadata = trace.get("metadata")
+            classification = metadata.get("classification") if isinstance(metadata, dict) else None
+            if not isinstance(classification, dict):
+                continue
+            intent = classification.get("intent")
+            tier = (classification.get("decision") or {}).get("tier", "llm")
+            text = trace_text(trace)
+            if text and intent and intent != "Unknown" and tier == "llm":
+                yield (key.decode("utf-8") if isinstance(key, bytes) else key), text, intent, tier
+
+
+def read_document(path: str) -> str:
+    if path.lower().endswith(".pdf"):
+        try:
+            return "".join(PDFTextExtractor().iter_pages(path))
+        except Exception:
+            return ""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+def directory_examples(root: str, classifier: Optional[ClassifierAgent] = None) -> Iterator[Example]:
+    """Labelled documents under `root`: manifest.json labels when present, otherwise the LLM's."""
+    manifest_path = os.path.join(root, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            for entry in json.load(f):
+                text = read_document(os.path.join(root, entry["filename"]))
+                if text:
+                    yield entry["filename"], text, entry["intent"], "manifest"
+        return
+    classifier = classifier or ClassifierAgent()
+    for directory, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            text = read_document(path)
+            label = classifier.llm_intent(text) if text else None
+            if label:
+                yield os.path.relpath(path, root), text, label, "llm"
+
+
+def is_held_out(example_id: str, holdout: float) -> bool:
+    """Deterministic split, so refreshing the model keeps evaluating on the same documents."""
+    return zlib.crc32(example_id.encode("utf-8")) % 1000 < holdout * 1000
+
+
+def load_examples(args) -> List[Example]:
+    examples: List[Example] = []
+    if args.traces:
+        examples += trace_examples(MemoryStore().conn)
+    classifier = None
+    for root in args.dir or []:
+        if not os.path.exists(os.path.join(root, "manifest.json")):
+            classifier = classifier or ClassifierAgent()
+        examples += directory_examples(root, classifier)
+    return examples
+
+
+def report_summary(report: Dict[str, Any]) -> str:
+    lines = [
+        f"{report['model']}: {report['documents']} documents, accuracy {report['accuracy']:.3f}",
+        f"  at p >= {report['threshold']:.2f}: coverage {report['coverage']:.3f}, "
+        f"accuracy {report['accuracy_at_threshold']:.3f}; {report['mean_predict_us']:.0f} us per document",
+    ]
+    for label, scores in report["labels"].items():
+        lines.append(f"  {label:<12} precision {scores['precision']:.3f} recall {scores['recall']:.3f} "
+                     f"f1 {scores['f1']:.3f} ({scores['support']})")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the local intent model")
+    parser.add_argument("command", choices=("train", "evaluate"))
+    parser.add_argument("--traces", action="store_true", help="Use the labelled trace:* hashes in Redis")
+    parser.add_argument("--dir", action="append", help="Document directory (repeatable), e.g. samples")
+    parser.add_argument("--model", default=INTENT_MODEL_PATH)
+    parser.add_argument("--holdout", type=float, default=0.2,
+                        help="Share of documents held out for evaluation (evaluate --holdout 1 scores all)")
+    parser.add_argument("--threshold", type=float, default=INTENT_MODEL_THRESHOLD)
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--report", help="Also write the evaluation report as JSON to this path")
+    args = parser.parse_args()
+    if not args.traces and not args.dir:
+        parser.error("give --traces and/or --dir")
+
+    examples = load_examples(args)
+    held_out = [e for e in examples if is_held_out(e[0], args.holdout)]
+    if args.command == "train":
+        training = [e for e in examples if not is_held_out(e[0], args.holdout)]
+        if len({label for _, _, label, _ in training}) < 2:
+            raise SystemExit(f"Need documents of at least two intents, got {len(training)} documents")
+        model = train([text for _, text, _, _ in training], [label for _, _, label, _ in training],
+                      epochs=args.epochs)
+    else:
+        model = IntentModel.load(args.model)
+
+    report = evaluate(model, [text for _, text, _, _ in held_out], [label for _, _, label, _ in held_out],
+                      args.threshold, [source for _, _, _, source in held_out])
+    if args.command == "train":
+        model.metadata["evaluation"] = report
+        model.save(args.model)
+        print(f"Trained on {len(examples) - len(held_out)} documents, saved to {args.model}")
+    print(report_summary(report))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
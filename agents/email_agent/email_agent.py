@@ -1,18 +1,17 @@
 import re
 import os
 from core.memory.redis_client import MemoryStore
+from core.text.keyword_matcher import get_keyword_matcher
 
 class EmailAgent:
     def __init__(self):
-        self.urgent_keywords = ["urgent", "immediately", "asap", "important", "high priority"]
-        self.tone_keywords = {
-            "escalation": ["not acceptable", "unhappy", "angry", "frustrated", "escalate"],
-            "polite": ["please", "kindly", "would you", "thank you"],
-            "threatening": ["legal action", "lawsuit", "report", "compensation"],
-        }
+        # Keyword tables live in config/keyword_rules.json
+        self.keyword_matcher = get_keyword_matcher()
+        self.urgent_keywords = self.keyword_matcher.rule_sets["urgency"]["high"]
+        self.tone_keywords = self.keyword_matcher.rule_sets["tone"]
         self.memory_store = MemoryStore()
 
-    def extract_fields(self, content):
+    def extract_fields(self, content, matches=None):
         sender = re.search(r"From:\s*(.*)", content)
         subject = re.search(r"Subject:\s*(.*)", content)
         body = content.split("\n\n", 1)[-1] if "\n\n" in content else content
@@ -20,7 +19,8 @@ class EmailAgent:
         sender = sender.group(1).strip() if sender else "Unknown"
         subject = subject.group(1).strip() if subject else "No Subject"
 
-        urgency = any(word in content.lower() for word in self.urgent_keywords)
+        matches = matches or self.keyword_matcher.scan(content)
+        urgency = matches.has("urgency", "high")
         issue = subject if subject != "No Subject" else body[:50]
 
         return {
@@ -31,50 +31,47 @@ class EmailAgent:
             "body": body
         }
 
-    def detect_tone(self, content):
-        content_lower = content.lower()
-        for tone, keywords in self.tone_keywords.items():
-            for kw in keywords:
-                if kw in content_lower:
-                    return tone
-        return "neutral"
+    def detect_tone(self, content, matches=None):
+        matches = matches or self.keyword_matcher.scan(content)
+        return matches.first("tone", "neutral")
 
-    def process(self, file_path, content, classification):
-        # Generate source_id from file name
-        source_id = os.path.splitext(os.path.basename(file_path))[0]
+    def process(self, file_path, content, classification, source_id=None):
+        # Traces are keyed by the document's digest when the pipeline passes it, else by file name
+        source_id = source_id or os.path.splitext(os.path.basename(file_path))[0]
 
-        # Log metadata
-        self.memory_store.log_metadata(
-            source_id,
-            {
+        # All trace fields are written to Redis in one round trip when the block exits
+        with self.memory_store.trace(source_id) as trace:
+            # Log metadata
+            trace.log_metadata({
                 "source": "email",
                 "filename": file_path,
                 "classification": classification
-            }
-        )
+            })
 
-        # Extract fields and log
-        fields = self.extract_fields(content)
-        self.memory_store.log_agent_fields(source_id, "email_agent", fields)
+            # One keyword scan serves both urgency and tone detection
+            matches = self.keyword_matcher.scan(content)
 
-        # Detect tone and determine action
-        tone = self.detect_tone(content)
-        fields["tone"] = tone
-        if tone in ["escalation", "threatening"] or fields["urgency"] == "high":
-            action = "escalate"
-        else:
-            action = "routine"
+            # Extract fields and log
+            fields = self.extract_fields(content, matches)
+            trace.log_agent_fields("email_agent", fields)
 
-        # Log action
-        self.memory_store.log_action(source_id, action)
-        fields["action"] = action
+            # Detect tone and determine action
+            tone = self.detect_tone(content, matches)
+            fields["tone"] = tone
+            if tone in ["escalation", "threatening"] or fields["urgency"] == "high":
+                action = "escalate"
+            else:
+                action = "routine"
 
-        # Log decision trace (for demonstration, a simple dict)
-        trace = {
-            "step": "email_processed",
-            "fields": fields,
-            "action": action
-        }
-        self.memory_store.log_decision_trace(source_id, trace)
+            # Log action
+            trace.log_action(action)
+            fields["action"] = action
+
+            # Log decision trace (for demonstration, a simple dict)
+            trace.log_decision_trace({
+                "step": "email_processed",
+                "fields": fields,
+                "action": action
+            })
 
         return fields
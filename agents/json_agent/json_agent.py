@@ -1,15 +1,21 @@
-import json
 from core.memory.redis_client import MemoryStore
+from core.schemas.registry import get_schema_registry
 
 class JSONAgent:
     def __init__(self):
         self.memory_store = MemoryStore()
+        # Partner JSON schemas (config/json_schemas.json), compiled once per process
+        self.schema_registry = get_schema_registry()
 
-    def process(self, file_path, content, classification):
-        source_id = file_path.split('.')[0]
-        try:
-            data = json.loads(content)
-        except Exception:
+    def process(self, file_path, content, classification, analysis=None, source_id=None):
+        """
+        Validates a JSON document against the matching registry schema. Pass the
+        classifier's `analysis` to reuse its parse and schema match, and the
+        pipeline's `source_id` (the document digest) to key its trace.
+        """
+        source_id = source_id or file_path.split('.')[0]
+        analysis = analysis or self.schema_registry.analyze(content)
+        if not analysis.valid_json:
             self.memory_store.log_metadata(
                 source_id,
                 {
@@ -24,51 +30,31 @@ class JSONAgent:
                 "anomalies": ["Invalid JSON"]
             }
 
-        anomalies = []
-        detected_type = None
+        # Every violation of the matched schema, as "<json path>: <problem>"
+        data = analysis.data
+        detected_type = analysis.schema.name if analysis.schema else None
+        anomalies = list(analysis.anomalies)
 
-        # --- Invoice Schema ---
-        invoice_required = {"order_id", "customer", "amount"}
-        if invoice_required.issubset(data.keys()):
-            detected_type = "Invoice"
-            if not isinstance(data.get("order_id"), int):
-                anomalies.append("order_id should be int")
-            if not isinstance(data.get("amount"), (int, float)):
-                anomalies.append("amount should be a number")
-
-        # --- RFQ Schema ---
-        rfq_required = {"rfq_id", "customer", "items"}
-        if rfq_required.issubset(data.keys()):
-            detected_type = "RFQ"
-            if not isinstance(data.get("rfq_id"), int):
-                anomalies.append("rfq_id should be int")
-            if not isinstance(data.get("items"), list):
-                anomalies.append("items should be a list")
-
-        # If no schema matched
-        if not detected_type:
-            anomalies.append("Unknown JSON schema")
-            # Log alert in Redis
-            self.memory_store.log_metadata(
-                source_id,
-                {
+        # Both writes go out in one round trip when the block exits
+        with self.memory_store.trace(source_id) as trace:
+            # If no schema matched
+            if not detected_type:
+                anomalies.append("Unknown JSON schema")
+                # Log alert in Redis
+                trace.log_metadata({
                     "alert": "Unknown JSON schema",
                     "classification": classification,
                     "data": data
-                }
-            )
+                })
 
-        # Log extracted fields and anomalies
-        self.memory_store.log_metadata(
-            source_id,
-            {
+            # Log extracted fields and anomalies
+            trace.log_metadata({
                 "json_agent_fields": {
                     "type": detected_type,
                     "data": data,
                     "anomalies": anomalies
                 }
-            }
-        )
+            })
 
         return {
             "valid": len(anomalies) == 0,
@@ -0,0 +1,170 @@
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from typing import Iterator, List, Optional
+
+from PyPDF2 import PdfReader
+
+from core.pipeline.spool import UPLOAD_SPOOL_DIR
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # Workers are spawned, not forked: forking the multithreaded server process can copy held locks
+        _process_pool = ProcessPoolExecutor(
+            max_workers=int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 2))),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def shutdown_process_pool():
+    """Stops the page extraction workers, if they were started; queued chunks are cancelled."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
+
+
+@contextmanager
+def open_pdf(source):
+    """
+    Yields a seekable stream over a PDF without copying it into memory: paths
+    and real files are memory-mapped, other file objects (e.g. an in-memory
+    upload) are used as they are. Yields None when the data is not a PDF.
+    Only a PDF missing its %%EOF marker is copied, to append the marker.
+    """
+    owned = None
+    if isinstance(source, (str, os.PathLike)):
+        owned = source = open(source, "rb")
+    view = None
+    try:
+        try:
+            view = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+            stream = view
+        except (AttributeError, OSError, ValueError):
+            # No usable file descriptor (BytesIO, empty file, ...)
+            stream = source
+
+        stream.seek(0)
+        if stream.read(5) != b"%PDF-":
+            yield None
+            return
+
+        # Fix missing EOF marker
+        if view is not None:
+            has_eof = view.rfind(b"%%EOF") != -1
+        else:
+            stream.seek(max(0, _stream_size(stream) - 2048))
+            has_eof = b"%%EOF" in stream.read()
+        if not has_eof:
+            stream.seek(0)
+            stream = BytesIO(stream.read() + b"\n%%EOF\n")
+        stream.seek(0)
+        yield stream
+    finally:
+        if view is not None:
+            view.close()
+        if owned is not None:
+            owned.close()
+
+
+def _stream_size(stream) -> int:
+    stream.seek(0, os.SEEK_END)
+    return stream.tell()
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[str]:
+    # Runs in a worker process: each worker maps the file and parses its own pages
+    with open_pdf(path) as stream:
+        reader = PdfReader(stream, strict=False)
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+class PDFTextExtractor:
+    """
+    Page-level PDF text extraction.
+
+    `iter_pages` is a generator yielding each page's text as it is extracted,
+    so callers can stop early. Documents with at least `parallel_min_pages`
+    pages are split into page ranges and extracted across a process pool;
+    the workers open the PDF by path, so one given as a file object (an
+    upload used in place, in-memory bytes) is first spooled to a temp file.
+    `max_pages` and `max_bytes` (characters of extracted text) bound the work
+    done per document.
+    """
+
+    def __init__(self, max_pages: Optional[int] = None, max_bytes: Optional[int] = None,
+                 parallel_min_pages: Optional[int] = None, chunk_pages: Optional[int] = None):
+        self.max_pages = max_pages or int(os.getenv("PDF_MAX_PAGES", "0")) or None
+        self.max_bytes = max_bytes or int(os.getenv("PDF_MAX_BYTES", "0")) or None
+        self.parallel_min_pages = parallel_min_pages or int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+        self.chunk_pages = chunk_pages or int(os.getenv("PDF_CHUNK_PAGES", "8"))
+
+    def _iter_raw_pages(self, source) -> Iterator[str]:
+        with open_pdf(source) as stream:
+            if stream is None:
+                return
+            reader = PdfReader(stream, strict=False)
+            page_count = len(reader.pages)
+            if self.max_pages:
+                page_count = min(page_count, self.max_pages)
+
+            if page_count >= self.parallel_min_pages:
+                if isinstance(source, (str, os.PathLike)):
+                    yield from self._iter_parallel(os.fspath(source), page_count)
+                    return
+                path = self._spool(stream)
+                try:
+                    yield from self._iter_parallel(path, page_count)
+                finally:
+                    os.remove(path)
+                return
+
+            for i in range(page_count):
+                yield reader.pages[i].extract_text() or ""
+
+    @staticmethod
+    def _spool(stream) -> str:
+        fd, path = tempfile.mkstemp(prefix="pdf_", suffix=".pdf", dir=UPLOAD_SPOOL_DIR)
+        with os.fdopen(fd, "wb") as f:
+            stream.seek(0)
+            shutil.copyfileobj(stream, f)
+        return path
+
+    def _iter_parallel(self, path: str, page_count: int) -> Iterator[str]:
+        pool = _get_process_pool()
+        futures = [
+            pool.submit(_extract_page_range, path, start, min(start + self.chunk_pages, page_count))
+            for start in range(0, page_count, self.chunk_pages)
+        ]
+        try:
+            # Chunks finish in any order but pages are yielded in document order
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def iter_pages(self, source) -> Iterator[str]:
+        """Yields page texts from a path or binary file object, honouring the page and size budgets."""
+        remaining = self.max_bytes
+        for page_text in self._iter_raw_pages(source):
+            if remaining is not None:
+                page_text = page_text[:remaining]
+                remaining -= len(page_text)
+            if page_text:
+                yield page_text
+            if remaining is not None and remaining <= 0:
+                return
+
+    def extract(self, source) -> str:
+        return "".join(self.iter_pages(source))
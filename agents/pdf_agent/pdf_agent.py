@@ -1,46 +1,96 @@
 import re
 import os
-from PyPDF2 import PdfReader
+from agents.pdf_agent.extraction import PDFTextExtractor
+from core.cache.extraction_cache import ExtractionCache, file_digest
 from core.memory.redis_client import MemoryStore
-from io import BytesIO
+from core.text.keyword_matcher import get_keyword_matcher
 
 class PDFAgent:
     def __init__(self):
-        self.compliance_keywords = ["GDPR", "FDA", "HIPAA", "PCI"]
+        # Keyword tables live in config/keyword_rules.json
+        self.keyword_matcher = get_keyword_matcher()
+        self.compliance_keywords = list(self.keyword_matcher.rule_sets["compliance"])
         self.memory_store = MemoryStore()
+        self.extractor = PDFTextExtractor()
+        # Stop reading pages once the invoice total and a compliance keyword were seen
+        self.early_exit = os.getenv("PDF_EARLY_EXIT", "false").lower() == "true"
+        # Keywords that must all be seen before stopping early; empty means any one compliance keyword
+        self.early_exit_keywords = {
+            keyword.strip() for keyword in os.getenv("PDF_EARLY_EXIT_KEYWORDS", "").split(",") if keyword.strip()
+        }
+        # Cached entries are only reused when produced with the same budgets and keywords
+        self.cache_signature = (
+            f"{self.extractor.max_pages}:{self.extractor.max_bytes}:{self.early_exit}:"
+            f"{','.join(sorted(self.early_exit_keywords))}:{','.join(self.compliance_keywords)}"
+        )
+        share_cache = os.getenv("PDF_CACHE_REDIS", "false").lower() == "true"
+        self.extraction_cache = ExtractionCache(conn=self.memory_store.conn if share_cache else None)
+
+    def iter_pages(self, file_path):
+        """
+        Lazily yields the text of each page of a PDF path or binary file object,
+        within the extractor's page and size budgets.
+        """
+        return self.extractor.iter_pages(file_path)
+
+    def extract_pages(self, file_path, until_complete=False):
+        """
+        Extracts the text of each page. With until_complete, stops at the first
+        page after which the invoice total and a compliance keyword (or all of
+        early_exit_keywords, when set) have been found. Returns an empty list
+        if extraction fails.
+        """
+        pages = []
+        total_found = False
+        mentions = set()
+        try:
+            for page_text in self.iter_pages(file_path):
+                pages.append(page_text)
+                if until_complete:
+                    total_found = total_found or self.extract_invoice_total(page_text) is not None
+                    mentions.update(self.extract_policy_mentions(page_text))
+                    if total_found and self._mentions_complete(mentions):
+                        break
+        except Exception as e:
+            # Extraction failed, return no pages
+            return []
+        return pages
+
+    def _mentions_complete(self, mentions):
+        if self.early_exit_keywords:
+            return self.early_exit_keywords <= set(mentions)
+        return bool(mentions)
 
     def extract_text(self, file_path):
         """
         Extracts text from a PDF file robustly, handling missing EOF markers and corrupted files.
         Returns an empty string if extraction fails.
         """
-        try:
-            # Read PDF as binary
-            with open(file_path, "rb") as f:
-                pdf_data = f.read()
-
-            # Check for PDF header
-            if not pdf_data.startswith(b'%PDF-'):
-                return ""
-
-            # Fix missing EOF marker
-            eof_pos = pdf_data.rfind(b'%%EOF')
-            if eof_pos == -1:
-                # Try to fix by appending EOF
-                pdf_data += b'\n%%EOF\n'
-
-            # Use BytesIO for PyPDF2
-            reader = PdfReader(BytesIO(pdf_data), strict=False)
-            text = ""
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text
-            return text
+        return "".join(self.extract_pages(file_path))
 
-        except Exception as e:
-            # Extraction failed, return empty string
-            return ""
+    def extract_text_until_complete(self, file_path):
+        """Like extract_text, but stops once the invoice total and the compliance keywords were seen."""
+        return "".join(self.extract_pages(file_path, until_complete=True))
+
+    def load_or_extract(self, file_path, digest=None):
+        """
+        Returns {"pages", "invoice_total", "policy_mentions"} for the PDF, from the
+        extraction cache when the same bytes were processed before.
+        """
+        digest = digest or file_digest(file_path)
+        entry = self.extraction_cache.get(digest, self.cache_signature)
+        if entry is None:
+            pages = self.extract_pages(file_path, until_complete=self.early_exit)
+            text = "".join(pages)
+            entry = {
+                "pages": pages,
+                "invoice_total": self.extract_invoice_total(text),
+                "policy_mentions": self.extract_policy_mentions(text)
+            }
+            # Failed extractions are not cached so they are retried next time
+            if pages:
+                self.extraction_cache.set(digest, entry, self.cache_signature)
+        return entry
 
     def extract_invoice_total(self, text):
         match = re.search(r"total(?: amount)?[:\s]*([\d,\.]+)", text, re.IGNORECASE)
@@ -53,52 +103,47 @@ class PDFAgent:
         return None
 
     def extract_policy_mentions(self, text):
-        mentions = []
-        for keyword in self.compliance_keywords:
-            if keyword.lower() in text.lower():
-                mentions.append(keyword)
-        return mentions
-
-    def process(self, file_path, classification):
-        source_id = os.path.splitext(os.path.basename(file_path))[0]
-
-        # Log metadata
-        self.memory_store.log_metadata(
-            source_id,
-            {
+        return self.keyword_matcher.scan(text).labels("compliance")
+
+    def process(self, file_path, classification, digest=None, source_id=None, filename=None):
+        filename = filename or file_path
+        source_id = source_id or os.path.splitext(os.path.basename(filename))[0]
+
+        # All trace fields are written to Redis in one round trip when the block exits
+        with self.memory_store.trace(source_id) as trace:
+            # Log metadata
+            trace.log_metadata({
                 "source": "pdf",
-                "filename": file_path,
+                "filename": filename,
                 "classification": classification
-            }
-        )
-
-        text = self.extract_text(file_path)
-        result = {"text": text}
-
-        # Check for invoice total
-        total = self.extract_invoice_total(text)
-        if total is not None:
-            result["invoice_total"] = total
-            if total > 10000:
-                result["flag"] = "Invoice total exceeds 10,000"
-
-        # Check for compliance keywords
-        mentions = self.extract_policy_mentions(text)
-        if mentions:
-            result["policy_mentions"] = mentions
-            result["flag"] = f"Policy mentions: {', '.join(mentions)}"
-
-        # Log fields and action
-        self.memory_store.log_agent_fields(source_id, "pdf_agent", result)
-        action = "flagged" if "flag" in result else "accepted"
-        self.memory_store.log_action(source_id, action)
-
-        # Log decision trace
-        trace = {
-            "step": "pdf_processed",
-            "result": result,
-            "action": action
-        }
-        self.memory_store.log_decision_trace(source_id, trace)
+            })
+
+            entry = self.load_or_extract(file_path, digest)
+            result = {"text": "".join(entry["pages"])}
+
+            # Check for invoice total
+            total = entry["invoice_total"]
+            if total is not None:
+                result["invoice_total"] = total
+                if total > 10000:
+                    result["flag"] = "Invoice total exceeds 10,000"
+
+            # Check for compliance keywords
+            mentions = entry["policy_mentions"]
+            if mentions:
+                result["policy_mentions"] = mentions
+                result["flag"] = f"Policy mentions: {', '.join(mentions)}"
+
+            # Log fields and action
+            trace.log_agent_fields("pdf_agent", result)
+            action = "flagged" if "flag" in result else "accepted"
+            trace.log_action(action)
+
+            # Log decision trace
+            trace.log_decision_trace({
+                "step": "pdf_processed",
+                "result": result,
+                "action": action
+            })
 
         return result
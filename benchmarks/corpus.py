@@ -0,0 +1,155 @@
+"""
+Synthetic document corpus for benchmarks and load tests.
+
+    python -m benchmarks.corpus --out benchmarks/corpus --count 300 --size-kb 16 --seed 7
+
+Writes a mix of emails, JSON invoices/RFQs and PDFs whose bodies are padded
+with faker text to roughly `size_kb`, sprinkled with the keywords from
+config/keyword_rules.json so every classifier and agent path is exercised,
+plus a manifest.json describing what was generated. The same seed always
+produces the same corpus.
+"""
+import argparse
+import json
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+from faker import Faker
+
+from core.text.keyword_matcher import load_keyword_rules
+
+FORMATS = ("email", "json", "pdf")
+
+
+class CorpusGenerator:
+    def __init__(self, seed: int = 0, rules_path: Optional[str] = None):
+        self.random = random.Random(seed)
+        self.fake = Faker()
+        self.fake.seed_instance(seed)
+        self.rules = load_keyword_rules(rules_path)
+
+    def _keyword(self, rule_set: str, label: Optional[str] = None) -> str:
+        groups = self.rules[rule_set]
+        return self.random.choice(groups[label or self.random.choice(list(groups))])
+
+    def _filler(self, size: int) -> str:
+        """Faker paragraphs until roughly `size` characters."""
+        paragraphs, length = [], 0
+        while length < size:
+            paragraph = self.fake.paragraph(nb_sentences=6)
+            paragraphs.append(paragraph)
+            length += len(paragraph) + 2
+        return "\n\n".join(paragraphs)
+
+    # --- Documents ---
+    def email(self, intent: str, size: int) -> bytes:
+        body = [
+            f"{self.fake.sentence()} {self._keyword('intent', intent)} {self.fake.sentence()}",
+            f"{self._keyword('tone').capitalize()}, {self.fake.sentence().lower()}",
+        ]
+        if self.random.random() < 0.3:
+            body.append(f"This is {self._keyword('urgency', 'high')}.")
+        body.append(self._filler(size))
+        return (
+            f"From: {self.fake.email()}\n"
+            f"Subject: {self.fake.sentence(nb_words=5)}\n\n" + "\n\n".join(body) + "\n"
+        ).encode("utf-8")
+
+    def json_document(self, intent: str, size: int) -> bytes:
+        item_count = max(1, size // 40)
+        items = [f"{self.fake.word()}_{i}" for i in range(item_count)]
+        if intent == "RFQ":
+            data: Dict[str, Any] = {"rfq_id": self.random.randint(1, 10 ** 6), "customer": self.fake.company(),
+                                    "items": items}
+        else:
+            data = {"order_id": self.random.randint(1, 10 ** 6), "customer": self.fake.company(),
+                    "amount": round(self.random.uniform(10, 50000), 2), "items": items}
+            # A share of invoices carry the anomalies the JSON agent reports
+            if self.random.random() < 0.2:
+                data["amount"] = str(data["amount"])
+        data["note"] = f"{self.fake.sentence()} {self._keyword('intent', intent)}"
+        return json.dumps(data, indent=2).encode("utf-8")
+
+    def pdf(self, intent: str, size: int) -> bytes:
+        lines = [self.fake.sentence(), f"{self._keyword('intent', intent)} {self.fake.sentence()}"]
+        if intent == "Invoice":
+            lines.append(f"Total amount: {self.random.uniform(100, 25000):,.2f}")
+        if self.random.random() < 0.5:
+            lines.append(f"Complies with {self._keyword('compliance').upper()} requirements.")
+        lines += self._filler(size).replace("\n\n", "\n").split("\n")
+        return make_pdf(lines)
+
+    def generate(self, out_dir: str, count: int, size_kb: float = 4,
+                 formats: tuple = FORMATS) -> List[Dict[str, Any]]:
+        os.makedirs(out_dir, exist_ok=True)
+        intents = list(self.rules["intent"])
+        extensions = {"email": ".eml", "json": ".json", "pdf": ".pdf"}
+        manifest = []
+        for i in range(count):
+            fmt = formats[i % len(formats)]
+            intent = self.random.choice(["Invoice", "RFQ"] if fmt == "json" else intents)
+            # Sizes vary +-50% around the target so results are not tuned to one document size
+            size = int(size_kb * 1024 * self.random.uniform(0.5, 1.5))
+            if fmt == "email":
+                data = self.email(intent, size)
+            elif fmt == "json":
+                data = self.json_document(intent, size)
+            else:
+                data = self.pdf(intent, size)
+            filename = f"{fmt}_{i:05d}{extensions[fmt]}"
+            with open(os.path.join(out_dir, filename), "wb") as f:
+                f.write(data)
+            manifest.append({"filename": filename, "format": fmt, "intent": intent, "bytes": len(data)})
+        with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+
+def _pdf_escape(text: str) -> str:
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(lines: List[str], lines_per_page: int = 50) -> bytes:
+    """Minimal multi-page PDF (Helvetica, one text line per row) that PyPDF2 can extract."""
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in pages:
+        stream = "BT /F1 10 Tf 14 TL 50 780 Td " + " ".join(f"({_pdf_escape(line[:110])}) '" for line in page) + " ET"
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark corpus")
+    parser.add_argument("--out", default="benchmarks/corpus")
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--size-kb", type=float, default=4, help="Target document size; actual sizes vary +-50%%")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    args = parser.parse_args()
+    manifest = CorpusGenerator(args.seed).generate(args.out, args.count, args.size_kb,
+                                                   tuple(args.formats.split(",")))
+    total = sum(entry["bytes"] for entry in manifest)
+    print(f"Wrote {len(manifest)} documents ({total / 1024 / 1024:.1f} MiB) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
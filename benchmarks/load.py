@@ -0,0 +1,167 @@
+"""
+End-to-end load test of POST /process-file.
+
+    python -m benchmarks.load --requests 500 --concurrency 32 --size-kb 16 [--llm-latency-ms 300] [--fakeredis]
+
+By default the app runs in-process behind httpx's ASGI transport with the
+stub LLM (CLASSIFIER_LLM=stub) and an in-memory mock for the action
+endpoints, so the numbers measure this service and not Gemini or the CRM.
+Redis is the one at REDIS_HOST (use --fakeredis when none is running).
+With --url the same load is sent to an already running server instead.
+
+Reports docs/sec, p50/p90/p99 latency overall and per format, and writes
+them to benchmarks/results/load-<time>.json.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.corpus import CorpusGenerator
+from benchmarks.micro import load_corpus
+from benchmarks.results import latency_summary, write_results
+
+
+def _configure_environment(log_file: str, dedup: bool = False):
+    # Must happen before main is imported: these are read at import time
+    os.environ.setdefault("CLASSIFIER_LLM", "stub")
+    # The corpus is replayed many times over; without this every repeat is answered from the stored result
+    if not dedup:
+        os.environ.setdefault("PROCESS_DEDUP_WINDOW", "0")
+    os.environ.setdefault("ACTION_DISPATCH_MODE", "direct")
+    os.environ.setdefault("RUN_EVENTS_BACKEND", "memory")
+    os.environ.setdefault("LOG_FILE", log_file)
+
+
+def use_fakeredis(app_module):
+    """Points every Redis client of the app at one shared fakeredis server."""
+    import fakeredis
+    server = fakeredis.FakeServer()
+    sync_conn = fakeredis.FakeRedis(server=server)
+    async_conn = fakeredis.aioredis.FakeRedis(server=server)
+    for store in (app_module.memory_store, app_module.email_agent.memory_store,
+                  app_module.json_agent.memory_store, app_module.pdf_agent.memory_store):
+        store.conn = sync_conn
+    app_module.classifier.intent_cache.conn = sync_conn
+    app_module.async_memory_store.conn = async_conn
+    app_module.action_queue.conn = async_conn
+    app_module.pipeline.result_store.conn = async_conn
+    app_module.cron_scheduler.conn = async_conn
+
+
+def mock_action_transport(latency: float) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if latency:
+            await asyncio.sleep(latency)
+        return httpx.Response(200, json={"status": "ok"})
+    return httpx.MockTransport(handler)
+
+
+async def drive(client: httpx.AsyncClient, documents: List[Dict[str, Any]], requests: int,
+                concurrency: int) -> Dict[str, Any]:
+    """Sends `requests` uploads cycling through `documents` from `concurrency` workers."""
+    payloads = []
+    for document in documents:
+        with open(document["path"], "rb") as f:
+            payloads.append((document["filename"], document["format"], f.read()))
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            filename, fmt, data = payloads[i % len(payloads)]
+            start = time.perf_counter()
+            try:
+                response = await client.post("/process-file", files={"file": (filename, data)})
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            if status == "200":
+                latencies.setdefault(fmt, []).append(elapsed)
+            else:
+                errors[status] = errors.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "requests": requests,
+        "succeeded": len(all_latencies),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "docs_per_sec": round(len(all_latencies) / wall, 2) if wall else 0.0,
+        "latency": latency_summary(all_latencies),
+        "by_format": {fmt: dict(latency_summary(values), count=len(values)) for fmt, values in latencies.items()},
+    }
+
+
+async def run_in_process(documents: List[Dict[str, Any]], args) -> Dict[str, Any]:
+    import main as app_module
+
+    if args.fakeredis:
+        use_fakeredis(app_module)
+    app_module.classifier.llm.latency = args.llm_latency_ms / 1000
+    app_module.action_router._transport = mock_action_transport(args.action_latency_ms / 1000)
+
+    async with app_module.lifespan(app_module.app):
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            return await drive(client, documents, args.requests, args.concurrency)
+
+
+async def run_against(url: str, documents: List[Dict[str, Any]], args) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=None, limits=limits) as client:
+        return await drive(client, documents, args.requests, args.concurrency)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test /process-file")
+    parser.add_argument("--url", help="Base URL of a running server; in-process when omitted")
+    parser.add_argument("--corpus", help="Existing corpus directory; generated into a temp dir when omitted")
+    parser.add_argument("--count", type=int, default=90, help="Distinct documents in the generated corpus")
+    parser.add_argument("--size-kb", type=float, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated LLM call latency")
+    parser.add_argument("--action-latency-ms", type=float, default=0.0, help="Simulated action endpoint latency")
+    parser.add_argument("--fakeredis", action="store_true", help="Use an in-memory fakeredis server")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Keep duplicate short-circuiting on, so repeated documents return stored results")
+    parser.add_argument("--out", help="Result file (default benchmarks/results/load-<time>.json)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.corpus
+        if directory is None:
+            directory = os.path.join(tmp, "corpus")
+            CorpusGenerator(args.seed).generate(directory, args.count, args.size_kb)
+        documents = []
+        for fmt, group in load_corpus(directory).items():
+            documents += [dict(document, format=fmt) for document in group]
+        documents.sort(key=lambda document: document["filename"])
+
+        if args.url:
+            result = asyncio.run(run_against(args.url, documents, args))
+        else:
+            _configure_environment(os.path.join(tmp, "processing.log"), args.dedup)
+            result = asyncio.run(run_in_process(documents, args))
+
+    config = {key: value for key, value in vars(args).items() if key != "out"}
+    print(f"{result['docs_per_sec']} docs/sec, p50 {result['latency']['p50_ms']} ms, "
+          f"p99 {result['latency']['p99_ms']} ms, errors {result['errors']}")
+    print(f"Results written to {write_results('load', config, {'process_file': result}, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
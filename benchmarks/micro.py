@@ -0,0 +1,137 @@
+"""
+Micro-benchmarks of the per-document hot paths.
+
+    CLASSIFIER_LLM=stub python -m benchmarks.micro --count 60 --size-kb 16 [--redis redis://localhost:6379/0]
+
+Each benchmark cycles through the matching documents of a synthetic corpus
+(see benchmarks.corpus), so results reflect the corpus mix rather than one
+file. Benchmarks that write to Redis use --redis when it answers, else
+fakeredis when installed, and are reported as skipped otherwise.
+"""
+import argparse
+import itertools
+import os
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+
+import redis
+
+from benchmarks.corpus import CorpusGenerator
+from benchmarks.results import bench, write_results
+
+
+def connect_redis(url: Optional[str]):
+    """A live Redis client for `url`, else a fakeredis client, else None."""
+    if url:
+        try:
+            conn = redis.Redis.from_url(url, socket_connect_timeout=1)
+            conn.ping()
+            return conn
+        except redis.RedisError:
+            pass
+    try:
+        import fakeredis
+    except ImportError:
+        return None
+    return fakeredis.FakeRedis()
+
+
+def _cycle(documents: List[Any]) -> Callable[[], Any]:
+    return itertools.cycle(documents).__next__
+
+
+def load_corpus(directory: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Corpus documents grouped by format: {"email": [{"path", "filename", "text"}...], ...}."""
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for name in sorted(os.listdir(directory)):
+        if name == "manifest.json":
+            continue
+        path = os.path.join(directory, name)
+        fmt = {".eml": "email", ".json": "json", ".pdf": "pdf"}.get(os.path.splitext(name)[1])
+        if fmt is None:
+            continue
+        document = {"path": path, "filename": name}
+        if fmt != "pdf":
+            with open(path, "r", encoding="utf-8") as f:
+                document["text"] = f.read()
+        grouped.setdefault(fmt, []).append(document)
+    return grouped
+
+
+def run(corpus: Dict[str, List[Dict[str, Any]]], conn=None, min_time: float = 0.5) -> Dict[str, Any]:
+    # Imported here so CLASSIFIER_LLM can be set from the command line first
+    from agents.classifier_agent.classifier import ClassifierAgent
+    from agents.email_agent.email_agent import EmailAgent
+    from agents.json_agent.json_agent import JSONAgent
+    from agents.pdf_agent.pdf_agent import PDFAgent
+    from core.memory.redis_client import MemoryStore
+
+    classifier = ClassifierAgent()
+    email_agent = EmailAgent()
+    json_agent = JSONAgent()
+    pdf_agent = PDFAgent()
+    texts = [d for fmt in ("email", "json") for d in corpus.get(fmt, [])]
+    emails = corpus.get("email", [])
+    jsons = corpus.get("json", [])
+    pdfs = corpus.get("pdf", [])
+
+    benchmarks: Dict[str, Optional[Callable[[], Any]]] = {}
+    next_text = _cycle(texts)
+    benchmarks["classifier.detect_format"] = lambda: (lambda d: classifier.detect_format(d["filename"], d["text"]))(next_text())
+    benchmarks["classifier.fallback_intent"] = lambda: classifier.fallback_intent(next_text()["text"])
+    if emails:
+        next_email = _cycle(emails)
+        benchmarks["email.extract_fields"] = lambda: email_agent.extract_fields(next_email()["text"])
+        benchmarks["email.detect_tone"] = lambda: email_agent.detect_tone(next_email()["text"])
+    if pdfs:
+        next_pdf = _cycle(pdfs)
+        benchmarks["pdf.extract_text"] = lambda: pdf_agent.extract_text(next_pdf()["path"])
+
+    if conn is not None:
+        json_agent.memory_store.conn = conn
+        store = MemoryStore()
+        store.conn = conn
+        if jsons:
+            next_json = _cycle(jsons)
+            classification = {"format": "JSON", "intent": "Invoice"}
+            benchmarks["json.process"] = lambda: (lambda d: json_agent.process(d["filename"], d["text"], classification))(next_json())
+        counter = itertools.count()
+        benchmarks["memory_store.store_trace"] = lambda: store.store_trace(
+            f"bench_{next(counter) % 1000}", {"metadata": {"source": "bench"}, "action": "routine"}
+        )
+    else:
+        benchmarks["json.process"] = None
+        benchmarks["memory_store.store_trace"] = None
+
+    results = {}
+    for name, func in benchmarks.items():
+        results[name] = {"skipped": "no Redis or fakeredis available"} if func is None else bench(func, min_time)
+        print(f"{name:32} {results[name]}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run pipeline micro-benchmarks")
+    parser.add_argument("--corpus", help="Existing corpus directory; generated into a temp dir when omitted")
+    parser.add_argument("--count", type=int, default=60)
+    parser.add_argument("--size-kb", type=float, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--redis", default=os.getenv("BENCH_REDIS_URL", "redis://localhost:6379/15"))
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds spent per benchmark")
+    parser.add_argument("--out", help="Result file (default benchmarks/results/micro-<time>.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.corpus
+        if directory is None:
+            directory = tmp
+            CorpusGenerator(args.seed).generate(directory, args.count, args.size_kb)
+        results = run(load_corpus(directory), connect_redis(args.redis), args.min_time)
+
+    config = {"corpus": args.corpus, "count": args.count, "size_kb": args.size_kb, "seed": args.seed,
+              "min_time": args.min_time, "llm": os.getenv("CLASSIFIER_LLM", "gemini")}
+    print(f"Results written to {write_results('micro', config, results, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark result files and run-over-run comparison.
+
+    python -m benchmarks.results benchmarks/results/micro-OLD.json benchmarks/results/micro-NEW.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of unsorted samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """p50/p90/p99/mean/max of latencies in seconds, reported in milliseconds."""
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p90_ms": round(percentile(samples, 90) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3) if samples else 0.0,
+        "max_ms": round(max(samples) * 1000, 3) if samples else 0.0,
+    }
+
+
+def bench(func: Callable[[], Any], min_time: float = 0.5, min_runs: int = 5, warmup: int = 2) -> Dict[str, Any]:
+    """Calls `func` repeatedly for at least `min_time` seconds and summarizes per-call latency."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < min_runs or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    summary = latency_summary(samples)
+    summary["runs"] = len(samples)
+    summary["ops_per_sec"] = round(len(samples) / sum(samples), 1) if sum(samples) else 0.0
+    return summary
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def write_results(kind: str, config: Dict[str, Any], results: Dict[str, Any], out: Optional[str] = None) -> str:
+    """Writes {kind, environment, config, results} to `out` (default benchmarks/results/<kind>-<time>.json)."""
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{kind}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, "w") as f:
+        json.dump({"kind": kind, "environment": environment(), "config": config, "results": results}, f, indent=2)
+    return out
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], metric: str = "p50_ms") -> List[Dict[str, Any]]:
+    """Per-benchmark change of `metric` between two result files; positive change_pct is slower."""
+    rows = []
+    for name, result in new["results"].items():
+        before = old["results"].get(name, {}).get(metric)
+        after = result.get(metric)
+        if before is None or after is None:
+            continue
+        rows.append({
+            "benchmark": name,
+            "before": before,
+            "after": after,
+            "change_pct": round((after - before) / before * 100, 1) if before else None,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--metric", default="p50_ms")
+    args = parser.parse_args()
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print(f"{'benchmark':40} {'before':>12} {'after':>12} {'change':>8}")
+    for row in compare(old, new, args.metric):
+        change = f"{row['change_pct']:+.1f}%" if row["change_pct"] is not None else "n/a"
+        print(f"{row['benchmark']:40} {row['before']:>12} {row['after']:>12} {change:>8}")
+
+
+if __name__ == "__main__":
+    main()
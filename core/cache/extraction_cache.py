@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(source) -> str:
+    """SHA-256 of a file path or binary file object, read in chunks."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    position = source.tell()
+    source.seek(0)
+    try:
+        return hashlib.file_digest(source, "sha256").hexdigest()
+    finally:
+        source.seek(position)
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache of PDF extraction results (per-page text plus the
+    derived invoice_total / policy_mentions), keyed by the SHA-256 of the PDF.
+
+    Entries live as JSON files in a local directory bounded to `max_bytes`.
+    Going over the budget evicts the least recently used files first (hits
+    refresh a file's mtime) down to `low_water` of it, so the directory is
+    rescanned once per batch of writes rather than on every write. Workers
+    sharing the directory only count their own writes, so each one also
+    rescans it every `rescan_interval` seconds and before evicting. Corrupt
+    entries are deleted and count as misses. When a Redis connection is
+    given, entries are also shared through Redis with a TTL so other workers
+    and nodes can reuse them.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None, conn=None,
+                 ttl: Optional[int] = None, namespace: str = "pdf_text"):
+        self.directory = directory or os.getenv("PDF_CACHE_DIR", os.path.join("cache", "pdf_text"))
+        self.max_bytes = max_bytes or int(os.getenv("PDF_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+        self.conn = conn
+        self.ttl = ttl or int(os.getenv("PDF_CACHE_TTL", str(7 * 24 * 3600)))
+        self.namespace = namespace
+        self.redis_retry_after = 30  # seconds to skip the Redis tier after an error
+        self.low_water = 0.9  # eviction frees space down to this share of max_bytes
+        self.rescan_interval = 60.0  # seconds before writes re-measure the directory, for other workers' entries
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+        self._size = sum(entry.stat().st_size for entry in self._scan())
+        self._scanned_at = time.monotonic()
+        self.hits = 0
+        self.disk_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _scan(self):
+        for shard in os.scandir(self.directory):
+            if shard.is_dir():
+                yield from (entry for entry in os.scandir(shard.path) if entry.name.endswith(".json"))
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], f"{digest}.json")
+
+    def _redis_available(self) -> bool:
+        return self.conn is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e: Exception):
+        logger.warning(f"PDF extraction cache Redis tier unavailable: {str(e)}")
+        self._redis_down_until = time.monotonic() + self.redis_retry_after
+
+    def _read_disk(self, digest: str) -> Optional[bytes]:
+        path = self._path(digest)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used
+            return data
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, digest: str, data: bytes):
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with self._lock:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._size += len(data) - previous
+            if self._size > self.max_bytes or time.monotonic() - self._scanned_at >= self.rescan_interval:
+                self._evict()
+
+    def _evict(self):
+        # Re-measured first: other workers may have added (or evicted) entries since the last scan
+        entries = []
+        for entry in self._scan():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        self._size = sum(size for _, size, _ in entries)
+        self._scanned_at = time.monotonic()
+        if self._size <= self.max_bytes:
+            return
+        # Oldest mtime first, until the directory is back under the low-water mark
+        target = self.max_bytes * self.low_water
+        for _, size, path in sorted(entries):
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._size -= size
+            self.evictions += 1
+
+    def _remove_disk(self, digest: str):
+        path = self._path(digest)
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                return
+            self._size -= size
+
+    def get(self, digest: str, signature: str = "") -> Optional[Dict[str, Any]]:
+        """Returns the cached entry, or None on a miss or when it was produced with a different `signature`."""
+        data = self._read_disk(digest)
+        from_redis = False
+        if data is None and self._redis_available():
+            try:
+                data = self.conn.get(f"{self.namespace}:{digest}")
+                from_redis = data is not None
+            except Exception as e:
+                self._redis_failed(e)
+
+        try:
+            entry = json.loads(data) if data is not None else None
+        except ValueError as e:
+            logger.warning(f"Discarding corrupt PDF extraction cache entry {digest}: {str(e)}")
+            if not from_redis:
+                self._remove_disk(digest)
+            entry = None
+        if not isinstance(entry, dict) or entry.pop("signature", "") != signature:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if from_redis:
+            self._write_disk(digest, data)
+        with self._lock:
+            self.hits += 1
+            if from_redis:
+                self.redis_hits += 1
+            else:
+                self.disk_hits += 1
+        return entry
+
+    def set(self, digest: str, entry: Dict[str, Any], signature: str = ""):
+        data = json.dumps(dict(entry, signature=signature)).encode("utf-8")
+        self._write_disk(digest, data)
+        if self._redis_available():
+            try:
+                self.conn.set(f"{self.namespace}:{digest}", data, ex=self.ttl)
+            except Exception as e:
+                self._redis_failed(e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size_bytes": self._size,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,114 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class IntentCache:
+    """
+    Two-tier cache of LLM intent labels: an in-process LRU in front of a shared
+    Redis tier with a TTL. Keys are a hash of the normalized document content,
+    the model name and the prompt version, so changing either invalidates
+    earlier answers.
+    """
+
+    def __init__(self, conn=None, max_entries: Optional[int] = None, ttl: Optional[int] = None,
+                 namespace: str = "intent_cache"):
+        self.conn = conn
+        self.max_entries = max_entries or int(os.getenv("INTENT_CACHE_SIZE", "4096"))
+        self.ttl = ttl or int(os.getenv("INTENT_CACHE_TTL", str(7 * 24 * 3600)))
+        self.namespace = namespace
+        self.redis_retry_after = 30  # seconds to skip the Redis tier after an error
+
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+        self.hits = 0
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(content: str) -> str:
+        content = unicodedata.normalize("NFC", content)
+        return _WHITESPACE.sub(" ", content).strip()
+
+    def make_key(self, content: str, model: str, prompt_version: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model, prompt_version, self.normalize(content)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return f"{self.namespace}:{digest.hexdigest()}"
+
+    def _redis_available(self) -> bool:
+        return self.conn is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e: Exception):
+        logger.warning(f"Intent cache Redis tier unavailable: {str(e)}")
+        self._redis_down_until = time.monotonic() + self.redis_retry_after
+
+    def _put_local(self, key: str, intent: str):
+        with self._lock:
+            self._entries[key] = intent
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            intent = self._entries.get(key)
+            if intent is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.local_hits += 1
+                return intent
+
+        if self._redis_available():
+            try:
+                value = self.conn.get(key)
+            except Exception as e:
+                self._redis_failed(e)
+                value = None
+            if value is not None:
+                intent = value.decode("utf-8") if isinstance(value, bytes) else value
+                self._put_local(key, intent)
+                with self._lock:
+                    self.hits += 1
+                    self.redis_hits += 1
+                return intent
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, intent: str):
+        self._put_local(key, intent)
+        if self._redis_available():
+            try:
+                self.conn.set(key, intent, ex=self.ttl)
+            except Exception as e:
+                self._redis_failed(e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
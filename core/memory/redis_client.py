@@ -1,61 +1,203 @@
 import redis
+import redis.asyncio as aioredis
 import json
+import os
+import threading
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+
+from core.observability.metrics import REGISTRY
+
+REDIS_HOST = os.getenv("REDIS_HOST", "redis")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+
+# One connection pool per (host, port, db) for the whole process, shared by
+# every MemoryStore instance instead of one pool per agent/request
+_pools: Dict[Tuple[str, int, int], redis.ConnectionPool] = {}
+_async_pools: Dict[Tuple[str, int, int], aioredis.ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+REDIS_SECONDS = REGISTRY.histogram("redis_roundtrip_seconds", "Trace store round trips to Redis", ("op",))
+
+def get_connection_pool(host=REDIS_HOST, port=REDIS_PORT, db=0) -> redis.ConnectionPool:
+    with _pools_lock:
+        if (host, port, db) not in _pools:
+            # Key changes: removed decode_responses=True
+            _pools[(host, port, db)] = redis.ConnectionPool(
+                host=host,
+                port=port,
+                db=db,
+                socket_connect_timeout=3,
+                socket_keepalive=True
+            )
+        return _pools[(host, port, db)]
+
+def get_async_connection_pool(host=REDIS_HOST, port=REDIS_PORT, db=0) -> aioredis.ConnectionPool:
+    with _pools_lock:
+        if (host, port, db) not in _async_pools:
+            _async_pools[(host, port, db)] = aioredis.ConnectionPool(
+                host=host,
+                port=port,
+                db=db,
+                socket_connect_timeout=3,
+                socket_keepalive=True
+            )
+        return _async_pools[(host, port, db)]
+
+def _parse_trace(data: Dict[Any, Any]) -> Optional[Dict[str, Any]]:
+    if not data:
+        return None
+
+    parsed_data = {}
+    for k, v in data.items():
+        try:
+            # Decode bytes to string first
+            key_str = k.decode("utf-8") if isinstance(k, bytes) else k
+            val_str = v.decode("utf-8") if isinstance(v, bytes) else v
+            parsed_data[key_str] = json.loads(val_str)
+        except json.JSONDecodeError:
+            parsed_data[key_str] = val_str
+        except Exception as e:
+            print(f"Error parsing trace data: {str(e)}")
+            parsed_data[key_str] = val_str
+    return parsed_data
+
+class TraceBatch:
+    """
+    Collects the trace fields of one document and writes them to its
+    `trace:` hash in a single pipelined transaction when flushed, either
+    explicitly or on leaving the `with store.trace(source_id)` block.
+    """
+
+    def __init__(self, conn, key: str):
+        self.conn = conn
+        self.key = key
+        self.fields: Dict[str, Any] = {}
+
+    def set(self, field: str, value: Any):
+        self.fields[field] = value if isinstance(value, (bytes, str)) else json.dumps(value)
+
+    def log_metadata(self, metadata: Dict[str, Any]):
+        metadata["timestamp"] = metadata.get("timestamp") or datetime.utcnow().isoformat()
+        self.fields["metadata"] = json.dumps(metadata)
+
+    def log_agent_fields(self, agent_name: str, fields: Dict[str, Any]):
+        self.fields[f"{agent_name}_fields"] = json.dumps(fields)
+
+    def log_action(self, action: str):
+        self.fields["action"] = action
+
+    def log_decision_trace(self, trace: Any):
+        self.fields["decision_trace"] = json.dumps(trace)
+
+    def _pipeline(self, pipe):
+        pipe.hset(self.key, mapping=self.fields)
+        return pipe
+
+    def flush(self):
+        if not self.fields:
+            return
+        with REDIS_SECONDS.time(op="trace_write"):
+            self._pipeline(self.conn.pipeline(transaction=True)).execute()
+        self.fields = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Flush even when the agent failed part way, so the partial trace is kept
+        self.flush()
+
+class AsyncTraceBatch(TraceBatch):
+    async def flush(self):
+        if not self.fields:
+            return
+        with REDIS_SECONDS.time(op="trace_write"):
+            await self._pipeline(self.conn.pipeline(transaction=True)).execute()
+        self.fields = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.flush()
 
 class MemoryStore:
-    def __init__(self, host="redis", port=6379, db=0):
-        # Key changes: removed decode_responses=True
-        self.conn = redis.Redis(
-            host=host,
-            port=port,
-            db=db,
-            socket_connect_timeout=3,
-            socket_keepalive=True
-        )
+    def __init__(self, host=REDIS_HOST, port=REDIS_PORT, db=0):
+        self.conn = redis.Redis(connection_pool=get_connection_pool(host, port, db))
 
     def _make_key(self, source_id: str) -> str:
         return f"trace:{source_id}"
-    
+
+    def trace(self, source_id: str) -> TraceBatch:
+        return TraceBatch(self.conn, self._make_key(source_id))
+
     def get_full_trace(self, source_id: str) -> Optional[Dict[str, Any]]:
         key = self._make_key(source_id)
-        data = self.conn.hgetall(key)
-        if not data:
-            return None
-            
-        parsed_data = {}
-        for k, v in data.items():
-            try:
-                # Decode bytes to string first
-                key_str = k.decode("utf-8") if isinstance(k, bytes) else k
-                val_str = v.decode("utf-8") if isinstance(v, bytes) else v
-                parsed_data[key_str] = json.loads(val_str)
-            except json.JSONDecodeError:
-                parsed_data[key_str] = val_str
-            except Exception as e:
-                print(f"Error parsing trace data: {str(e)}")
-                parsed_data[key_str] = val_str
-        return parsed_data
+        with REDIS_SECONDS.time(op="trace_read"):
+            data = self.conn.hgetall(key)
+        return _parse_trace(data)
 
     def store_trace(self, source_id: str, data: dict):
-        self.conn.hset(f"trace:{source_id}", mapping={
-            k: json.dumps(v) if not isinstance(v, (bytes, str)) else v 
-            for k, v in data.items()
-        })
+        with self.trace(source_id) as trace:
+            for k, v in data.items():
+                trace.set(k, v)
 
     def log_metadata(self, source_id: str, metadata: Dict[str, Any]):
-        key = self._make_key(source_id)
-        metadata["timestamp"] = metadata.get("timestamp") or datetime.utcnow().isoformat()
-        self.conn.hset(key, "metadata", json.dumps(metadata))
+        with self.trace(source_id) as trace:
+            trace.log_metadata(metadata)
 
     def log_agent_fields(self, source_id: str, agent_name: str, fields: Dict[str, Any]):
-        key = self._make_key(source_id)
-        self.conn.hset(key, f"{agent_name}_fields", json.dumps(fields))
+        with self.trace(source_id) as trace:
+            trace.log_agent_fields(agent_name, fields)
 
     def log_action(self, source_id: str, action: str):
-        key = self._make_key(source_id)
-        self.conn.hset(key, "action", action)
+        with self.trace(source_id) as trace:
+            trace.log_action(action)
 
     def log_decision_trace(self, source_id: str, trace: Any):
+        with self.trace(source_id) as batch:
+            batch.log_decision_trace(trace)
+
+
+class AsyncMemoryStore:
+    """MemoryStore on the native asyncio Redis client."""
+
+    def __init__(self, host=REDIS_HOST, port=REDIS_PORT, db=0):
+        self.conn = aioredis.Redis(connection_pool=get_async_connection_pool(host, port, db))
+
+    def _make_key(self, source_id: str) -> str:
+        return f"trace:{source_id}"
+
+    def trace(self, source_id: str) -> AsyncTraceBatch:
+        return AsyncTraceBatch(self.conn, self._make_key(source_id))
+
+    async def get_full_trace(self, source_id: str) -> Optional[Dict[str, Any]]:
         key = self._make_key(source_id)
-        self.conn.hset(key, "decision_trace", json.dumps(trace))
+        with REDIS_SECONDS.time(op="trace_read"):
+            data = await self.conn.hgetall(key)
+        return _parse_trace(data)
+
+    async def store_trace(self, source_id: str, data: dict):
+        async with self.trace(source_id) as trace:
+            for k, v in data.items():
+                trace.set(k, v)
+
+    async def log_metadata(self, source_id: str, metadata: Dict[str, Any]):
+        async with self.trace(source_id) as trace:
+            trace.log_metadata(metadata)
+
+    async def log_agent_fields(self, source_id: str, agent_name: str, fields: Dict[str, Any]):
+        async with self.trace(source_id) as trace:
+            trace.log_agent_fields(agent_name, fields)
+
+    async def log_action(self, source_id: str, action: str):
+        async with self.trace(source_id) as trace:
+            trace.log_action(action)
+
+    async def log_decision_trace(self, source_id: str, trace: Any):
+        async with self.trace(source_id) as batch:
+            batch.log_decision_trace(trace)
+
+    async def close(self):
+        await self.conn.aclose()
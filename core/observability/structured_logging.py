@@ -0,0 +1,159 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+
+# Attributes every LogRecord has; anything else on a record came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+def summarize(value: Any, max_chars: int = 512, max_items: int = 20, depth: int = 4) -> Any:
+    """
+    JSON-safe copy of `value` bounded in size: long strings are cut to
+    `max_chars`, bytes become their length, long lists/dicts keep their first
+    `max_items` entries and nesting below `depth` is replaced by a type note.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        if len(value) <= max_chars:
+            return value
+        return f"{value[:max_chars]}... [{len(value)} chars]"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, dict):
+        if depth <= 0:
+            return f"<dict with {len(value)} keys>"
+        items = list(value.items())
+        summary = {str(k): summarize(v, max_chars, max_items, depth - 1) for k, v in items[:max_items]}
+        if len(items) > max_items:
+            summary["..."] = f"{len(items) - max_items} more keys"
+        return summary
+    if isinstance(value, (list, tuple, set)):
+        if depth <= 0:
+            return f"<{type(value).__name__} of {len(value)}>"
+        items = list(value)
+        summary = [summarize(v, max_chars, max_items, depth - 1) for v in items[:max_items]]
+        if len(items) > max_items:
+            summary.append(f"... {len(items) - max_items} more items")
+        return summary
+    return summarize(str(value), max_chars, max_items, depth)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed with `extra=` are summarized, not dumped whole."""
+
+    def __init__(self, max_chars: Optional[int] = None, max_items: Optional[int] = None):
+        super().__init__()
+        self.max_chars = max_chars or int(os.getenv("LOG_MAX_FIELD_CHARS", "512"))
+        self.max_items = max_items or int(os.getenv("LOG_MAX_ITEMS", "20"))
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": summarize(record.getMessage(), self.max_chars * 4),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = summarize(value, self.max_chars, self.max_items)
+        if record.exc_info:
+            entry["exception"] = summarize(self.formatException(record.exc_info), self.max_chars * 8)
+        return json.dumps(entry, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Lets through every INFO+ record but only a `rate` fraction of DEBUG records."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that hands records to the writer thread untouched.
+
+    The stdlib handler formats each record on the calling thread before
+    queueing it; here the listener does all formatting, so a request only
+    pays for creating the record. When the queue is full the record is
+    dropped and counted rather than blocking the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self.queue.qsize(), "dropped": self.dropped}
+
+
+class LoggingPipeline:
+    """Root logger -> NonBlockingQueueHandler -> QueueListener thread -> size-rotated JSON file."""
+
+    def __init__(self, handler: NonBlockingQueueHandler, listener: QueueListener):
+        self.handler = handler
+        self.listener = listener
+        self._lock = threading.Lock()
+        self._running = True
+
+    def stats(self) -> Dict[str, int]:
+        return self.handler.stats()
+
+    def stop(self):
+        """Detaches from the root logger and flushes queued records to disk; safe to call more than once."""
+        with self._lock:
+            if self._running:
+                logging.getLogger().removeHandler(self.handler)
+                self.listener.stop()
+                self._running = False
+
+
+def setup_logging(path: Optional[str] = None, level: Optional[str] = None, max_bytes: Optional[int] = None,
+                  backup_count: Optional[int] = None, queue_size: Optional[int] = None,
+                  debug_sample_rate: Optional[float] = None) -> LoggingPipeline:
+    """Installs the non-blocking JSON logging pipeline on the root logger and starts its writer thread."""
+    path = path or os.getenv("LOG_FILE", "logs/processing.log")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    file_handler = RotatingFileHandler(
+        path,
+        maxBytes=max_bytes or int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backupCount=backup_count or int(os.getenv("LOG_BACKUP_COUNT", "5")),
+        encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonFormatter())
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size or int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+    rate = debug_sample_rate if debug_sample_rate is not None else float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+    handler.addFilter(DebugSampler(rate))
+    listener = QueueListener(handler.queue, file_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+    root.addHandler(handler)
+    listener.start()
+    pipeline = LoggingPipeline(handler, listener)
+    atexit.register(pipeline.stop)
+    return pipeline
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import logging
+import os
+import tarfile
+import zipfile
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+from core.pipeline.spool import DocumentTooLarge, SpooledDocument, spool_stream, spool_upload
+
+logger = logging.getLogger(__name__)
+
+# Archive members whose decompressed size is over this are reported as errors instead of being unpacked
+BATCH_MEMBER_MAX_SIZE = int(os.getenv("BATCH_MEMBER_MAX_SIZE", str(100 * 1024 * 1024)))
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+_END = object()
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _spool_member(name: str, fp, size: int, max_size: int) -> Union[SpooledDocument, DocumentTooLarge]:
+    # The declared size is checked first; spool_stream also counts what is actually read, since headers can lie
+    if size > max_size:
+        return DocumentTooLarge(f"{name} is larger than {max_size} bytes")
+    try:
+        return spool_stream(os.path.basename(name), fp, max_size=max_size)
+    except DocumentTooLarge as e:
+        return e
+
+
+def iter_archive_members(fileobj, filename: str, max_size: Optional[int] = None
+                         ) -> Iterator[Tuple[str, Union[SpooledDocument, DocumentTooLarge]]]:
+    """
+    Yields (member name, SpooledDocument) for every regular file in a zip or
+    tar archive, one member at a time. Members are spooled like uploads, so
+    only small ones are held in memory; one that decompresses to more than
+    `max_size` bytes is yielded as a DocumentTooLarge instead. Tar archives
+    are read in stream mode, so members are decompressed as they are reached
+    rather than all up front.
+    """
+    max_size = BATCH_MEMBER_MAX_SIZE if max_size is None else max_size
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                    continue
+                with zf.open(info) as fp:
+                    yield info.filename, _spool_member(info.filename, fp, info.file_size, max_size)
+    else:
+        with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+            for member in tf:
+                if not member.isfile():
+                    continue
+                yield member.name, _spool_member(member.name, tf.extractfile(member), member.size, max_size)
+
+
+class BatchProcessor:
+    """
+    Fans a batch of uploads (plain files and/or zip/tar archives) out over a
+    pool of workers that each run the DocumentPipeline, and yields per-file
+    results in completion order.
+    """
+
+    def __init__(self, pipeline, workers: Optional[int] = None):
+        self.pipeline = pipeline
+        self.workers = workers or int(os.getenv("BATCH_WORKERS", "8"))
+
+    async def iter_documents(self, uploads: List[Any]
+                             ) -> AsyncIterator[Tuple[str, Union[SpooledDocument, DocumentTooLarge]]]:
+        executor = self.pipeline.executor
+        for upload in uploads:
+            if not is_archive(upload.filename):
+                yield upload.filename, await spool_upload(upload, executor)
+                continue
+            members = iter_archive_members(upload.file, upload.filename)
+            while True:
+                # Archive reads and decompression are blocking, pull one member at a time off-loop
+                item = await executor.run("read", next, members, _END)
+                if item is _END:
+                    break
+                yield item
+
+    async def _process_one(self, name: str, content: Union[SpooledDocument, DocumentTooLarge]) -> Dict[str, Any]:
+        if isinstance(content, DocumentTooLarge):
+            logger.error(f"Skipped batch member {name}: {str(content)}")
+            return {"filename": name, "status": "error", "error": str(content)}
+        try:
+            result = await self.pipeline.process(os.path.basename(name), content)
+            return {"filename": name, "status": "ok", "result": result}
+        except Exception as e:
+            logger.error(f"Error processing batch member {name}: {str(e)}")
+            return {"filename": name, "status": "error", "error": str(e)}
+
+    async def process(self, uploads: List[Any], workers: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        workers = workers or self.workers
+        # Bounded so archives are only unpacked as fast as documents are processed
+        pending: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def feed():
+            try:
+                async for document in self.iter_documents(uploads):
+                    await pending.put(document)
+            except Exception as e:
+                logger.error(f"Error reading batch: {str(e)}")
+                await results.put({"filename": None, "status": "error", "error": f"Unreadable batch: {str(e)}"})
+            finally:
+                for _ in range(workers):
+                    await pending.put(_END)
+
+        async def work():
+            while True:
+                document = await pending.get()
+                if document is _END:
+                    break
+                await results.put(await self._process_one(*document))
+
+        async def run():
+            await asyncio.gather(feed(), *[work() for _ in range(workers)])
+            await results.put(_END)
+
+        runner = asyncio.create_task(run())
+        try:
+            while True:
+                result = await results.get()
+                if result is _END:
+                    break
+                yield result
+        finally:
+            runner.cancel()
+
+    async def stream_ndjson(self, uploads: List[Any], workers: Optional[int] = None) -> AsyncIterator[str]:
+        async for result in self.process(uploads, workers):
+            yield json.dumps(result, default=str) + "\n"
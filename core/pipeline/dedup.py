@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# A re-sent document with the same SHA-256 and extension within this many seconds gets the stored result (0 disables)
+PROCESS_DEDUP_WINDOW = int(os.getenv("PROCESS_DEDUP_WINDOW", str(3600)))
+# How long a response stays replayable under its Idempotency-Key (0 disables)
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", str(24 * 3600)))
+
+RESULT_PREFIX = "processed"
+IDEMPOTENCY_PREFIX = "idempotency"
+# Bulky agent result fields (PDF text, email body, JSON data) left out of stored records; the trace keeps them
+STORED_RESULT_OMIT = ("text", "body", "data")
+
+
+def content_key(digest: str, filename: str) -> str:
+    """
+    What identifies a content duplicate: the bytes plus the file extension,
+    since the extension decides how the same bytes are classified.
+    """
+    return digest + os.path.splitext(filename)[1].lower()
+
+
+def stored_record(action: str, response: Dict[str, Any]) -> Dict[str, Any]:
+    """The record kept for a response: without the full trace and the bulky result fields."""
+    result = response["processing_result"]
+    if isinstance(result, dict):
+        result = {key: value for key, value in result.items() if key not in STORED_RESULT_OMIT}
+    kept = {key: value for key, value in response.items() if key != "full_trace"}
+    return {"action": action, "response": dict(kept, processing_result=result)}
+
+
+class IdempotencyKeyConflict(ValueError):
+    """An Idempotency-Key already used for a different document."""
+
+
+class ProcessedResultStore:
+    """
+    Results of /process-file in Redis, so repeated work can be skipped:
+
+    - processed:<content key> holds the latest result for a document's bytes
+      and extension (see content_key) for `window` seconds (content duplicates);
+    - idempotency:<key> holds the digest and result of the request sent
+      with that Idempotency-Key for `key_ttl` seconds (client retries).
+
+    A record is {"action": routed action, "response": pipeline response},
+    as trimmed by stored_record.
+    Redis errors are logged and treated as misses, so the pipeline keeps
+    working, just without short-circuiting; Redis is then skipped for
+    `redis_retry_after` seconds instead of every upload waiting on it.
+    """
+
+    def __init__(self, conn, window: Optional[int] = None, key_ttl: Optional[int] = None):
+        self.conn = conn
+        self.window = PROCESS_DEDUP_WINDOW if window is None else window
+        self.key_ttl = IDEMPOTENCY_KEY_TTL if key_ttl is None else key_ttl
+        self.redis_retry_after = 30
+        self._redis_down_until = 0.0
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, action: str, e: Exception):
+        logger.warning(f"{action} failed, skipping duplicate detection for {self.redis_retry_after}s: {str(e)}")
+        self._redis_down_until = time.monotonic() + self.redis_retry_after
+
+    @staticmethod
+    def _load(raw) -> Optional[Dict[str, Any]]:
+        return json.loads(raw) if raw else None
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.window <= 0 or not self._redis_available():
+            return None
+        try:
+            return self._load(await self.conn.get(f"{RESULT_PREFIX}:{key}"))
+        except Exception as e:
+            self._redis_failed("Processed result lookup", e)
+            return None
+
+    async def get_for_key(self, key: str, digest: str) -> Optional[Dict[str, Any]]:
+        """The record stored under an Idempotency-Key; IdempotencyKeyConflict if it was for other bytes."""
+        if self.key_ttl <= 0 or not self._redis_available():
+            return None
+        try:
+            entry = self._load(await self.conn.get(f"{IDEMPOTENCY_PREFIX}:{key}"))
+        except Exception as e:
+            self._redis_failed("Idempotency key lookup", e)
+            return None
+        if entry is None:
+            return None
+        if entry["digest"] != digest:
+            raise IdempotencyKeyConflict("Idempotency-Key was already used for a different document")
+        return entry["record"]
+
+    async def put(self, key: str, digest: str, record: Dict[str, Any], idempotency_key: Optional[str] = None):
+        if not self._redis_available():
+            return
+        record = dict(record, stored_at=time.time())
+        try:
+            pipe = self.conn.pipeline(transaction=False)
+            if self.window > 0:
+                pipe.set(f"{RESULT_PREFIX}:{key}", json.dumps(record, default=str), ex=self.window)
+            if idempotency_key and self.key_ttl > 0:
+                entry = {"digest": digest, "record": record}
+                pipe.set(f"{IDEMPOTENCY_PREFIX}:{idempotency_key}", json.dumps(entry, default=str), ex=self.key_ttl)
+            await pipe.execute()
+        except Exception as e:
+            self._redis_failed("Storing the processed result", e)
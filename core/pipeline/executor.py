@@ -0,0 +1,60 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Callable, Dict, Optional
+
+# Default number of in-flight calls allowed per pipeline stage.
+# Each limit can be overridden with STAGE_LIMIT_<STAGE>, e.g. STAGE_LIMIT_PDF=2
+DEFAULT_STAGE_LIMITS = {
+    "read": 64,
+    "classify": 16,
+    "agent": 16,
+    "pdf": 4,
+    "route": 64,
+    "trace": 64,
+}
+
+
+class StageExecutor:
+    """
+    Runs blocking pipeline stages (PDF parsing, LLM calls, sync Redis writes)
+    on a bounded thread pool so they never block the event loop, and caps how
+    many calls of each stage may be in flight at once.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, stage_limits: Optional[Dict[str, int]] = None):
+        self.max_workers = max_workers or int(os.getenv("PIPELINE_MAX_WORKERS", "32"))
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline")
+
+        limits = dict(DEFAULT_STAGE_LIMITS)
+        limits.update(stage_limits or {})
+        for stage in limits:
+            env_value = os.getenv(f"STAGE_LIMIT_{stage.upper()}")
+            if env_value:
+                limits[stage] = int(env_value)
+        self.stage_limits = limits
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, stage: str) -> asyncio.Semaphore:
+        # Created lazily so the semaphore binds to the running event loop
+        if stage not in self._semaphores:
+            limit = self.stage_limits.get(stage, self.max_workers)
+            self._semaphores[stage] = asyncio.Semaphore(limit)
+        return self._semaphores[stage]
+
+    @asynccontextmanager
+    async def limit(self, stage: str):
+        """Concurrency slot for stages that are already natively async."""
+        async with self._semaphore(stage):
+            yield
+
+    async def run(self, stage: str, func: Callable, *args, **kwargs):
+        """Runs a blocking callable on the pool within the stage's concurrency limit."""
+        async with self._semaphore(stage):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, partial(func, *args, **kwargs))
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple, Union
+
+from core.observability.metrics import REGISTRY
+from core.pipeline.dedup import ProcessedResultStore, content_key, stored_record
+from core.pipeline.executor import StageExecutor
+from core.pipeline.spool import SpooledDocument
+from core.schemas.registry import get_schema_registry, looks_like_json
+from core.schemas.streaming import StreamingJSONAnalyzer
+
+logger = logging.getLogger(__name__)
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_seconds", "Time spent in each /process-file stage, including stage queueing", ("stage",)
+)
+AGENT_SECONDS = REGISTRY.histogram("agent_process_seconds", "Agent processing time per document", ("agent",))
+DOCUMENTS = REGISTRY.counter(
+    "documents_processed_total", "Documents processed by format, intent and routed action",
+    ("format", "intent", "action")
+)
+# kind: idempotency_key (client retry), content (same bytes within the window) or in_flight (same bytes concurrently)
+DUPLICATES = REGISTRY.counter(
+    "documents_duplicate_total", "Uploads answered from an earlier result instead of being processed", ("kind",)
+)
+
+# Spooled JSON documents above this size are parsed as a stream instead of being read whole
+JSON_STREAM_THRESHOLD = int(os.getenv("JSON_STREAM_THRESHOLD", str(8 * 1024 * 1024)))
+# Text of a streamed document handed to the classifier's LLM/keyword paths
+JSON_STREAM_HEAD = int(os.getenv("JSON_STREAM_HEAD", str(64 * 1024)))
+# Extensions the classifier treats as Email whatever their content; never stream-parsed as JSON
+TEXT_EXTENSIONS = (".eml", ".msg", ".txt")
+
+
+class UnsupportedFormatError(ValueError):
+    pass
+
+
+class DocumentPipeline:
+    """
+    Async classify -> agent -> route -> trace pipeline behind /process-file.
+
+    Blocking work (classification, agent processing, temp file I/O) is handed
+    to the StageExecutor; action routing and the trace read use native async
+    clients, so one worker can keep many uploads in flight. When an
+    IntentBatchScheduler is given, classification goes through it so LLM
+    calls from concurrent uploads are batched.
+
+    Documents are identified by the SHA-256 of their bytes (their trace is
+    trace:<sha256>). With a ProcessedResultStore, bytes re-sent with the same
+    extension and retried Idempotency-Keys are answered with the stored
+    result instead of being processed again, and identical uploads in flight
+    at the same time are processed once.
+    """
+
+    def __init__(self, classifier, email_agent, json_agent, pdf_agent, action_router, memory_store,
+                 executor: Optional[StageExecutor] = None, intent_scheduler=None,
+                 result_store: Optional[ProcessedResultStore] = None):
+        self.classifier = classifier
+        self.intent_scheduler = intent_scheduler
+        self.email_agent = email_agent
+        self.json_agent = json_agent
+        self.pdf_agent = pdf_agent
+        self.action_router = action_router
+        self.memory_store = memory_store
+        self.executor = executor or StageExecutor()
+        self.schema_registry = get_schema_registry()
+        self.json_streamer = StreamingJSONAnalyzer(self.schema_registry)
+        self.result_store = result_store
+        # content_key -> record of the upload of those bytes being processed right now
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def process(self, filename: str, document: Union[SpooledDocument, bytes],
+                      idempotency_key: Optional[str] = None, reroute: bool = False) -> Dict[str, Any]:
+        """
+        Processes one document, or answers a duplicate from the stored result
+        (marked "duplicate": true; its action is only routed again with
+        `reroute`). Takes ownership of a SpooledDocument and removes its spool
+        file when done. Raises IdempotencyKeyConflict for a key reused with
+        other bytes.
+        """
+        if isinstance(document, bytes):
+            document = SpooledDocument.from_bytes(filename, document)
+        if self.result_store is None:
+            response, _ = await self._process(filename, document)
+            return response
+
+        digest = document.digest
+        key = content_key(digest, filename)
+        try:
+            # --- 1. Client retry under the same Idempotency-Key ---
+            record, kind = None, None
+            if idempotency_key:
+                record, kind = await self.result_store.get_for_key(idempotency_key, digest), "idempotency_key"
+            # --- 2. Same bytes processed within the dedup window ---
+            if record is None:
+                record, kind = await self.result_store.get(key), "content"
+            # --- 3. Same bytes being processed right now ---
+            if record is None and key in self._in_flight:
+                record, kind = await asyncio.shield(self._in_flight[key]), "in_flight"
+        except BaseException:
+            await self._cleanup(document)
+            raise
+        if record is not None:
+            await self._cleanup(document)
+            DUPLICATES.inc(kind=kind)
+            logger.info("Duplicate document", extra={"document": filename, "digest": digest, "kind": kind})
+            return await self._replay(record, filename, reroute)
+
+        future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        try:
+            response, routed = await self._process(filename, document)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Waiters re-raise it; retrieving it here avoids the "never retrieved" warning without any
+                future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+        record = stored_record(routed, response)
+        future.set_result(record)
+        await self.result_store.put(key, digest, record, idempotency_key)
+        return response
+
+    async def _replay(self, record: Dict[str, Any], filename: str, reroute: bool) -> Dict[str, Any]:
+        response = dict(record["response"], filename=filename, duplicate=True)
+        if reroute:
+            payload = {"source_id": response["source_id"], "filename": filename,
+                       "result": response["processing_result"]}
+            with STAGE_SECONDS.time(stage="route"):
+                async with self.executor.limit("route"):
+                    response["action_router_result"] = await self.action_router.route_action(record["action"], payload)
+        return response
+
+    async def _cleanup(self, document: SpooledDocument):
+        if document.on_disk:
+            await self.executor.run("read", document.cleanup)
+
+    def _analyze_stream(self, document: SpooledDocument):
+        with document.open_text() as fp:
+            return self.json_streamer.analyze_stream(fp)
+
+    async def _process(self, filename: str, document: SpooledDocument) -> Tuple[Dict[str, Any], str]:
+        """The pipeline response for a new document and the action it was routed to."""
+        ext = os.path.splitext(filename)[1].lower()
+        # Content-addressed: uploads sharing a filename no longer overwrite each other's trace
+        source_id = document.digest
+
+        try:
+            # Read content; PDFs are handed to the agent as the spooled file itself, and large
+            # spooled JSON is never read whole, only its head for the classifier's text paths
+            stream_json = False
+            with STAGE_SECONDS.time(stage="read"):
+                if ext == ".pdf":
+                    content = None
+                elif document.on_disk and document.size > JSON_STREAM_THRESHOLD:
+                    content = await self.executor.run("read", document.head, JSON_STREAM_HEAD)
+                    stream_json = ext == ".json" or (ext not in TEXT_EXTENSIONS and looks_like_json(content))
+                    if not stream_json:
+                        content = await self.executor.run("read", document.text)
+                elif document.on_disk:
+                    content = await self.executor.run("read", document.text)
+                else:
+                    content = document.text()
+
+            # Classify; JSON is parsed and schema-matched once, for the classifier and the JSON agent
+            with STAGE_SECONDS.time(stage="classify"):
+                shared = {}
+                if stream_json:
+                    shared["analysis"] = await self.executor.run("classify", self._analyze_stream, document)
+                elif content and (ext == ".json" or looks_like_json(content)):
+                    shared["analysis"] = await self.executor.run("classify", self.schema_registry.analyze, content)
+                if self.intent_scheduler is not None:
+                    classification = await self.intent_scheduler.classify(filename, content if content else "", **shared)
+                else:
+                    classification = await self.executor.run(
+                        "classify", self.classifier.classify, filename, content if content else "", **shared
+                    )
+            logger.info("Classification result", extra={"document": filename, "classification": classification})
+
+            # Agent processing
+            agent_timer = AGENT_SECONDS.time(agent=classification["format"].lower())
+            with STAGE_SECONDS.time(stage="agent"), agent_timer:
+                if classification["format"] == "Email":
+                    result = await self.executor.run(
+                        "agent", self.email_agent.process, filename, content, classification, source_id=source_id
+                    )
+                    action = result["action"]
+                elif classification["format"] == "JSON":
+                    result = await self.executor.run(
+                        "agent", self.json_agent.process, filename, content, classification,
+                        source_id=source_id, **shared
+                    )
+                    action = "alert" if not result["valid"] else "accept"
+                elif classification["format"] == "PDF":
+                    result = await self.executor.run(
+                        "pdf", self.pdf_agent.process, document.source, classification,
+                        digest=document.digest, source_id=source_id, filename=filename
+                    )
+                    action = result.get("flag", "accepted")
+                else:
+                    raise UnsupportedFormatError("Unsupported format")
+
+            # Logged as structured fields; the writer thread summarizes them, so no formatting happens here
+            logger.info("Processing result", extra={"document": filename, "result": result})
+
+            # Action routing
+            payload = {"source_id": source_id, "filename": filename, "result": result}
+            routed = action if action in self.action_router.endpoints else "routine"
+            with STAGE_SECONDS.time(stage="route"):
+                async with self.executor.limit("route"):
+                    action_result = await self.action_router.route_action(routed, payload)
+            logger.info("Action result", extra={"document": filename, "action_result": action_result})
+            DOCUMENTS.inc(format=classification["format"], intent=classification["intent"], action=routed)
+
+            # Get full trace (logged at DEBUG, so only sampled)
+            with STAGE_SECONDS.time(stage="trace"):
+                async with self.executor.limit("trace"):
+                    trace = await self.memory_store.get_full_trace(source_id)
+            logger.debug("Redis trace data", extra={"document": filename, "trace": trace})
+        finally:
+            # Cleanup
+            await self._cleanup(document)
+
+        return {
+            "source_id": source_id,
+            "filename": filename,
+            "duplicate": False,
+            "classification": classification,
+            "processing_result": result,
+            "action_router_result": action_result,
+            "full_trace": trace
+        }, routed
+
+    async def aclose(self):
+        if self.intent_scheduler is not None:
+            await self.intent_scheduler.aclose()
+        await self.action_router.aclose()
+        await self.memory_store.close()
+        self.executor.shutdown()
@@ -0,0 +1,229 @@
+import codecs
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from io import BytesIO
+from typing import BinaryIO, Iterator, Optional, TextIO, Tuple
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Uploads up to this size stay in memory, larger ones go to a spool file
+UPLOAD_MEMORY_THRESHOLD = int(os.getenv("UPLOAD_MEMORY_THRESHOLD", str(1024 * 1024)))
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+
+
+class DocumentTooLarge(ValueError):
+    """A document over the size limit of where it came from."""
+
+
+class SpooledDocument:
+    """
+    An uploaded document's content, its size and SHA-256 digest. Small
+    documents are held in memory; larger ones live on disk, either in a
+    uniquely named spool file (so concurrent uploads with the same filename
+    never collide) or in the upload's own temporary `file`, used in place.
+    """
+
+    def __init__(self, filename: str, digest: str, size: int, data: Optional[bytes] = None,
+                 path: Optional[str] = None, file: Optional[BinaryIO] = None):
+        self.filename = filename
+        self.digest = digest
+        self.size = size
+        self.data = data
+        self.path = path
+        self.file = file
+
+    @classmethod
+    def from_bytes(cls, filename: str, data: bytes) -> "SpooledDocument":
+        return cls(filename, hashlib.sha256(data).hexdigest(), len(data), data=data)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def on_disk(self) -> bool:
+        return self.path is not None or self.file is not None
+
+    @property
+    def source(self):
+        """A path for spool files, the upload's file rewound, otherwise a file object over the in-memory bytes."""
+        if self.path is not None:
+            return self.path
+        if self.file is not None:
+            self.file.seek(0)
+            return self.file
+        return BytesIO(self.data)
+
+    def open_text(self, encoding: str = "utf-8") -> TextIO:
+        """A text stream over the whole content, with its own file descriptor; the caller closes it."""
+        if self.path is not None:
+            return open(self.path, "r", encoding=encoding)
+        if self.file is not None:
+            binary = open(os.dup(self.file.fileno()), "rb")
+            binary.seek(0)
+            return io.TextIOWrapper(binary, encoding=encoding)
+        return io.TextIOWrapper(BytesIO(self.data), encoding=encoding)
+
+    @contextmanager
+    def view(self) -> Iterator[memoryview]:
+        """Zero-copy view of the content (memory-mapped when on disk)."""
+        if not self.on_disk:
+            yield memoryview(self.data)
+            return
+        if self.size == 0:
+            yield memoryview(b"")
+            return
+        with self._open_binary() as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+
+    @contextmanager
+    def _open_binary(self) -> Iterator[BinaryIO]:
+        if self.path is not None:
+            with open(self.path, "rb") as f:
+                yield f
+        else:
+            yield self.file
+
+    def text(self, encoding: str = "utf-8") -> str:
+        with self.view() as view:
+            return codecs.decode(view, encoding)
+
+    def head(self, size: int, encoding: str = "utf-8") -> str:
+        """The first `size` bytes as text; a character cut at the boundary is dropped."""
+        with self.view() as view:
+            return codecs.decode(view[:size], encoding, errors="ignore")
+
+    def cleanup(self):
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+        if self.file is not None:
+            self.file.close()
+        self.path = None
+        self.file = None
+        self.data = None
+
+
+class _Spooler:
+    """Accumulates chunks in memory until `threshold`, then rolls over to a spool file."""
+
+    def __init__(self, filename: str, threshold: int, directory: Optional[str]):
+        self.filename = filename
+        self.threshold = threshold
+        self.directory = directory
+        self.hasher = hashlib.sha256()
+        self.buffer = bytearray()
+        self.file = None
+        self.path = None
+        self.size = 0
+
+    def write(self, chunk: bytes):
+        self.hasher.update(chunk)
+        self.size += len(chunk)
+        if self.file is None and self.size > self.threshold:
+            suffix = os.path.splitext(self.filename)[1]
+            fd, self.path = tempfile.mkstemp(prefix="upload_", suffix=suffix, dir=self.directory)
+            self.file = os.fdopen(fd, "wb")
+            self.file.write(self.buffer)
+            self.buffer = bytearray()
+        if self.file is not None:
+            self.file.write(chunk)
+        else:
+            self.buffer += chunk
+
+    def finish(self) -> SpooledDocument:
+        digest = self.hasher.hexdigest()
+        if self.file is None:
+            return SpooledDocument(self.filename, digest, self.size, data=bytes(self.buffer))
+        self.file.close()
+        return SpooledDocument(self.filename, digest, self.size, path=self.path)
+
+    def abort(self):
+        if self.file is not None:
+            self.file.close()
+            os.remove(self.path)
+
+
+def spool_stream(filename: str, fp: BinaryIO, max_size: Optional[int] = None, threshold: Optional[int] = None,
+                 chunk_size: Optional[int] = None, directory: Optional[str] = None) -> SpooledDocument:
+    """
+    Blocking counterpart of spool_upload for a readable binary stream, such
+    as an archive member. Raises DocumentTooLarge, leaving no spool file
+    behind, once more than `max_size` bytes were read.
+    """
+    spooler = _Spooler(filename, UPLOAD_MEMORY_THRESHOLD if threshold is None else threshold,
+                       directory or UPLOAD_SPOOL_DIR)
+    chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+    try:
+        while True:
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                break
+            if max_size is not None and spooler.size + len(chunk) > max_size:
+                raise DocumentTooLarge(f"{filename} is larger than {max_size} bytes")
+            spooler.write(chunk)
+        return spooler.finish()
+    except BaseException:
+        spooler.abort()
+        raise
+
+
+def _disk_file(file) -> Optional[BinaryIO]:
+    """The OS-level file behind an upload's file object, or None while its content is held in memory."""
+    if isinstance(file, tempfile.SpooledTemporaryFile):
+        # Checked without fileno(), which would force an in-memory upload to disk
+        return file._file if file._rolled else None
+    try:
+        file.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+    return file
+
+
+def _hash_file(file: BinaryIO) -> Tuple[str, int]:
+    file.seek(0)
+    digest = hashlib.file_digest(file, "sha256").hexdigest()
+    return digest, os.fstat(file.fileno()).st_size
+
+
+async def spool_upload(upload, executor=None, threshold: Optional[int] = None,
+                       chunk_size: Optional[int] = None, directory: Optional[str] = None) -> SpooledDocument:
+    """
+    Turns an UploadFile into a SpooledDocument. An upload Starlette already
+    rolled over to disk is hashed and used in place, without a copy. One
+    still in memory is streamed chunk by chunk into a SpooledDocument,
+    hashing as it goes, so peak memory is bounded by `threshold` plus one
+    chunk. Disk I/O goes through the executor's "read" stage.
+    """
+    disk_file = _disk_file(upload.file)
+    if disk_file is not None:
+        if executor is not None:
+            digest, size = await executor.run("read", _hash_file, disk_file)
+        else:
+            digest, size = _hash_file(disk_file)
+        return SpooledDocument(upload.filename, digest, size, file=disk_file)
+
+    spooler = _Spooler(
+        upload.filename,
+        UPLOAD_MEMORY_THRESHOLD if threshold is None else threshold,
+        directory or UPLOAD_SPOOL_DIR
+    )
+    chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            if executor is not None and (spooler.file is not None or spooler.size + len(chunk) > spooler.threshold):
+                await executor.run("read", spooler.write, chunk)
+            else:
+                spooler.write(chunk)
+        return spooler.finish()
+    except BaseException:
+        spooler.abort()
+        raise
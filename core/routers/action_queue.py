@@ -0,0 +1,309 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+ACTION_STREAM = "actions:outbound"
+ACTION_GROUP = "action_dispatchers"
+DEAD_LETTER_KEY = "actions:dead_letter"
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _id_timestamp(message_id: str) -> float:
+    # Stream ids are "<unix ms>-<seq>"
+    return int(message_id.split("-")[0]) / 1000
+
+
+class DurableActionQueue:
+    """
+    Outbound actions persisted in a Redis stream and consumed through a
+    consumer group, so they survive restarts and are shared by all workers.
+
+    Unacknowledged messages stay in the group's pending list and are
+    re-claimed with exponential backoff based on their delivery count; after
+    `max_attempts` deliveries they are moved to a dead-letter list. Messages
+    that were never sent (the endpoint's circuit was open) are released
+    without using up an attempt.
+    """
+
+    def __init__(self, conn, stream: str = ACTION_STREAM, group: str = ACTION_GROUP,
+                 dead_letter_key: str = DEAD_LETTER_KEY, max_attempts: Optional[int] = None,
+                 base_backoff: Optional[float] = None, maxlen: Optional[int] = None):
+        self.conn = conn
+        self.stream = stream
+        self.group = group
+        self.dead_letter_key = dead_letter_key
+        self.max_attempts = max_attempts or int(os.getenv("ACTION_QUEUE_MAX_ATTEMPTS", "8"))
+        self.base_backoff = base_backoff or float(os.getenv("ACTION_QUEUE_BACKOFF", "2"))
+        self.maxlen = maxlen or int(os.getenv("ACTION_QUEUE_MAXLEN", "1000000"))
+        # Pending entries read per XPENDING page, and at most per claim_retries call
+        self.claim_page_size = 100
+        self.claim_scan_limit = int(os.getenv("ACTION_QUEUE_CLAIM_SCAN", "10000"))
+        self._group_ready = False
+
+    async def ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            await self.conn.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def enqueue(self, action: str, endpoint: str, payload: Any) -> str:
+        await self.ensure_group()
+        message_id = await self.conn.xadd(
+            self.stream,
+            {"action": action, "endpoint": endpoint, "payload": json.dumps(payload, default=str)},
+            maxlen=self.maxlen
+        )
+        return _decode(message_id)
+
+    @staticmethod
+    def _message(message_id, fields, consumer: str, attempts: int = 1) -> Dict[str, Any]:
+        fields = {_decode(k): _decode(v) for k, v in fields.items()}
+        return {
+            "id": _decode(message_id),
+            "action": fields["action"],
+            "endpoint": fields["endpoint"],
+            "payload": json.loads(fields["payload"]),
+            "attempts": attempts,
+            "consumer": consumer,
+        }
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> List[Dict[str, Any]]:
+        """New messages for this consumer, blocking up to `block_ms` when there are none."""
+        await self.ensure_group()
+        response = await self.conn.xreadgroup(self.group, consumer, {self.stream: ">"}, count=count, block=block_ms)
+        return [
+            self._message(message_id, fields, consumer)
+            for _, messages in (response or [])
+            for message_id, fields in messages
+        ]
+
+    def backoff(self, attempts: int) -> float:
+        return self.base_backoff * (2 ** (attempts - 1))
+
+    async def claim_retries(self, consumer: str, count: int) -> List[Dict[str, Any]]:
+        """
+        Re-claims up to `count` failed (still pending) messages whose backoff
+        has elapsed. The pending list is paged through oldest first, so
+        messages still backing off at its head do not hold back later ones.
+        """
+        await self.ensure_group()
+        due: Dict[str, int] = {}
+        start, scanned = "-", 0
+        while len(due) < count and scanned < self.claim_scan_limit:
+            pending = await self.conn.xpending_range(
+                self.stream, self.group, min=start, max="+", count=self.claim_page_size,
+                idle=int(self.base_backoff * 1000)
+            )
+            for p in pending:
+                if p["time_since_delivered"] >= self.backoff(p["times_delivered"]) * 1000:
+                    due[_decode(p["message_id"])] = p["times_delivered"]
+                    if len(due) == count:
+                        break
+            scanned += len(pending)
+            if len(pending) < self.claim_page_size:
+                break
+            start = f"({_decode(pending[-1]['message_id'])}"
+        if not due:
+            return []
+        claimed = await self.conn.xclaim(
+            self.stream, self.group, consumer, int(self.base_backoff * 1000), list(due)
+        )
+        return [
+            self._message(message_id, fields, consumer, due[_decode(message_id)] + 1)
+            for message_id, fields in claimed
+            if fields  # entries trimmed from the stream come back empty
+        ]
+
+    async def ack(self, message_ids: List[str]):
+        if not message_ids:
+            return
+        pipe = self.conn.pipeline(transaction=True)
+        pipe.xack(self.stream, self.group, *message_ids)
+        pipe.xdel(self.stream, *message_ids)
+        await pipe.execute()
+
+    async def release(self, messages: List[Dict[str, Any]]):
+        """
+        Returns messages that were not attempted to the pending list with the
+        delivery count they had before this delivery, so they are retried
+        after their backoff without moving closer to the dead-letter list.
+        """
+        if not messages:
+            return
+        pipe = self.conn.pipeline(transaction=False)
+        for message in messages:
+            pipe.xclaim(self.stream, self.group, message["consumer"], 0, [message["id"]],
+                        retrycount=message["attempts"] - 1, justid=True)
+        await pipe.execute()
+
+    async def dead_letter(self, message: Dict[str, Any], error: str):
+        pipe = self.conn.pipeline(transaction=True)
+        pipe.lpush(self.dead_letter_key, json.dumps(dict(message, error=error, failed_at=time.time()), default=str))
+        pipe.xack(self.stream, self.group, message["id"])
+        pipe.xdel(self.stream, message["id"])
+        await pipe.execute()
+
+    async def dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return [json.loads(item) for item in await self.conn.lrange(self.dead_letter_key, 0, limit - 1)]
+
+    async def stats(self) -> Dict[str, Any]:
+        await self.ensure_group()
+        now = time.time()
+        depth = await self.conn.xlen(self.stream)
+        summary = await self.conn.xpending(self.stream, self.group)
+        oldest_pending = _decode(summary["min"]) if summary["pending"] else None
+
+        # Oldest message not yet handed to any dispatcher
+        groups = {_decode(g["name"]): g for g in await self.conn.xinfo_groups(self.stream)}
+        last_delivered = _decode(groups[self.group]["last-delivered-id"])
+        undelivered = await self.conn.xrange(self.stream, min=f"({last_delivered}", count=1)
+        oldest_undelivered = _decode(undelivered[0][0]) if undelivered else None
+
+        oldest = [_id_timestamp(i) for i in (oldest_pending, oldest_undelivered) if i]
+        return {
+            "depth": depth,
+            "pending": summary["pending"],
+            "undelivered": depth - summary["pending"],
+            "lag_seconds": max(0.0, now - min(oldest)) if oldest else 0.0,
+            "dead_letters": await self.conn.llen(self.dead_letter_key),
+        }
+
+
+class QueuedActionRouter:
+    """
+    Drop-in for AsyncActionRouter in the pipeline: route_action only appends
+    the action to the durable queue, so request latency does not depend on
+    the downstream endpoints.
+    """
+
+    def __init__(self, queue: DurableActionQueue, router):
+        self.queue = queue
+        self.router = router
+        self.endpoints = router.endpoints
+
+    async def route_action(self, action: str, payload: dict) -> dict:
+        url = self.endpoints.get(action)
+        if not url:
+            return {"status": "error", "message": f"No endpoint for action: {action}"}
+        try:
+            message_id = await self.queue.enqueue(action, url, payload)
+        except Exception as e:
+            # Queue unavailable: fall back to delivering inline rather than losing the action
+            logger.error(f"Failed to enqueue {action} action: {str(e)}")
+            return await self.router.route_action(action, payload, wait=True)
+        return {"status": "enqueued", "endpoint": url, "message_id": message_id}
+
+    async def aclose(self):
+        await self.router.aclose()
+
+
+class ActionDispatcher:
+    """
+    Pool of background workers draining the DurableActionQueue through the
+    AsyncActionRouter (pooled client + circuit breakers). Each read is grouped
+    per endpoint; actions listed in ACTION_BATCH_ACTIONS are POSTed as one
+    JSON array to their endpoint, the rest are sent concurrently. Messages
+    an open circuit rejected are released back to the queue, so an outage
+    does not exhaust their attempts.
+    """
+
+    def __init__(self, queue: DurableActionQueue, router, workers: Optional[int] = None,
+                 batch_size: Optional[int] = None, block_ms: int = 1000, batch_actions: Optional[List[str]] = None):
+        self.queue = queue
+        self.router = router
+        self.workers = workers or int(os.getenv("ACTION_DISPATCH_WORKERS", "4"))
+        self.batch_size = batch_size or int(os.getenv("ACTION_DISPATCH_BATCH", "50"))
+        self.block_ms = block_ms
+        if batch_actions is None:
+            batch_actions = [a for a in os.getenv("ACTION_BATCH_ACTIONS", "").split(",") if a]
+        self.batch_endpoints = {router.endpoints[a] for a in batch_actions if a in router.endpoints}
+        self.consumer_prefix = f"{socket.gethostname()}-{os.getpid()}"
+        self.delivered = 0
+        self.failed = 0
+        self.dead_lettered = 0
+        self.deferred = 0
+        self._tasks: List[asyncio.Task] = []
+
+    async def _send(self, endpoint: str, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Delivers messages to one endpoint; returns the router's result per message."""
+        if endpoint in self.batch_endpoints and len(messages) > 1:
+            result = await self.router.deliver(endpoint, [m["payload"] for m in messages], max_retries=1)
+            return [result] * len(messages)
+        return await asyncio.gather(*[
+            self.router.deliver(endpoint, m["payload"], max_retries=1) for m in messages
+        ])
+
+    async def dispatch(self, messages: List[Dict[str, Any]]):
+        by_endpoint: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for message in messages:
+            by_endpoint[message["endpoint"]].append(message)
+
+        results = await asyncio.gather(*[self._send(endpoint, batch) for endpoint, batch in by_endpoint.items()])
+        acked, released = [], []
+        for batch, batch_results in zip(by_endpoint.values(), results):
+            for message, result in zip(batch, batch_results):
+                if result["status"] == "success":
+                    acked.append(message["id"])
+                    self.delivered += 1
+                elif "circuit" in result:
+                    # Never sent, so it does not count as an attempt
+                    released.append(message)
+                    self.deferred += 1
+                elif message["attempts"] >= self.queue.max_attempts:
+                    await self.queue.dead_letter(message, result.get("error", "failed"))
+                    self.dead_lettered += 1
+                else:
+                    # Left pending; claim_retries picks it up again after its backoff
+                    self.failed += 1
+        await self.queue.ack(acked)
+        await self.queue.release(released)
+
+    async def _work(self, consumer: str):
+        while True:
+            try:
+                messages = await self.queue.claim_retries(consumer, self.batch_size)
+                messages += await self.queue.read(consumer, self.batch_size, self.block_ms)
+                if messages:
+                    await self.dispatch(messages)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Action dispatcher {consumer} error: {str(e)}")
+                await asyncio.sleep(1)
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._work(f"{self.consumer_prefix}-{i}")) for i in range(self.workers)
+            ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "delivered": self.delivered,
+            "failed_attempts": self.failed,
+            "dead_lettered": self.dead_lettered,
+            "deferred_circuit_open": self.deferred,
+        }
@@ -1,5 +1,22 @@
+import asyncio
+import logging
+import os
+import random
 import requests
 import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from core.observability.metrics import REGISTRY
+from core.routers.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_SECONDS = REGISTRY.histogram(
+    "action_delivery_seconds", "Action delivery time including retries, by endpoint and outcome",
+    ("endpoint", "status")
+)
 
 class ActionRouter:
     def __init__(self):
@@ -36,3 +53,155 @@ class ActionRouter:
             "error": str(last_exception),
             "retries": self.max_retries
         }
+
+
+class AsyncActionRouter(ActionRouter):
+    """
+    Non-blocking variant of ActionRouter for use from the async pipeline.
+
+    - One pooled httpx.AsyncClient with keep-alive is shared by all calls.
+    - Retries back off with full jitter on asyncio.sleep, so a slow endpoint
+      only delays its own request.
+    - Each endpoint has a CircuitBreaker: while an endpoint is down, calls
+      fail fast instead of each spending the whole retry budget.
+    - In fire-and-forget mode (wait=False, or ACTION_ROUTER_MODE=async) the
+      action is queued for background workers and the call returns at once.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        super().__init__()
+        self.max_delay = float(os.getenv("ACTION_MAX_BACKOFF", "10"))
+        self.fire_and_forget = os.getenv("ACTION_ROUTER_MODE", "sync") == "async"
+        self.queue_size = int(os.getenv("ACTION_QUEUE_SIZE", "1000"))
+        self.queue_workers = int(os.getenv("ACTION_QUEUE_WORKERS", "8"))
+        self.breakers = {
+            url: CircuitBreaker(
+                failure_threshold=int(os.getenv("ACTION_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("ACTION_BREAKER_RESET", "30"))
+            )
+            for url in self.endpoints.values()
+        }
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(5),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30),
+                transport=self._transport
+            )
+        return self._client
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: spreads retries from many requests over the whole window
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    async def deliver(self, url: str, payload: Any, max_retries: Optional[int] = None) -> dict:
+        """
+        POSTs `payload` to `url` with retries and the endpoint's circuit
+        breaker. A call the open circuit rejected carries a "circuit" key.
+        """
+        start = time.perf_counter()
+        result = await self._deliver_with_retries(url, payload, max_retries or self.max_retries)
+        status = "circuit_open" if "circuit" in result else result["status"]
+        DELIVERY_SECONDS.observe(time.perf_counter() - start, endpoint=url, status=status)
+        return result
+
+    async def _deliver_with_retries(self, url: str, payload: Any, max_retries: int) -> dict:
+        breaker = self.breakers.setdefault(url, CircuitBreaker())
+        last_exception = None
+        for attempt in range(1, max_retries + 1):
+            if not breaker.allow():
+                return {
+                    "status": "failed",
+                    "endpoint": url,
+                    "error": "Circuit open: endpoint is failing, call skipped",
+                    "circuit": breaker.state
+                }
+            try:
+                response = await self.client.post(url, json=payload)
+                if response.status_code >= 500:
+                    raise httpx.HTTPStatusError(
+                        f"Server error {response.status_code}", request=response.request, response=response
+                    )
+                result = {
+                    "status": "success",
+                    "endpoint": url,
+                    "response": response.json() if response.content else {}
+                }
+                breaker.record_success()
+                return result
+            except Exception as e:
+                last_exception = e
+                breaker.record_failure()
+                if attempt < max_retries:
+                    await asyncio.sleep(self._backoff(attempt))
+            except BaseException:
+                # Cancelled mid-call: no outcome, but a half-open trial must not stay claimed forever
+                breaker.release()
+                raise
+        # If all retries failed
+        return {
+            "status": "failed",
+            "endpoint": url,
+            "error": str(last_exception),
+            "retries": max_retries
+        }
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.queue_workers)]
+
+    async def _work(self):
+        while True:
+            url, payload = await self._queue.get()
+            try:
+                result = await self.deliver(url, payload)
+                if result["status"] != "success":
+                    logger.error(f"Queued action to {url} failed: {result.get('error')}")
+            except Exception as e:
+                logger.error(f"Queued action to {url} failed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def route_action(self, action: str, payload: dict, wait: Optional[bool] = None) -> dict:
+        url = self.endpoints.get(action)
+        if not url:
+            return {"status": "error", "message": f"No endpoint for action: {action}"}
+
+        if wait is None:
+            wait = not self.fire_and_forget
+        if not wait:
+            self._ensure_workers()
+            try:
+                self._queue.put_nowait((url, payload))
+                return {"status": "queued", "endpoint": url}
+            except asyncio.QueueFull:
+                # Backpressure: deliver inline rather than dropping the action
+                pass
+        return await self.deliver(url, payload)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuits": {url: breaker.snapshot() for url, breaker in self.breakers.items()},
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    async def aclose(self, drain_timeout: float = 5.0):
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Dropping {self._queue.qsize()} queued actions on shutdown")
+            for worker in self._workers:
+                worker.cancel()
+            self._queue = None
+            self._workers = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from apscheduler.triggers.cron import CronTrigger
+
+logger = logging.getLogger(__name__)
+
+CRON_JOBS_KEY = "cron:jobs"
+CRON_NEXT_KEY = "cron:next"
+# Set once the legacy job file has been imported, so deleted jobs are not re-imported on restart
+CRON_IMPORTED_KEY = "cron:imported"
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def build_trigger(schedule: Dict[str, Any]) -> CronTrigger:
+    """CronTrigger from the job's schedule fields (minute, hour, day_of_week, ...). Raises ValueError/TypeError."""
+    return CronTrigger(timezone=os.getenv("CRON_TIMEZONE") or None, **schedule)
+
+
+def next_fire_time(schedule: Dict[str, Any], after: float) -> Optional[float]:
+    fire = build_trigger(schedule).get_next_fire_time(None, datetime.fromtimestamp(after, timezone.utc))
+    return fire.timestamp() if fire else None
+
+
+class DistributedCronScheduler:
+    """
+    Cron scheduler that is safe to run in every worker of every node.
+
+    Jobs live in Redis (`cron:jobs`) with their next fire time in a sorted set
+    (`cron:next`). Each worker polls for due jobs once per tick; a fire is
+    claimed with `SET cron:lock:<job>:<fire time> NX`, so exactly one worker
+    dispatches it, straight into the workflow engine.
+
+    Misfires: a fire claimed more than `misfire_grace_time` seconds late
+    (e.g. every worker was down) is skipped and counted; missed fires are
+    coalesced into the next one rather than replayed.
+    """
+
+    def __init__(self, conn, engine, tick: Optional[float] = None, misfire_grace: Optional[float] = None,
+                 lock_ttl: int = 300):
+        self.conn = conn
+        self.engine = engine
+        self.tick = tick or float(os.getenv("CRON_TICK_SECONDS", "1"))
+        self.misfire_grace = misfire_grace or float(os.getenv("CRON_MISFIRE_GRACE", "60"))
+        self.lock_ttl = lock_ttl
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _stats_key(job_id: str) -> str:
+        return f"cron:stats:{job_id}"
+
+    # --- Job management ---
+    async def add_job(self, job: Dict[str, Any]) -> float:
+        """Stores (or replaces) a job and schedules its next fire. Returns the next fire time."""
+        next_fire = next_fire_time(job["schedule"], time.time())
+        if next_fire is None:
+            raise ValueError("Schedule never fires")
+        pipe = self.conn.pipeline(transaction=True)
+        pipe.hset(CRON_JOBS_KEY, job["id"], json.dumps(job))
+        pipe.zadd(CRON_NEXT_KEY, {job["id"]: next_fire})
+        await pipe.execute()
+        return next_fire
+
+    async def remove_job(self, job_id: str) -> bool:
+        pipe = self.conn.pipeline(transaction=True)
+        pipe.hdel(CRON_JOBS_KEY, job_id)
+        pipe.zrem(CRON_NEXT_KEY, job_id)
+        pipe.delete(self._stats_key(job_id))
+        removed, _, _ = await pipe.execute()
+        return bool(removed)
+
+    async def import_jobs(self, jobs: List[Dict[str, Any]]) -> int:
+        """
+        One-off import of jobs that are not in Redis yet (e.g. from the old
+        lib/cron-jobs.json). Once an import has completed it is never repeated,
+        so a job deleted through the API stays deleted across restarts.
+        """
+        if await self.conn.exists(CRON_IMPORTED_KEY):
+            return 0
+        imported = 0
+        for job in jobs:
+            if not await self.conn.hexists(CRON_JOBS_KEY, job["id"]):
+                await self.add_job(job)
+                imported += 1
+        # Marked only after every job was added; workers importing concurrently skip jobs already present
+        await self.conn.set(CRON_IMPORTED_KEY, str(time.time()), nx=True)
+        return imported
+
+    async def list_jobs(self) -> List[Dict[str, Any]]:
+        """Jobs with their next fire time and fire metrics."""
+        jobs = {_decode(k): json.loads(v) for k, v in (await self.conn.hgetall(CRON_JOBS_KEY)).items()}
+        pipe = self.conn.pipeline(transaction=False)
+        for job_id in jobs:
+            pipe.zscore(CRON_NEXT_KEY, job_id)
+            pipe.hgetall(self._stats_key(job_id))
+        results = await pipe.execute()
+        listed = []
+        for i, (job_id, job) in enumerate(jobs.items()):
+            next_fire, stats = results[2 * i], results[2 * i + 1]
+            job = dict(job, next_fire=next_fire)
+            job["stats"] = {_decode(k): json.loads(v) for k, v in stats.items()}
+            listed.append(job)
+        return listed
+
+    # --- Firing ---
+    async def _claim(self, job_id: str, fire_time: float) -> bool:
+        return bool(await self.conn.set(f"cron:lock:{job_id}:{fire_time!r}", "1", nx=True, ex=self.lock_ttl))
+
+    async def _fire(self, job_id: str, fire_time: float, now: float):
+        raw = await self.conn.hget(CRON_JOBS_KEY, job_id)
+        if raw is None:
+            await self.conn.zrem(CRON_NEXT_KEY, job_id)
+            return
+        job = json.loads(raw)
+
+        # Reschedule first so a slow dispatch never delays the next fire; missed fires collapse into one
+        next_fire = next_fire_time(job["schedule"], max(now, fire_time + 0.001))
+        if next_fire is None:
+            await self.conn.zrem(CRON_NEXT_KEY, job_id)
+        else:
+            await self.conn.zadd(CRON_NEXT_KEY, {job_id: next_fire})
+
+        stats_key = self._stats_key(job_id)
+        lateness = now - fire_time
+        grace = job.get("misfire_grace_time", self.misfire_grace)
+        if lateness > grace:
+            logger.warning(f"Cron job {job_id} misfired: {lateness:.1f}s late (grace {grace}s)")
+            pipe = self.conn.pipeline(transaction=False)
+            pipe.hincrby(stats_key, "misfires", 1)
+            pipe.hset(stats_key, "last_misfire", json.dumps(fire_time))
+            await pipe.execute()
+            return
+
+        fields = {"last_scheduled": fire_time}
+        try:
+            run = await self.engine.submit(job["workflowId"], job.get("inputPayload") or {}, trigger="cron")
+            fields["last_run_id"] = run.id
+            fields["last_status"] = "dispatched"
+        except Exception as e:
+            logger.error(f"Cron job {job_id} failed to dispatch: {str(e)}")
+            fields["last_status"] = "error"
+            fields["last_error"] = str(e)
+        fields["last_fired"] = time.time()
+        # Time from the scheduled fire to the run being queued in the engine
+        fields["last_latency_ms"] = round((fields["last_fired"] - fire_time) * 1000, 3)
+
+        pipe = self.conn.pipeline(transaction=False)
+        pipe.hset(stats_key, mapping={k: json.dumps(v) for k, v in fields.items()})
+        pipe.hincrby(stats_key, "fires", 1)
+        await pipe.execute()
+
+    async def run_due(self) -> int:
+        """Fires every due job this worker manages to claim; returns how many it claimed."""
+        now = time.time()
+        due = await self.conn.zrangebyscore(CRON_NEXT_KEY, "-inf", now, withscores=True)
+        claimed = 0
+        for job_id, fire_time in due:
+            job_id = _decode(job_id)
+            if await self._claim(job_id, fire_time):
+                claimed += 1
+                await self._fire(job_id, fire_time, now)
+        return claimed
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cron scheduler tick failed: {str(e)}")
+            await asyncio.sleep(self.tick)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,268 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+SCHEMAS_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "config", "json_schemas.json")
+
+# validator(value, path, anomalies): appends "<json path>: <problem>" for every violation
+Validator = Callable[[Any, str, List[str]], None]
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_JSON_START = re.compile(r"\s*[\[{]")
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None,
+}
+
+_TYPE_NAMES = {str: "string", bool: "boolean", int: "integer", float: "number", list: "array", dict: "object",
+               type(None): "null"}
+
+
+class SchemaCompileError(ValueError):
+    pass
+
+
+class AnomalyLimitReached(Exception):
+    pass
+
+
+class AnomalyList(list):
+    """Anomaly list that raises AnomalyLimitReached instead of growing past `limit`, ending validation early."""
+
+    def __init__(self, limit: Optional[int] = None):
+        super().__init__()
+        self.limit = limit
+        self.truncated = False
+
+    def append(self, anomaly: str):
+        if self.limit is not None and len(self) >= self.limit:
+            self.truncated = True
+            raise AnomalyLimitReached()
+        super().append(anomaly)
+
+    def note_truncation(self):
+        super().append(f"$: more anomalies not reported (limit {self.limit})")
+
+
+def child_path(path: str, key: Any) -> str:
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+    return f"{path}.{key}" if _IDENTIFIER.match(key) else f"{path}[{json.dumps(key)}]"
+
+
+def _type_name(value: Any) -> str:
+    return _TYPE_NAMES.get(type(value), type(value).__name__)
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """
+    Compiles a JSON Schema subset into one closure per node: type, enum,
+    minimum/maximum, minLength/maxLength, pattern, required, properties,
+    additionalProperties (bool), items, minItems/maxItems. Checks on a node
+    stop at a type mismatch, so one wrong value gives one anomaly.
+    """
+    checks: List[Callable[[Any, str, List[str]], bool]] = []
+
+    if "type" in schema:
+        types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        unknown = [t for t in types if t not in _TYPE_CHECKS]
+        if unknown:
+            raise SchemaCompileError(f"Unknown schema type(s): {unknown}")
+        type_checks = [_TYPE_CHECKS[t] for t in types]
+        expected = " or ".join(types)
+
+        def check_type(value, path, anomalies):
+            if any(check(value) for check in type_checks):
+                return True
+            anomalies.append(f"{path}: expected {expected}, got {_type_name(value)}")
+            return False
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value, path, anomalies):
+            if value not in allowed:
+                anomalies.append(f"{path}: must be one of {json.dumps(allowed)}")
+            return True
+        checks.append(check_enum)
+
+    bounds = [(key, schema[key]) for key in ("minimum", "maximum") if key in schema]
+    if bounds:
+        def check_bounds(value, path, anomalies):
+            if _TYPE_CHECKS["number"](value):
+                for key, bound in bounds:
+                    if (value < bound) if key == "minimum" else (value > bound):
+                        anomalies.append(f"{path}: {value} is {'below minimum' if key == 'minimum' else 'above maximum'} {bound}")
+            return True
+        checks.append(check_bounds)
+
+    if any(key in schema for key in ("minLength", "maxLength", "pattern")):
+        min_length, max_length = schema.get("minLength"), schema.get("maxLength")
+        pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+
+        def check_string(value, path, anomalies):
+            if isinstance(value, str):
+                if min_length is not None and len(value) < min_length:
+                    anomalies.append(f"{path}: shorter than {min_length} characters")
+                if max_length is not None and len(value) > max_length:
+                    anomalies.append(f"{path}: longer than {max_length} characters")
+                if pattern is not None and not pattern.search(value):
+                    anomalies.append(f"{path}: does not match {pattern.pattern}")
+            return True
+        checks.append(check_string)
+
+    required = list(schema.get("required", []))
+    properties = {key: compile_schema(sub) for key, sub in schema.get("properties", {}).items()}
+    closed = schema.get("additionalProperties", True) is False
+    if required or properties or closed:
+        def check_object(value, path, anomalies):
+            if isinstance(value, dict):
+                for key in required:
+                    if key not in value:
+                        anomalies.append(f"{child_path(path, key)}: missing required field")
+                for key, validate in properties.items():
+                    if key in value:
+                        validate(value[key], child_path(path, key), anomalies)
+                if closed:
+                    for key in value:
+                        if key not in properties:
+                            anomalies.append(f"{child_path(path, key)}: unexpected field")
+            return True
+        checks.append(check_object)
+
+    items = compile_schema(schema["items"]) if "items" in schema else None
+    min_items, max_items = schema.get("minItems"), schema.get("maxItems")
+    if items is not None or min_items is not None or max_items is not None:
+        def check_array(value, path, anomalies):
+            if isinstance(value, list):
+                if min_items is not None and len(value) < min_items:
+                    anomalies.append(f"{path}: fewer than {min_items} items")
+                if max_items is not None and len(value) > max_items:
+                    anomalies.append(f"{path}: more than {max_items} items")
+                if items is not None:
+                    for i, item in enumerate(value):
+                        items(item, f"{path}[{i}]", anomalies)
+            return True
+        checks.append(check_array)
+
+    def validate(value, path, anomalies):
+        for check in checks:
+            if not check(value, path, anomalies):
+                return
+    return validate
+
+
+class CompiledSchema:
+    def __init__(self, name: str, schema: Dict[str, Any], intent: Optional[str] = None,
+                 discriminator: Optional[Iterable[str]] = None):
+        self.name = name
+        self.intent = intent or name
+        # Keys whose presence identifies this schema; the required keys unless configured
+        self.discriminator = frozenset(discriminator or schema.get("required", []))
+        if not self.discriminator:
+            raise SchemaCompileError(f"Schema {name} needs a discriminator or required keys")
+        self.schema = schema
+        self.validator = compile_schema(schema)
+
+    def validate(self, data: Any, limit: Optional[int] = None) -> List[str]:
+        """Anomalies of `data`; stops after `limit` of them and adds a note saying so."""
+        anomalies = AnomalyList(limit)
+        try:
+            self.validator(data, "$", anomalies)
+        except AnomalyLimitReached:
+            anomalies.note_truncation()
+        return anomalies
+
+
+class JSONAnalysis:
+    """One parse, schema match and validation of a JSON document, shared by the classifier and the JSON agent."""
+
+    def __init__(self, data: Any = None, error: Optional[str] = None, schema: Optional[CompiledSchema] = None,
+                 anomalies: Optional[List[str]] = None):
+        self.data = data
+        self.error = error
+        self.schema = schema
+        self.anomalies = anomalies or []
+
+    @property
+    def valid_json(self) -> bool:
+        return self.error is None
+
+    @property
+    def intent(self) -> Optional[str]:
+        return self.schema.intent if self.schema else None
+
+
+class SchemaRegistry:
+    """
+    Partner JSON schemas from config/json_schemas.json, compiled once.
+
+    Schemas are indexed by their discriminator keys (the schema's required
+    keys unless a "discriminator" is configured), so matching a document
+    only looks at schemas sharing at least one of its top-level keys. The
+    most specific match (most discriminator keys, then config order) wins.
+    """
+
+    def __init__(self, schemas: List[Dict[str, Any]], max_anomalies: Optional[int] = None):
+        self.max_anomalies = max_anomalies or int(os.getenv("JSON_MAX_ANOMALIES", "100"))
+        self.schemas = [
+            CompiledSchema(entry["name"], entry["schema"], entry.get("intent"), entry.get("discriminator"))
+            for entry in schemas
+        ]
+        self._index: Dict[str, List[int]] = {}
+        for position, schema in enumerate(self.schemas):
+            for key in schema.discriminator:
+                self._index.setdefault(key, []).append(position)
+
+    def candidates(self, keys: Iterable[str]) -> List[CompiledSchema]:
+        positions = sorted({position for key in keys for position in self._index.get(key, ())})
+        return [self.schemas[position] for position in positions]
+
+    def match_keys(self, keys: Iterable[str]) -> Optional[CompiledSchema]:
+        keys = set(keys)
+        best = None
+        for schema in self.candidates(keys):
+            if schema.discriminator <= keys and (best is None or len(schema.discriminator) > len(best.discriminator)):
+                best = schema
+        return best
+
+    def match(self, data: Any) -> Optional[CompiledSchema]:
+        return self.match_keys(data.keys()) if isinstance(data, dict) else None
+
+    def analyze_data(self, data: Any) -> JSONAnalysis:
+        schema = self.match(data)
+        return JSONAnalysis(data, schema=schema, anomalies=schema.validate(data, self.max_anomalies) if schema else [])
+
+    def analyze(self, content: str) -> JSONAnalysis:
+        try:
+            data = json.loads(content)
+        except (TypeError, ValueError) as e:
+            return JSONAnalysis(error=f"Invalid JSON: {str(e)}")
+        return self.analyze_data(data)
+
+
+def looks_like_json(content: Optional[str]) -> bool:
+    """Cheap pre-check so non-JSON documents are never handed to the parser."""
+    return bool(content) and _JSON_START.match(content) is not None
+
+
+def load_schemas(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Loads the schema list; JSON_SCHEMAS_PATH overrides the default config file."""
+    path = path or os.getenv("JSON_SCHEMAS_PATH", SCHEMAS_PATH)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["schemas"]
+
+
+@lru_cache(maxsize=1)
+def get_schema_registry() -> SchemaRegistry:
+    """Process-wide registry compiled from the configured schemas."""
+    return SchemaRegistry(load_schemas())
@@ -0,0 +1,281 @@
+import json
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from core.schemas.registry import (
+    AnomalyLimitReached, AnomalyList, CompiledSchema, JSONAnalysis, SchemaRegistry, Validator, child_path,
+    compile_schema
+)
+
+JSON_STREAM_CHUNK = int(os.getenv("JSON_STREAM_CHUNK", str(1024 * 1024)))
+# Streamed arrays are kept in the document data as {"count": n, "preview": [first items]}
+JSON_STREAM_PREVIEW = int(os.getenv("JSON_STREAM_PREVIEW", "5"))
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+# Longest token outside a string that a chunk boundary can cut ("false")
+_MAX_CUT_TOKEN = 6
+# What may follow a decoded value when the buffer ends inside it (a number cut after "1." or "1e")
+_CUT_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+
+# (kind, key, ...): ("field", key, value), ("array_start", key), ("item", key, index, value),
+# ("array_end", key, count) and, for a scalar document, ("value", None, value)
+Event = Tuple[Any, ...]
+
+
+class _Reader:
+    """Text buffer over a file that only ever holds the unread tail plus the value being decoded."""
+
+    def __init__(self, fp: TextIO, chunk_size: int):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fp.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it; "" at end of input."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.chunk_size):
+                return ""
+
+    def take(self, expected: str) -> str:
+        char = self.peek()
+        if char not in expected:
+            raise ValueError(f"Expected one of {expected!r} but found {char or 'end of input'!r}")
+        self.pos += 1
+        return char
+
+    def _truncated(self, e: json.JSONDecodeError) -> bool:
+        """Whether the decode error may only mean the value continues past the buffer, not bad syntax."""
+        # A string still open at the end of the buffer is reported at its opening quote;
+        # anything else cut off (a literal, a \uXXXX escape) fails within a few characters of the end
+        return e.msg.startswith("Unterminated string") or e.pos >= len(self.buf) - _MAX_CUT_TOKEN
+
+    def value(self) -> Any:
+        """
+        Decodes the next complete JSON value, reading more input (in growing
+        chunks) until it is whole. A syntax error before the end of the buffer
+        is raised at once instead of pulling in the rest of the file.
+        """
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if self.eof or not _CUT_TAIL.match(self.buf, end):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof or not self._truncated(e):
+                    raise
+            self._fill(size)
+            size *= 2
+
+
+def _array_events(reader: _Reader, key: Optional[str]) -> Iterator[Event]:
+    yield ("array_start", key)
+    count = 0
+    if reader.peek() == "]":
+        reader.pos += 1
+    else:
+        while True:
+            yield ("item", key, count, reader.value())
+            count += 1
+            if reader.take(",]") == "]":
+                break
+    yield ("array_end", key, count)
+
+
+def iter_events(fp: TextIO, chunk_size: int = JSON_STREAM_CHUNK) -> Iterator[Event]:
+    """
+    Incrementally parses a JSON document from a text stream. Top-level
+    fields are decoded whole, except arrays, whose items are decoded and
+    yielded one at a time, so memory is bounded by the largest single item.
+    Raises ValueError on malformed input.
+    """
+    reader = _Reader(fp, chunk_size)
+    first = reader.peek()
+    if first == "[":
+        reader.pos += 1
+        yield from _array_events(reader, None)
+    elif first == "{":
+        reader.pos += 1
+        if reader.peek() == "}":
+            reader.pos += 1
+        else:
+            while True:
+                key = reader.value()
+                if not isinstance(key, str):
+                    raise ValueError("Expected a string key")
+                reader.take(":")
+                if reader.peek() == "[":
+                    reader.pos += 1
+                    yield from _array_events(reader, key)
+                else:
+                    yield ("field", key, reader.value())
+                if reader.take(",}") == "}":
+                    break
+    else:
+        yield ("value", None, reader.value())
+    if reader.peek() != "":
+        raise ValueError("Extra data after the JSON document")
+
+
+class _ArrayRules:
+    """A schema's compiled rules for one top-level array field."""
+
+    def __init__(self, key: str, schema: Dict[str, Any]):
+        self.path = child_path("$", key)
+        types = schema.get("type")
+        self.types = types if isinstance(types, list) else [types] if types else None
+        self.items = compile_schema(schema["items"]) if "items" in schema else None
+        self.min_items = schema.get("minItems")
+        self.max_items = schema.get("maxItems")
+
+
+class _StreamedArray:
+    """Applies one candidate schema's _ArrayRules to a top-level array as its items stream past."""
+
+    def __init__(self, rules: _ArrayRules, limit: int):
+        self.rules = rules
+        # Type and item count anomalies; reported before the item anomalies, as in-memory validation does
+        self.leading: List[str] = []
+        self.anomalies = AnomalyList(limit)
+        self.active = rules.items is not None
+        if rules.types is not None and "array" not in rules.types:
+            self.leading.append(f"{rules.path}: expected {' or '.join(rules.types)}, got array")
+            self.active = False
+
+    def item(self, index: int, value: Any):
+        if self.active:
+            try:
+                self.rules.items(value, f"{self.rules.path}[{index}]", self.anomalies)
+            except AnomalyLimitReached:
+                # Early stop: the rest of the array is still read, but no longer validated
+                self.active = False
+
+    def end(self, count: int):
+        if self.leading:
+            return
+        if self.rules.min_items is not None and count < self.rules.min_items:
+            self.leading.append(f"{self.rules.path}: fewer than {self.rules.min_items} items")
+        if self.rules.max_items is not None and count > self.rules.max_items:
+            self.leading.append(f"{self.rules.path}: more than {self.rules.max_items} items")
+
+
+class StreamingJSONAnalyzer:
+    """
+    JSONAnalysis for documents too large to load whole.
+
+    The document is parsed once as a stream of top-level events. Scalar and
+    object fields are kept; top-level arrays are validated item by item
+    against every schema that declares that field (the matching schema is
+    only known once all top-level keys were seen) and then dropped, leaving
+    a count and a short preview in the data. Validation stops early per
+    array once the registry's anomaly limit is reached.
+    """
+
+    def __init__(self, registry: SchemaRegistry, chunk_size: int = JSON_STREAM_CHUNK,
+                 preview_items: int = JSON_STREAM_PREVIEW):
+        self.registry = registry
+        self.chunk_size = chunk_size
+        self.preview_items = preview_items
+        # Field -> (schema name, rules) for every schema declaring that top-level field, compiled once
+        self._array_rules: Dict[str, List[Tuple[str, _ArrayRules]]] = {}
+        # Schema name -> compiled validators of its top-level fields, for the fields kept in memory
+        self._field_validators: Dict[str, Dict[str, Validator]] = {}
+        for schema in registry.schemas:
+            properties = schema.schema.get("properties", {})
+            self._field_validators[schema.name] = {key: compile_schema(sub) for key, sub in properties.items()}
+            for key, sub in properties.items():
+                self._array_rules.setdefault(key, []).append((schema.name, _ArrayRules(key, sub)))
+
+    def analyze_file(self, path: str, encoding: str = "utf-8") -> JSONAnalysis:
+        with open(path, "r", encoding=encoding) as fp:
+            return self.analyze_stream(fp)
+
+    def analyze_stream(self, fp: TextIO) -> JSONAnalysis:
+        data: Any = {}
+        # key -> schema name -> its checks of that streamed array
+        streamed: Dict[Optional[str], Dict[str, _StreamedArray]] = {}
+        preview: List[Any] = []
+        limit = self.registry.max_anomalies
+        try:
+            for event in iter_events(fp, self.chunk_size):
+                kind, key = event[0], event[1]
+                if kind == "field":
+                    data[key] = event[2]
+                elif kind == "item":
+                    if len(preview) < self.preview_items:
+                        preview.append(event[3])
+                    for check in streamed[key].values():
+                        check.item(event[2], event[3])
+                elif kind == "array_start":
+                    preview = []
+                    streamed[key] = {
+                        name: _StreamedArray(rules, limit)
+                        for name, rules in (self._array_rules.get(key, []) if key is not None else [])
+                    }
+                elif kind == "array_end":
+                    for check in streamed[key].values():
+                        check.end(event[2])
+                    summary = {"count": event[2], "preview": preview}
+                    if key is None:
+                        data = summary
+                    else:
+                        data[key] = summary
+                else:
+                    data = event[2]
+        except ValueError as e:
+            return JSONAnalysis(error=f"Invalid JSON: {str(e)}")
+
+        schema = self.registry.match(data) if None not in streamed else None
+        if schema is None:
+            return JSONAnalysis(data)
+        return JSONAnalysis(data, schema=schema, anomalies=self._validate(schema, data, streamed, limit))
+
+    def _validate(self, schema: CompiledSchema, data: Dict[str, Any],
+                  streamed: Dict[Optional[str], Dict[str, _StreamedArray]], limit: int) -> List[str]:
+        """The schema's anomalies in the same order as an in-memory validation, using the streamed array results."""
+        rules = schema.schema
+        properties = self._field_validators[schema.name]
+        anomalies = AnomalyList(limit)
+        try:
+            for key in rules.get("required", []):
+                if key not in data:
+                    anomalies.append(f"{child_path('$', key)}: missing required field")
+            for key, validate in properties.items():
+                if key not in data:
+                    continue
+                if key in streamed:
+                    check = streamed[key][schema.name]
+                    for anomaly in check.leading + check.anomalies:
+                        anomalies.append(anomaly)
+                    if check.anomalies.truncated:
+                        raise AnomalyLimitReached()
+                else:
+                    validate(data[key], child_path("$", key), anomalies)
+            if rules.get("additionalProperties", True) is False:
+                for key in data:
+                    if key not in properties:
+                        anomalies.append(f"{child_path('$', key)}: unexpected field")
+        except AnomalyLimitReached:
+            anomalies.note_truncation()
+        return anomalies
@@ -0,0 +1,230 @@
+import json
+import os
+import re
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MODEL_FORMAT = "intent-model"
+MODEL_VERSION = 1
+
+# Hashed feature space; collisions are rare enough at 2^18 for a few thousand distinct n-grams per label
+MODEL_DIM = int(os.getenv("INTENT_MODEL_DIM", str(2 ** 18)))
+# Only the start of a document is featurized, which bounds prediction time
+MODEL_MAX_CHARS = int(os.getenv("INTENT_MODEL_MAX_CHARS", "8000"))
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def features(text: str, dim: int = MODEL_DIM, max_chars: int = MODEL_MAX_CHARS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sparse (indices, values) of the hashed word unigrams and bigrams of
+    `text`: log-scaled counts, L2-normalized. crc32 keeps the hashing stable
+    across processes, unlike hash().
+    """
+    words = _WORD.findall(text[:max_chars].lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    counts = Counter(zlib.crc32(gram.encode("utf-8")) % dim for gram in grams)
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = 1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    return indices, values / np.linalg.norm(values)
+
+
+class _SparseRows:
+    """CSR matrix of featurized documents: row i is indices/values[indptr[i]:indptr[i + 1]]."""
+
+    def __init__(self, texts: Sequence[str], dim: int, max_chars: int):
+        rows = [features(text, dim, max_chars) for text in texts]
+        self.indptr = np.cumsum([0] + [len(indices) for indices, _ in rows])
+        self.indices = np.concatenate([indices for indices, _ in rows]) if rows else np.zeros(0, dtype=np.int64)
+        self.values = np.concatenate([values for _, values in rows]) if rows else np.zeros(0, dtype=np.float32)
+
+    def batch(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(indices, values, row of each entry within the batch) of the given rows."""
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lengths = ends - starts
+        positions = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)]) if len(rows) else starts
+        return self.indices[positions], self.values[positions], np.repeat(np.arange(len(rows)), lengths)
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class IntentModel:
+    """
+    Multinomial logistic regression over hashed n-gram features. Predicting
+    one document is a gather of its few hundred weight rows and a softmax,
+    so it runs in microseconds to a millisecond on CPU.
+    """
+
+    def __init__(self, labels: List[str], weights: np.ndarray, bias: np.ndarray,
+                 max_chars: int = MODEL_MAX_CHARS, metadata: Optional[Dict[str, Any]] = None):
+        self.labels = labels
+        self.weights = weights
+        self.bias = bias
+        self.dim = weights.shape[0]
+        self.max_chars = max_chars
+        self.metadata = metadata or {}
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        indices, values = features(text, self.dim, self.max_chars)
+        return _softmax(values @ self.weights[indices] + self.bias)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """The most probable label and its probability."""
+        proba = self.predict_proba(text)
+        best = int(proba.argmax())
+        return self.labels[best], float(proba[best])
+
+    # --- On-disk format ---
+    def save(self, path: str):
+        """Writes an uncompressed .npz (so loading is a plain read) atomically, replacing any previous model."""
+        metadata = dict(self.metadata, format=MODEL_FORMAT, version=MODEL_VERSION, labels=self.labels,
+                        dim=self.dim, max_chars=self.max_chars)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, weights=self.weights.astype(np.float32), bias=self.bias.astype(np.float32),
+                     metadata=np.array(json.dumps(metadata)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data["metadata"]))
+            if metadata.get("format") != MODEL_FORMAT or metadata.get("version") != MODEL_VERSION:
+                raise ValueError(
+                    f"Unsupported intent model {metadata.get('format')} v{metadata.get('version')}, "
+                    f"expected {MODEL_FORMAT} v{MODEL_VERSION}"
+                )
+            return cls(metadata["labels"], data["weights"], data["bias"], metadata["max_chars"], metadata)
+
+    @property
+    def name(self) -> str:
+        return f"{MODEL_FORMAT}-v{MODEL_VERSION}@{self.metadata.get('trained_at', 'untrained')}"
+
+
+def train(texts: Sequence[str], labels: Sequence[str], dim: int = MODEL_DIM, max_chars: int = MODEL_MAX_CHARS,
+          epochs: int = 30, batch_size: int = 64, learning_rate: float = 0.2, l2: float = 1e-4,
+          seed: int = 0) -> IntentModel:
+    """
+    Fits the model with mini-batch Adam on the softmax cross-entropy plus L2
+    regularization. Updates are lazy: each step only touches the weight rows
+    of the n-grams in its batch, so a step costs as much as the batch, not
+    as the feature space.
+    """
+    if not texts:
+        raise ValueError("No training documents")
+    label_names = sorted(set(labels))
+    targets = np.array([label_names.index(label) for label in labels])
+    rows = _SparseRows(texts, dim, max_chars)
+    rng = np.random.default_rng(seed)
+    weights = np.zeros((dim, len(label_names)), dtype=np.float32)
+    bias = np.zeros(len(label_names), dtype=np.float32)
+    moments = {"weights": (np.zeros_like(weights), np.zeros_like(weights)),
+               "bias": (np.zeros_like(bias), np.zeros_like(bias))}
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    step = 0
+    start = time.perf_counter()
+
+    def adam(name, param, grad, where):
+        m, v = moments[name]
+        m[where] = beta1 * m[where] + (1 - beta1) * grad
+        v[where] = beta2 * v[where] + (1 - beta2) * grad * grad
+        param[where] -= learning_rate * (m[where] / (1 - beta1 ** step)) / (np.sqrt(v[where] / (1 - beta2 ** step)) + eps)
+
+    for _ in range(epochs):
+        order = rng.permutation(len(texts))
+        for begin in range(0, len(order), batch_size):
+            batch = order[begin:begin + batch_size]
+            indices, values, row_of = rows.batch(batch)
+            touched, position = np.unique(indices, return_inverse=True)
+            rows_weights = weights[touched]
+            logits = np.zeros((len(batch), len(label_names)), dtype=np.float32)
+            np.add.at(logits, row_of, values[:, None] * rows_weights[position])
+            delta = _softmax(logits + bias)
+            delta[np.arange(len(batch)), targets[batch]] -= 1
+            delta /= len(batch)
+            grad_rows = l2 * rows_weights
+            np.add.at(grad_rows, position, values[:, None] * delta[row_of])
+
+            step += 1
+            adam("weights", weights, grad_rows, touched)
+            adam("bias", bias, delta.sum(axis=0), slice(None))
+
+    metadata = {
+        "trained_at": datetime.utcnow().strftime("%Y%m%dT%H%M%SZ"),
+        "training": {
+            "documents": len(texts),
+            "label_counts": dict(Counter(labels)),
+            "epochs": epochs,
+            "learning_rate": learning_rate,
+            "l2": l2,
+            "seconds": round(time.perf_counter() - start, 2),
+        },
+    }
+    return IntentModel(label_names, weights, bias, max_chars, metadata)
+
+
+def evaluate(model: IntentModel, texts: Sequence[str], labels: Sequence[str], threshold: float,
+             sources: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Accuracy against reference labels (e.g. the LLM's), per-label
+    precision/recall, the confusion matrix, and how many documents the model
+    would decide on its own at `threshold` and how accurately.
+    """
+    predictions = []
+    start = time.perf_counter()
+    for text in texts:
+        predictions.append(model.predict(text))
+    seconds = time.perf_counter() - start
+    total = len(texts)
+    correct = [predicted == label for (predicted, _), label in zip(predictions, labels)]
+    confident = [p >= threshold for _, p in predictions]
+    decided = sum(confident)
+
+    confusion: Dict[str, Dict[str, int]] = {}
+    for (predicted, _), label in zip(predictions, labels):
+        row = confusion.setdefault(label, {})
+        row[predicted] = row.get(predicted, 0) + 1
+    per_label = {}
+    for label in sorted(set(labels) | set(model.labels)):
+        true_positive = confusion.get(label, {}).get(label, 0)
+        predicted_count = sum(row.get(label, 0) for row in confusion.values())
+        support = sum(confusion.get(label, {}).values())
+        precision = true_positive / predicted_count if predicted_count else 0.0
+        recall = true_positive / support if support else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        per_label[label] = {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4),
+                            "support": support}
+
+    by_source: Dict[str, Dict[str, float]] = {}
+    for source, ok in zip(sources or ["unknown"] * total, correct):
+        entry = by_source.setdefault(source, {"documents": 0, "correct": 0})
+        entry["documents"] += 1
+        entry["correct"] += ok
+    for entry in by_source.values():
+        entry["accuracy"] = round(entry.pop("correct") / entry["documents"], 4)
+
+    return {
+        "model": model.name,
+        "documents": total,
+        "accuracy": round(sum(correct) / total, 4) if total else 0.0,
+        "threshold": threshold,
+        "coverage": round(decided / total, 4) if total else 0.0,
+        "accuracy_at_threshold": round(sum(ok for ok, c in zip(correct, confident) if c) / decided, 4)
+        if decided else 0.0,
+        "mean_predict_us": round(seconds / total * 1e6, 1) if total else 0.0,
+        "labels": per_label,
+        "confusion": confusion,
+        "by_source": by_source,
+    }
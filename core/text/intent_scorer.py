@@ -0,0 +1,99 @@
+import json
+import math
+import os
+from collections import Counter
+from typing import Dict, List, Optional
+
+from core.text.keyword_matcher import KeywordMatcher, KeywordMatches, get_keyword_matcher
+
+WEIGHTS_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "config", "intent_weights.json")
+
+# Rules decide the intent on their own at or above this confidence; below it the LLM is asked
+INTENT_RULE_THRESHOLD = float(os.getenv("INTENT_RULE_THRESHOLD", "0.7"))
+# A runner-up label scoring at least this share of the best one is a conflict, whatever the confidence
+INTENT_RULE_CONFLICT_RATIO = float(os.getenv("INTENT_RULE_CONFLICT_RATIO", "0.5"))
+
+DEFAULT_WEIGHT = 1.0
+# Repeats of a keyword add this share of its weight, at most twice
+REPEAT_SHARE = 0.5
+# Best score at which the evidence part of the confidence reaches 1 - 1/e
+EVIDENCE_SCALE = 2.0
+
+Weights = Dict[str, Dict[str, float]]
+
+
+def load_intent_weights(path: Optional[str] = None) -> Weights:
+    """Per-label keyword weights ({label: {keyword: weight}}), INTENT_WEIGHTS_PATH overrides the default."""
+    path = path or os.getenv("INTENT_WEIGHTS_PATH", WEIGHTS_PATH)
+    with open(path, "r", encoding="utf-8") as f:
+        weights = json.load(f)
+    return {label: {kw.lower(): float(w) for kw, w in table.items()} for label, table in weights.items()}
+
+
+class IntentScore:
+    """Weighted keyword evidence of one document and whether it settles the intent without the LLM."""
+
+    def __init__(self, scores: Dict[str, float], keywords: Dict[str, List[str]], confidence: float,
+                 conflict: bool, decisive: bool, reason: str):
+        # Labels with at least one hit, best first
+        self.scores = scores
+        self.keywords = keywords
+        self.confidence = confidence
+        self.conflict = conflict
+        self.decisive = decisive
+        self.reason = reason
+
+    @property
+    def label(self) -> Optional[str]:
+        return next(iter(self.scores), None)
+
+
+class IntentScorer:
+    """
+    Scores intent labels from the "intent" keyword rules, weighting each
+    keyword (config/intent_weights.json, 1.0 when unlisted). Confidence
+    combines how much evidence the best label has with its margin over the
+    runner-up: (1 - e^(-best / EVIDENCE_SCALE)) * (best - second) / best.
+    """
+
+    def __init__(self, matcher: Optional[KeywordMatcher] = None, weights: Optional[Weights] = None,
+                 threshold: Optional[float] = None, conflict_ratio: Optional[float] = None):
+        self.matcher = matcher or get_keyword_matcher()
+        self.weights = load_intent_weights() if weights is None else weights
+        self.threshold = INTENT_RULE_THRESHOLD if threshold is None else threshold
+        self.conflict_ratio = INTENT_RULE_CONFLICT_RATIO if conflict_ratio is None else conflict_ratio
+
+    def weight(self, label: str, keyword: str) -> float:
+        return self.weights.get(label, {}).get(keyword, DEFAULT_WEIGHT)
+
+    def score(self, content: str, matches: Optional[KeywordMatches] = None) -> IntentScore:
+        matches = matches or self.matcher.scan(content)
+        scores: Dict[str, float] = {}
+        keywords: Dict[str, List[str]] = {}
+        for label in matches.labels("intent"):
+            # Overlapping keywords at one position ("bill" in "billed") count once, as the longest
+            longest: Dict[int, str] = {}
+            for position, kw in matches.positions("intent", label):
+                if len(kw) > len(longest.get(position, "")):
+                    longest[position] = kw
+            hits = Counter(longest.values())
+            scores[label] = sum(self.weight(label, kw) * (1 + REPEAT_SHARE * min(n - 1, 2)) for kw, n in hits.items())
+            keywords[label] = sorted(hits)
+        # Stable sort: ties keep rule table order
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        best = ranked[0][1] if ranked else 0.0
+        second = ranked[1][1] if len(ranked) > 1 else 0.0
+        confidence = (1 - math.exp(-best / EVIDENCE_SCALE)) * (best - second) / best if best > 0 else 0.0
+        conflict = second > 0 and second >= self.conflict_ratio * best
+
+        if not ranked:
+            reason = "no intent keywords"
+        elif conflict:
+            reason = f"conflicting keywords: {ranked[0][0]} {best:.1f} vs {ranked[1][0]} {second:.1f}"
+        else:
+            label = ranked[0][0]
+            comparison = ">=" if confidence >= self.threshold else "<"
+            reason = (f"{label} keywords ({', '.join(keywords[label])}), "
+                      f"confidence {confidence:.2f} {comparison} {self.threshold:.2f}")
+        decisive = bool(ranked) and not conflict and confidence >= self.threshold
+        return IntentScore(dict(ranked), keywords, round(confidence, 4), conflict, decisive, reason)
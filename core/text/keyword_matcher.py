@@ -0,0 +1,110 @@
+import json
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+RULES_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "config", "keyword_rules.json")
+
+RuleSets = Dict[str, Dict[str, List[str]]]
+
+
+def load_keyword_rules(path: Optional[str] = None) -> RuleSets:
+    """Loads the keyword rule tables ({rule_set: {label: [keywords]}}), KEYWORD_RULES_PATH overrides the default."""
+    path = path or os.getenv("KEYWORD_RULES_PATH", RULES_PATH)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    # Factor the keywords into a trie so the regex engine rejects most
+    # positions after a single character instead of trying every keyword
+    trie: dict = {}
+    for kw in keywords:
+        node = trie
+        for ch in kw:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        ends_here = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 and not ends_here else "(?:" + "|".join(branches) + ")"
+        return body + "?" if ends_here else body
+
+    return build(trie)
+
+
+class KeywordMatches:
+    """Keyword hits of one scan: positions are offsets into the lowercased text."""
+
+    def __init__(self, rule_sets: RuleSets, hits: Dict[Tuple[str, str], List[Tuple[int, str]]]):
+        self._rule_sets = rule_sets
+        self.hits = hits
+
+    def positions(self, rule_set: str, label: str) -> List[Tuple[int, str]]:
+        return self.hits.get((rule_set, label), [])
+
+    def count(self, rule_set: str, label: Optional[str] = None) -> int:
+        if label is not None:
+            return len(self.positions(rule_set, label))
+        return sum(len(self.positions(rule_set, lbl)) for lbl in self._rule_sets.get(rule_set, {}))
+
+    def counts(self, rule_set: str) -> Dict[str, int]:
+        return {label: self.count(rule_set, label) for label in self.labels(rule_set)}
+
+    def keywords(self, rule_set: str, label: str) -> List[str]:
+        return sorted({kw for _, kw in self.positions(rule_set, label)})
+
+    def labels(self, rule_set: str) -> List[str]:
+        """Labels with at least one hit, in rule table order."""
+        return [label for label in self._rule_sets.get(rule_set, {}) if (rule_set, label) in self.hits]
+
+    def first(self, rule_set: str, default: Optional[str] = None) -> Optional[str]:
+        labels = self.labels(rule_set)
+        return labels[0] if labels else default
+
+    def has(self, rule_set: str, label: Optional[str] = None) -> bool:
+        return self.count(rule_set, label) > 0
+
+
+class KeywordMatcher:
+    """
+    Compiles every keyword of every rule set into one case-insensitive regex,
+    so a document is scanned once for all rule sets. Overlapping keywords are
+    all reported (e.g. both "bill" and "billed" for "billed").
+    """
+
+    def __init__(self, rule_sets: RuleSets):
+        self.rule_sets = rule_sets
+        self._owners: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        for rule_set, table in rule_sets.items():
+            for label, keywords in table.items():
+                for kw in keywords:
+                    self._owners[kw.lower()].append((rule_set, label))
+
+        keywords = sorted(self._owners)
+        # Keywords that are a prefix of a longer one start at the same position,
+        # so they are hits whenever the longer keyword is
+        self._prefixes = {kw: [other for other in keywords if other != kw and kw.startswith(other)] for kw in keywords}
+        first_chars = re.escape("".join(sorted({kw[0] for kw in keywords})))
+        self._pattern = re.compile(f"(?=[{first_chars}])(?=({_trie_pattern(keywords)}))") if keywords else None
+
+    def scan(self, text: str) -> KeywordMatches:
+        hits: Dict[Tuple[str, str], List[Tuple[int, str]]] = defaultdict(list)
+        if self._pattern is not None and text:
+            for match in self._pattern.finditer(text.lower()):
+                start, kw = match.start(), match.group(1)
+                for hit in [kw] + self._prefixes[kw]:
+                    for owner in self._owners[hit]:
+                        hits[owner].append((start, hit))
+        return KeywordMatches(self.rule_sets, dict(hits))
+
+
+@lru_cache(maxsize=1)
+def get_keyword_matcher() -> KeywordMatcher:
+    """Process-wide matcher compiled from the configured rule tables."""
+    return KeywordMatcher(load_keyword_rules())
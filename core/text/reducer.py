@@ -0,0 +1,257 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+from core.text.keyword_matcher import KeywordMatcher, get_keyword_matcher
+
+LLM_CONTENT_TOKEN_BUDGET = int(os.getenv("LLM_CONTENT_TOKEN_BUDGET", "1500"))
+# Bodies longer than this are sampled (head, tail and evenly spaced middle windows) before any token counting
+LLM_CONTENT_SCAN_CHARS = int(os.getenv("LLM_CONTENT_SCAN_CHARS", str(256 * 1024)))
+
+# Local token estimate: word pieces of up to 4 characters and single punctuation marks,
+# close to (slightly above) what SentencePiece/BPE tokenizers produce for English text
+_TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+_HEADER = re.compile(r"^([A-Za-z][A-Za-z0-9-]*):[ \t]")
+_KEEP_HEADERS = ("subject", "from", "to", "cc", "date")
+# First line of a quoted reply chain: everything from here on is earlier correspondence
+_REPLY_CHAIN = re.compile(
+    r"^(?:On\b.{0,300}\bwrote:[ \t]*$|-{2,}[ \t]*Original Message[ \t]*-{2,}|From:[^\n]*\n(?:Sent|Date):)",
+    re.MULTILINE | re.IGNORECASE
+)
+_QUOTED_LINE = re.compile(r"^[ \t]*>[^\n]*\n?", re.MULTILINE)
+_SIGNATURE = re.compile(r"^-- ?$|^Sent from my\b", re.MULTILINE)
+_SIGN_OFF = re.compile(r"^(?:(?:best|kind|warm)?[ \t]*regards|thanks|thank you|cheers|sincerely)[ \t]*,?[ \t]*$",
+                       re.IGNORECASE)
+_BLANK_LINES = re.compile(r"\n[ \t]*\n\s*")
+GAP = "[...]"
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """A prefix of `text` with at most `max_tokens` tokens, ending at a space when one is near."""
+    if max_tokens <= 0:
+        return ""
+    for i, match in enumerate(_TOKEN.finditer(text)):
+        if i == max_tokens:
+            prefix = text[:match.start()]
+            space = prefix.rfind(" ")
+            return (prefix[:space] if space > len(prefix) // 2 else prefix).rstrip()
+    return text
+
+
+class ReducedContent:
+    def __init__(self, text: str, original_tokens: int, tokens: int):
+        self.text = text
+        self.original_tokens = original_tokens
+        self.tokens = tokens
+
+    @property
+    def reduced(self) -> bool:
+        return self.tokens < self.original_tokens
+
+
+class ContentReducer:
+    """
+    Shrinks a document to a token budget before it goes into an LLM prompt.
+
+    Kept, in order of priority: the subject and a few identifying headers,
+    then the body's head and tail, then the body segments with the most
+    intent/urgency keyword hits. Quoted reply chains, quoted lines and
+    signatures are dropped first. Bodies over `scan_chars` are sampled before
+    anything is counted, so the cost is bounded whatever the document size;
+    their original token count is extrapolated from the sample.
+    """
+
+    def __init__(self, budget: Optional[int] = None, scan_chars: Optional[int] = None,
+                 head_share: float = 0.4, tail_share: float = 0.2, matcher: Optional[KeywordMatcher] = None):
+        self.budget = budget or LLM_CONTENT_TOKEN_BUDGET
+        self.scan_chars = scan_chars or LLM_CONTENT_SCAN_CHARS
+        self.head_share = head_share
+        self.tail_share = tail_share
+        self.matcher = matcher or get_keyword_matcher()
+
+    # --- Email structure ---
+    @staticmethod
+    def split_headers(content: str) -> Tuple[List[str], str]:
+        """
+        The identifying header lines (subject, from, to, cc, date) and the
+        body. Content that does not start with a header block containing at
+        least one of them is all body.
+        """
+        end = content.find("\n\n", 0, 64 * 1024)
+        if end == -1 or not _HEADER.match(content):
+            return [], content
+        block = content[:end].split("\n")
+        if any(_HEADER.match(line) is None and not line[:1].isspace() for line in block):
+            return [], content
+        kept = [line.strip() for line in block
+                if _HEADER.match(line) and _HEADER.match(line).group(1).lower() in _KEEP_HEADERS]
+        if not kept:
+            return [], content
+        return kept, content[end + 2:]
+
+    @staticmethod
+    def cut_reply_chain(body: str) -> str:
+        """The body up to the first quoted reply chain, unless nothing would be left."""
+        chain = _REPLY_CHAIN.search(body)
+        return body[:chain.start()] if chain and body[:chain.start()].strip() else body
+
+    @staticmethod
+    def strip_quoted(text: str) -> str:
+        stripped = _QUOTED_LINE.sub("", text)
+        return stripped if stripped.strip() else text
+
+    @staticmethod
+    def strip_signature(text: str) -> str:
+        """Drops a "-- " signature, "Sent from my ..." and a sign-off in the last few lines."""
+        signature = _SIGNATURE.search(text)
+        stripped = text[:signature.start()] if signature else text
+        head, _, tail = stripped.rstrip().rpartition("\n\n")
+        lines = tail.split("\n")
+        for i in range(len(lines) - 1, max(len(lines) - 6, 0) - 1, -1):
+            if _SIGN_OFF.match(lines[i].strip()):
+                stripped = "\n\n".join(filter(None, (head, "\n".join(lines[:i]))))
+                break
+        return stripped if stripped.strip() else text
+
+    # --- Sampling and segments ---
+    def sample(self, body: str, windows: int = 8) -> List[str]:
+        """Parts of the body covering at most `scan_chars`: head, evenly spaced middle windows, tail."""
+        if len(body) <= self.scan_chars:
+            return [body]
+        edge = self.scan_chars // 4
+        window = (self.scan_chars - 2 * edge) // windows
+        step = (len(body) - 2 * edge) // windows
+        parts = [self._whole_lines(body[:edge], head=False)]
+        for i in range(windows):
+            start = edge + i * step + (step - window) // 2
+            parts.append(self._whole_lines(body[start:start + window]))
+        parts.append(self._whole_lines(body[-edge:], tail=False))
+        return parts
+
+    @staticmethod
+    def _whole_lines(window: str, head: bool = True, tail: bool = True) -> str:
+        """Drops the partial first/last line of a sampled window, when it has more than one line."""
+        start = window.find("\n") + 1 if head else 0
+        end = window.rfind("\n") if tail else len(window)
+        return window[start:end] if 0 < start < end else window
+
+    @staticmethod
+    def _split(paragraph: str, max_tokens: int) -> List[str]:
+        if count_tokens(paragraph) <= max_tokens:
+            return [paragraph]
+        pieces = []
+        for line in paragraph.split("\n"):
+            line = line.strip()
+            while line:
+                piece = truncate_tokens(line, max_tokens)
+                pieces.append(piece)
+                line = line[len(piece):].strip()
+        return pieces
+
+    def segments(self, parts: List[str], max_tokens: int) -> List[Tuple[int, str, int]]:
+        """
+        (position, text, tokens) of the paragraphs, split by line and then by
+        tokens so none exceeds `max_tokens`. Consecutive text has consecutive
+        positions; sampled parts are not contiguous, so they leave a gap.
+        """
+        segments: List[Tuple[int, str, int]] = []
+        position = 0
+        for part in parts:
+            for paragraph in _BLANK_LINES.split(part.strip()):
+                for piece in self._split(paragraph, max_tokens):
+                    if piece.strip():
+                        segments.append((position, piece, count_tokens(piece)))
+                        position += 1
+            position += 1
+        return segments
+
+    def _informative(self, segment: Tuple[int, str, int]) -> float:
+        matches = self.matcher.scan(segment[1])
+        return (matches.count("intent") + matches.count("urgency")) / max(segment[2], 1)
+
+    # --- Reduction ---
+    def reduce(self, content: str) -> ReducedContent:
+        if not content:
+            return ReducedContent("", 0, 0)
+        content = content.replace("\r\n", "\n")
+        headers, body = self.split_headers(content)
+        # --- 1. Drop earlier correspondence, then sample; quoting and signatures are cleaned per part ---
+        parts = [self.strip_quoted(part) for part in self.sample(self.cut_reply_chain(body))]
+        parts[-1] = self.strip_signature(parts[-1])
+        header_text = "\n".join(headers)
+        header_tokens = count_tokens(header_text)
+        body_tokens = sum(count_tokens(part) for part in parts)
+        original_tokens = count_tokens(content[:self.scan_chars])
+        if len(content) > self.scan_chars:
+            original_tokens = round(original_tokens * len(content) / self.scan_chars)
+
+        if header_tokens + body_tokens <= self.budget and len(parts) == 1:
+            text = (header_text + "\n\n" + parts[0].strip()) if headers else parts[0].strip()
+            return ReducedContent(text, original_tokens, count_tokens(text))
+
+        # Headers get at most a quarter of the budget
+        if header_tokens > self.budget // 4:
+            header_text = truncate_tokens(header_text, self.budget // 4)
+            header_tokens = count_tokens(header_text)
+        budget = self.budget - header_tokens
+        segments = self.segments(parts, max(budget // 8, 16))
+        if not segments:
+            # Nothing but headers: with no body to make room for, they get the whole budget
+            text = truncate_tokens("\n".join(headers), self.budget)
+            return ReducedContent(text, original_tokens, count_tokens(text))
+        gap_tokens = count_tokens(GAP)
+        last = segments[-1][0]
+        chosen = set()
+        positions = set()
+        used = 0
+        # A GAP marker stands for each run of positions left out; with nothing chosen that is the whole body
+        gaps = 1
+
+        def gaps_with(i):
+            position = segments[i][0]
+            left = position > 0 and position - 1 not in positions
+            right = position < last and position + 1 not in positions
+            return gaps + (1 if left and right else 0 if left or right else -1)
+
+        def add(i, limit):
+            nonlocal used, gaps
+            after = gaps_with(i)
+            if used + segments[i][2] > limit or used + segments[i][2] + after * gap_tokens > budget:
+                return False
+            chosen.add(i)
+            positions.add(segments[i][0])
+            used += segments[i][2]
+            gaps = after
+            return True
+
+        def take(indexes, limit):
+            for i in indexes:
+                if i not in chosen and not add(i, limit):
+                    break
+
+        # --- 2. Head and tail ---
+        take(range(len(segments)), budget * self.head_share)
+        take(range(len(segments) - 1, -1, -1), used + budget * self.tail_share)
+        # --- 3. Most informative of the rest, while text and gap markers fit the budget ---
+        for i in sorted((i for i in range(len(segments)) if i not in chosen),
+                        key=lambda i: (-self._informative(segments[i]), i)):
+            if used + gaps * gap_tokens >= budget:
+                break
+            add(i, budget)
+
+        lines: List[str] = [header_text, ""] if headers else []
+        previous = None
+        for i in sorted(chosen):
+            position, text, _ = segments[i]
+            if position - (-1 if previous is None else previous) > 1:
+                lines.append(GAP)
+            lines.append(text)
+            previous = position
+        if previous is not None and previous < segments[-1][0]:
+            lines.append(GAP)
+        text = "\n".join(lines).strip()
+        return ReducedContent(text, max(original_tokens, count_tokens(text)), count_tokens(text))
@@ -0,0 +1,78 @@
+import base64
+import binascii
+import json
+import os
+import tempfile
+import uuid
+from io import BytesIO
+from typing import Any, Callable, Dict
+
+from core.pipeline.spool import UPLOAD_SPOOL_DIR
+
+# Payload keys that describe the document rather than being part of it
+_RESERVED_KEYS = ("filename", "content", "content_base64", "classification", "path")
+
+_DEFAULT_EXTENSIONS = {"email": ".eml", "json": ".json", "pdf": ".pdf", "classifier": ".txt"}
+
+
+def _document(flow_id: str, payload: Dict[str, Any]):
+    """
+    Resolves (filename, content) from a run payload. "content" may be a string
+    or any JSON value; without it, the rest of the payload is the document.
+    """
+    filename = payload.get("filename") or f"{flow_id}_{uuid.uuid4().hex}{_DEFAULT_EXTENSIONS[flow_id]}"
+    content = payload.get("content")
+    if content is None:
+        content = {k: v for k, v in payload.items() if k not in _RESERVED_KEYS}
+    if not isinstance(content, str):
+        content = json.dumps(content)
+    return filename, content
+
+
+def _pdf_source(payload: Dict[str, Any]):
+    """
+    The PDF of a run payload: its base64 "content_base64", or a "path" that
+    resolves inside the upload spool directory. Other paths are refused, so
+    a webhook caller cannot have arbitrary files on the server parsed.
+    """
+    encoded = payload.get("content_base64")
+    if encoded is not None:
+        try:
+            return BytesIO(base64.b64decode(encoded, validate=True))
+        except (binascii.Error, TypeError, ValueError):
+            raise ValueError("pdf flow 'content_base64' is not valid base64")
+    path = payload.get("path")
+    if not path:
+        raise ValueError("pdf flow requires 'content_base64' or a spooled 'path' in the payload")
+    root = os.path.realpath(UPLOAD_SPOOL_DIR or tempfile.gettempdir())
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([root, resolved]) != root or not os.path.isfile(resolved):
+        raise ValueError("pdf flow 'path' must be an existing file in the upload spool directory")
+    return resolved
+
+
+def build_agent_steps(classifier, email_agent, json_agent, pdf_agent) -> Dict[str, Callable[[Dict[str, Any]], Any]]:
+    """Binds each flow's model node to the local agent that implements it."""
+
+    def classify(payload):
+        filename, content = _document("classifier", payload)
+        return classifier.classify(filename, content)
+
+    def classification_for(payload, filename, content):
+        return payload.get("classification") or classifier.classify(filename, content)
+
+    def email(payload):
+        filename, content = _document("email", payload)
+        return email_agent.process(filename, content, classification_for(payload, filename, content))
+
+    def json_document(payload):
+        filename, content = _document("json", payload)
+        return json_agent.process(filename, content, classification_for(payload, filename, content))
+
+    def pdf(payload):
+        source = _pdf_source(payload)
+        filename = payload.get("filename") or (source if isinstance(source, str) else f"pdf_{uuid.uuid4().hex}.pdf")
+        classification = payload.get("classification") or {"format": "PDF", "intent": "Unknown"}
+        return pdf_agent.process(source, classification, filename=filename)
+
+    return {"classifier": classify, "email": email, "json": json_document, "pdf": pdf}
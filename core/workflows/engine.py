@@ -0,0 +1,345 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from core.observability.structured_logging import summarize
+from core.pipeline.executor import StageExecutor
+from core.workflows.models import WorkflowRun
+
+logger = logging.getLogger(__name__)
+
+FLOWS_DIR = os.getenv("FLOWS_DIR", "flows")
+
+# Node types the engine knows how to execute
+INPUT_NODE = "ChatInput"
+MODEL_NODE = "GoogleGenerativeAIModel"
+OUTPUT_NODE = "ChatOutput"
+STEP_TYPES = (INPUT_NODE, MODEL_NODE, OUTPUT_NODE)
+
+# Template fields that are never copied into a compiled step
+_SKIPPED_FIELDS = ("code", "api_key")
+
+
+class FlowCompileError(ValueError):
+    pass
+
+
+class WorkflowQueueFull(RuntimeError):
+    pass
+
+
+class FlowStep:
+    def __init__(self, node_id: str, node_type: str, config: Dict[str, Any], inputs: List[str]):
+        self.node_id = node_id
+        self.node_type = node_type
+        self.config = config
+        self.inputs = inputs
+
+
+class CompiledFlow:
+    """A flow definition compiled into steps in dependency (topological) order."""
+
+    def __init__(self, flow_id: str, name: str, steps: List[FlowStep]):
+        self.flow_id = flow_id
+        self.name = name
+        self.steps = steps
+
+    @property
+    def output(self) -> str:
+        outputs = [step.node_id for step in self.steps if step.node_type == OUTPUT_NODE]
+        return outputs[-1] if outputs else self.steps[-1].node_id
+
+
+def flow_id_for(filename: str) -> str:
+    """flows/email_agent.json -> "email", flows/JSON.json -> "json"."""
+    stem = os.path.splitext(os.path.basename(filename))[0].lower()
+    return stem[:-len("_agent")] if stem.endswith("_agent") else stem
+
+
+def compile_flow(flow_id: str, definition: Dict[str, Any]) -> CompiledFlow:
+    """Compiles a Langflow export into a CompiledFlow, rejecting unknown node types and cycles."""
+    graph = definition.get("data") or {}
+    nodes = {node["id"]: node["data"] for node in graph.get("nodes", [])}
+    if not nodes:
+        raise FlowCompileError(f"Flow {flow_id} has no nodes")
+
+    inputs: Dict[str, List[str]] = {node_id: [] for node_id in nodes}
+    for edge in graph.get("edges", []):
+        if edge["source"] not in nodes or edge["target"] not in nodes:
+            raise FlowCompileError(f"Flow {flow_id} has a dangling edge {edge['source']} -> {edge['target']}")
+        inputs[edge["target"]].append(edge["source"])
+
+    # Kahn's algorithm
+    remaining = {node_id: len(sources) for node_id, sources in inputs.items()}
+    ready = deque(sorted(node_id for node_id, count in remaining.items() if count == 0))
+    order = []
+    while ready:
+        node_id = ready.popleft()
+        order.append(node_id)
+        for target, sources in inputs.items():
+            if node_id in sources:
+                remaining[target] -= 1
+                if remaining[target] == 0:
+                    ready.append(target)
+    if len(order) != len(nodes):
+        raise FlowCompileError(f"Flow {flow_id} contains a cycle")
+
+    steps = []
+    for node_id in order:
+        node_type = nodes[node_id].get("type")
+        if node_type not in STEP_TYPES:
+            raise FlowCompileError(f"Flow {flow_id}: unsupported node type {node_type}")
+        template = nodes[node_id].get("node", {}).get("template", {})
+        config = {
+            key: field.get("value")
+            for key, field in template.items()
+            if isinstance(field, dict) and key not in _SKIPPED_FIELDS
+        }
+        steps.append(FlowStep(node_id, node_type, config, inputs[node_id]))
+    return CompiledFlow(flow_id, definition.get("name", flow_id), steps)
+
+
+def load_flows(directory: str = FLOWS_DIR) -> Dict[str, CompiledFlow]:
+    """Loads and compiles every flows/*.json once; invalid definitions are logged and skipped."""
+    flows = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        flow_id = flow_id_for(filename)
+        try:
+            with open(os.path.join(directory, filename), "r") as f:
+                flows[flow_id] = compile_flow(flow_id, json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Skipping flow {filename}: {str(e)}")
+    return flows
+
+
+class WorkflowEngine:
+    """
+    Executes compiled flows for /langflow/trigger, webhooks and cron.
+
+    Runs wait in one queue per flow (at most `queue_size` in all) and are
+    drained by a fixed pool of worker tasks; each flow additionally has its
+    own concurrency cap (FLOW_LIMIT_<FLOW>, e.g. FLOW_LIMIT_PDF=2). A free
+    worker takes the next run of a flow that is below its cap, visiting
+    flows round-robin, so a burst on one flow never ties up the workers
+    other flows need. Model steps run the local
+    agent bound to the flow (`agent_steps[flow_id]`) on the StageExecutor, or
+    fall back to prompting `llm` with the node's system message. Every status
+    change is passed to `on_update` so runs can be persisted, and status and
+    step events are published to `events` (a RunEventHub) for live tailing.
+    """
+
+    def __init__(self, agent_steps: Dict[str, Callable[[Dict[str, Any]], Any]],
+                 executor: Optional[StageExecutor] = None, flows: Optional[Dict[str, CompiledFlow]] = None,
+                 llm=None, workers: Optional[int] = None, queue_size: Optional[int] = None,
+                 flow_limit: Optional[int] = None, on_update: Optional[Callable[[WorkflowRun], None]] = None,
+                 events=None):
+        self.flows = flows if flows is not None else load_flows()
+        self.agent_steps = agent_steps
+        self.executor = executor or StageExecutor()
+        self.llm = llm
+        self.workers = workers or int(os.getenv("WORKFLOW_WORKERS", "16"))
+        self.queue_size = queue_size or int(os.getenv("WORKFLOW_QUEUE_SIZE", "1000"))
+        default_limit = flow_limit or int(os.getenv("WORKFLOW_FLOW_LIMIT", "8"))
+        self.flow_limits = {
+            flow_id: int(os.getenv(f"FLOW_LIMIT_{flow_id.upper()}", str(default_limit)))
+            for flow_id in self.flows
+        }
+        self.on_update = on_update
+        self.events = events
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._pending: Dict[str, deque] = {flow_id: deque() for flow_id in self.flows}
+        self._running: Dict[str, int] = {flow_id: 0 for flow_id in self.flows}
+        self._rotation = deque(self.flows)
+        self._queued = 0
+        self._unfinished = 0
+        self._ready: Optional[asyncio.Condition] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _ensure_workers(self):
+        if self._ready is None:
+            self._ready = asyncio.Condition()
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def _next_run(self):
+        """Takes the next run of the first flow in rotation that has one waiting and is below its cap."""
+        for _ in range(len(self._rotation)):
+            flow_id = self._rotation[0]
+            self._rotation.rotate(-1)
+            if self._pending[flow_id] and self._running[flow_id] < self.flow_limits[flow_id]:
+                self._running[flow_id] += 1
+                self._queued -= 1
+                return self._pending[flow_id].popleft()
+        return None
+
+    async def _record(self, run: WorkflowRun):
+        if self.on_update is not None:
+            try:
+                await self.executor.run("trace", self.on_update, run.model_copy())
+            except Exception as e:
+                logger.error(f"Error recording run {run.id}: {str(e)}")
+
+    async def _publish(self, run_id: str, event: Dict[str, Any]):
+        if self.events is not None:
+            await self.events.publish(run_id, event)
+
+    async def _run_step(self, flow: CompiledFlow, step: FlowStep, upstream: List[Any], payload: Dict[str, Any]):
+        if step.node_type == INPUT_NODE:
+            return payload
+        if step.node_type == OUTPUT_NODE:
+            return upstream[0] if len(upstream) == 1 else upstream
+
+        # Model step: all upstream outputs are merged into the agent's input
+        step_input = dict(payload)
+        for value in upstream:
+            if isinstance(value, dict):
+                step_input.update(value)
+        agent = self.agent_steps.get(flow.flow_id)
+        if agent is not None:
+            stage = "pdf" if flow.flow_id == "pdf" else "agent"
+            return await self.executor.run(stage, agent, step_input)
+        if self.llm is None:
+            raise FlowCompileError(f"Flow {flow.flow_id} has no agent or LLM bound to {step.node_id}")
+        messages = [("system", step.config.get("system_message") or ""), ("human", json.dumps(step_input, default=str))]
+        response = await self.llm.ainvoke(messages)
+        return {"text": getattr(response, "content", str(response))}
+
+    async def execute(self, flow_id: str, payload: Dict[str, Any], run_id: Optional[str] = None) -> Any:
+        """Runs a flow inline and returns the output of its ChatOutput step."""
+        flow = self.flows[flow_id]
+        outputs: Dict[str, Any] = {}
+        for step in flow.steps:
+            start = time.perf_counter()
+            outputs[step.node_id] = await self._run_step(
+                flow, step, [outputs[source] for source in step.inputs], payload
+            )
+            if run_id is not None and step.node_type == MODEL_NODE:
+                await self._publish(run_id, {
+                    "type": "step",
+                    "node_id": step.node_id,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                    # Bounded like log fields: an agent result can carry a whole document's text
+                    "output": summarize(outputs[step.node_id])
+                })
+        return outputs[flow.output]
+
+    async def _execute_run(self, run: WorkflowRun, payload: Dict[str, Any]):
+        run.status = "running"
+        await self._record(run)
+        await self._publish(run.id, {"type": "running", "flow_id": run.flow_id})
+        try:
+            await self.execute(run.flow_id, payload, run_id=run.id)
+            run.status = "completed"
+            self.completed += 1
+        except Exception as e:
+            logger.error(f"Run {run.id} of flow {run.flow_id} failed: {str(e)}")
+            run.status = "failed"
+            run.error = str(e)
+            self.failed += 1
+        run.end_time = time.time()
+        run.duration = run.end_time - run.start_time
+        await self._record(run)
+        await self._publish(run.id, {"type": run.status, "duration": run.duration, "error": run.error})
+
+    async def _work(self):
+        while True:
+            async with self._ready:
+                run, payload = await self._ready.wait_for(self._next_run)
+            try:
+                await self._execute_run(run, payload)
+            finally:
+                async with self._ready:
+                    self._running[run.flow_id] -= 1
+                    self._unfinished -= 1
+                    if self._unfinished == 0:
+                        self._idle.set()
+                    # The freed slot may let a waiting run of this flow start
+                    self._ready.notify()
+
+    async def join(self):
+        """Waits until every submitted run has finished."""
+        if self._idle is not None:
+            await self._idle.wait()
+
+    async def submit(self, flow_id: str, payload: Dict[str, Any], trigger: str = "manual") -> WorkflowRun:
+        """
+        Queues a run and returns it immediately. Raises KeyError for an unknown
+        flow and WorkflowQueueFull when the run queue is at capacity.
+        """
+        if flow_id not in self.flows:
+            raise KeyError(flow_id)
+        self._ensure_workers()
+        run = WorkflowRun(
+            id=f"run_{flow_id}_{uuid.uuid4()}",
+            flow_id=flow_id,
+            status="queued",
+            start_time=time.time(),
+            trigger=trigger
+        )
+        if self._queued >= self.queue_size:
+            self.rejected += 1
+            raise WorkflowQueueFull(f"Workflow queue is full ({self.queue_size} runs)")
+
+        # Recorded before a worker can pick the run up, so "queued" never lands after "running"
+        await self._record(run)
+        await self._publish(run.id, {"type": "queued", "flow_id": flow_id, "trigger": trigger})
+        # Workers update `run` in place, the caller gets it as submitted
+        submitted = run.model_copy()
+        if self._queued >= self.queue_size:
+            # Filled up while the run was being recorded
+            self.rejected += 1
+            run.status = "failed"
+            run.error = "Workflow queue is full"
+            await self._record(run)
+            await self._publish(run.id, {"type": run.status, "duration": 0.0, "error": run.error})
+            raise WorkflowQueueFull(f"Workflow queue is full ({self.queue_size} runs)")
+        async with self._ready:
+            self._pending[flow_id].append((run, payload))
+            self._queued += 1
+            self._unfinished += 1
+            self._idle.clear()
+            self._ready.notify()
+        return submitted
+
+    def list_flows(self) -> List[Dict[str, str]]:
+        return [{"id": flow.flow_id, "name": flow.name} for flow in self.flows.values()]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "flows": sorted(self.flows),
+            "queued": self._queued,
+            "running": {flow_id: count for flow_id, count in self._running.items() if count},
+            "workers": len(self._tasks),
+            "flow_limits": self.flow_limits,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    async def aclose(self, drain_timeout: float = 5.0):
+        if self._ready is not None:
+            try:
+                await asyncio.wait_for(self.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Dropping {self._queued} queued workflow runs on shutdown")
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            for pending in self._pending.values():
+                pending.clear()
+            self._running = {flow_id: 0 for flow_id in self.flows}
+            self._queued = self._unfinished = 0
+            self._ready = None
+            self._idle = None
+            self._tasks = []
@@ -0,0 +1,13 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class WorkflowRun(BaseModel):
+    id: str
+    flow_id: str
+    status: str
+    start_time: float
+    end_time: Optional[float] = None
+    duration: Optional[float] = None
+    trigger: Optional[str] = None
+    error: Optional[str] = None
@@ -0,0 +1,260 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+RUN_EVENTS_MAXLEN = int(os.getenv("RUN_EVENTS_MAXLEN", "1000"))
+RUN_EVENTS_TTL = int(os.getenv("RUN_EVENTS_TTL", str(24 * 3600)))
+RUN_EVENTS_BLOCK_MS = int(os.getenv("RUN_EVENTS_BLOCK_MS", "1000"))
+RUN_EVENTS_CLIENT_BUFFER = int(os.getenv("RUN_EVENTS_CLIENT_BUFFER", "256"))
+
+# Event types after which a run publishes nothing more
+TERMINAL_EVENTS = ("completed", "failed")
+
+Entry = Tuple[str, Dict[str, Any]]
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def event_id_key(event_id: str) -> Tuple[int, int]:
+    """Stream ids "<ms>-<seq>" as a sortable tuple."""
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class RedisRunEventLog:
+    """Run events in one capped Redis Stream per run (`run_events:<run_id>`), expiring after RUN_EVENTS_TTL."""
+
+    def __init__(self, conn, maxlen: int = RUN_EVENTS_MAXLEN, ttl: int = RUN_EVENTS_TTL):
+        self.conn = conn
+        self.maxlen = maxlen
+        self.ttl = ttl
+
+    def _key(self, run_id: str) -> str:
+        return f"run_events:{run_id}"
+
+    async def publish(self, run_id: str, event: Dict[str, Any]) -> str:
+        pipe = self.conn.pipeline(transaction=False)
+        pipe.xadd(self._key(run_id), {"event": json.dumps(event, default=str)}, maxlen=self.maxlen)
+        pipe.expire(self._key(run_id), self.ttl)
+        event_id, _ = await pipe.execute()
+        return _decode(event_id)
+
+    @staticmethod
+    def _entries(messages) -> List[Entry]:
+        return [(_decode(event_id), json.loads(_decode(fields[b"event"] if b"event" in fields else fields["event"])))
+                for event_id, fields in messages]
+
+    async def read_after(self, run_id: str, last_id: str = "0-0", count: Optional[int] = None) -> List[Entry]:
+        messages = await self.conn.xrange(self._key(run_id), min=f"({last_id}", max="+", count=count)
+        return self._entries(messages)
+
+    async def wait(self, cursors: Dict[str, str], block_ms: int) -> Dict[str, List[Entry]]:
+        """One XREAD BLOCK over every watched run; returns new entries per run id."""
+        response = await self.conn.xread({self._key(run_id): last_id for run_id, last_id in cursors.items()},
+                                         block=block_ms)
+        prefix = len(self._key(""))
+        return {_decode(stream)[prefix:]: self._entries(messages) for stream, messages in (response or [])}
+
+
+class MemoryRunEventLog:
+    """
+    In-process fallback: a ring buffer of the last `maxlen` events per run,
+    keeping at most `max_runs` runs. Ids follow the Redis stream id format so
+    Last-Event-ID works the same way with either backend.
+    """
+
+    def __init__(self, maxlen: int = RUN_EVENTS_MAXLEN, max_runs: int = 10000):
+        self.maxlen = maxlen
+        self.max_runs = max_runs
+        self._runs: "OrderedDict[str, Deque[Entry]]" = OrderedDict()
+        self._last_id = (0, 0)
+        self._changed = asyncio.Event()
+
+    def _next_id(self) -> str:
+        ms = int(time.time() * 1000)
+        self._last_id = (ms, 0) if ms > self._last_id[0] else (self._last_id[0], self._last_id[1] + 1)
+        return f"{self._last_id[0]}-{self._last_id[1]}"
+
+    async def publish(self, run_id: str, event: Dict[str, Any]) -> str:
+        if run_id not in self._runs:
+            self._runs[run_id] = deque(maxlen=self.maxlen)
+            if len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+        event_id = self._next_id()
+        self._runs[run_id].append((event_id, event))
+        self._changed.set()
+        return event_id
+
+    async def read_after(self, run_id: str, last_id: str = "0-0", count: Optional[int] = None) -> List[Entry]:
+        after = event_id_key(last_id)
+        entries = [entry for entry in self._runs.get(run_id, ()) if event_id_key(entry[0]) > after]
+        return entries[:count] if count else entries
+
+    def _collect(self, cursors: Dict[str, str]) -> Dict[str, List[Entry]]:
+        updates = {}
+        for run_id, last_id in cursors.items():
+            entries = self._runs.get(run_id)
+            # Cheap check on the newest entry before scanning the buffer
+            if entries and event_id_key(entries[-1][0]) > event_id_key(last_id):
+                after = event_id_key(last_id)
+                updates[run_id] = [entry for entry in entries if event_id_key(entry[0]) > after]
+        return updates
+
+    async def wait(self, cursors: Dict[str, str], block_ms: int) -> Dict[str, List[Entry]]:
+        updates = self._collect(cursors)
+        if updates:
+            return updates
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), block_ms / 1000)
+        except asyncio.TimeoutError:
+            return {}
+        return self._collect(cursors)
+
+
+class RunSubscription:
+    """
+    One watcher's bounded buffer of live events. When the watcher falls
+    behind and the buffer fills up, further events are not queued; the
+    watcher catches up by reading the log itself instead, so a slow client
+    never makes the hub buffer more.
+    """
+
+    def __init__(self, run_id: str, last_id: str, buffer: int):
+        self.run_id = run_id
+        self.last_id = last_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer)
+        # Starts behind: the watcher first reads what was published before it subscribed
+        self.behind = True
+
+    def offer(self, entry: Entry):
+        if self.behind or event_id_key(entry[0]) <= event_id_key(self.last_id):
+            return
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.behind = True
+
+    def catch_up(self):
+        """Called before re-reading the log: later events are queued again."""
+        self.behind = False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class RunEventHub:
+    """
+    Fans run events out to SSE watchers. A single reader task blocks on every
+    watched run at once (XREAD BLOCK over all streams) and copies new events
+    into each watcher's bounded queue, so the cost per watcher is one queue
+    rather than one polling loop.
+    """
+
+    def __init__(self, log, block_ms: int = RUN_EVENTS_BLOCK_MS, client_buffer: int = RUN_EVENTS_CLIENT_BUFFER):
+        self.log = log
+        self.block_ms = block_ms
+        self.client_buffer = client_buffer
+        self._subscribers: Dict[str, Set[RunSubscription]] = {}
+        self._cursors: Dict[str, str] = {}
+        self._watching = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.catch_ups = 0
+
+    async def publish(self, run_id: str, event: Dict[str, Any]) -> Optional[str]:
+        try:
+            return await self.log.publish(run_id, dict(event, ts=time.time()))
+        except Exception as e:
+            logger.error(f"Failed to publish event for run {run_id}: {str(e)}")
+            return None
+
+    def _subscribe(self, run_id: str, last_id: str) -> RunSubscription:
+        subscription = RunSubscription(run_id, last_id, self.client_buffer)
+        if run_id not in self._subscribers:
+            self._subscribers[run_id] = set()
+            self._cursors[run_id] = last_id
+        self._subscribers[run_id].add(subscription)
+        self._watching.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._read_loop())
+        return subscription
+
+    def _unsubscribe(self, subscription: RunSubscription):
+        watchers = self._subscribers.get(subscription.run_id)
+        if watchers is None:
+            return
+        watchers.discard(subscription)
+        if not watchers:
+            del self._subscribers[subscription.run_id]
+            del self._cursors[subscription.run_id]
+            if not self._subscribers:
+                self._watching.clear()
+
+    async def _read_loop(self):
+        while True:
+            await self._watching.wait()
+            try:
+                updates = await self.log.wait(dict(self._cursors), self.block_ms)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Run event reader error: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+            for run_id, entries in updates.items():
+                if run_id not in self._cursors or not entries:
+                    continue
+                self._cursors[run_id] = entries[-1][0]
+                for subscription in list(self._subscribers.get(run_id, ())):
+                    for entry in entries:
+                        subscription.offer(entry)
+
+    async def events(self, run_id: str, last_id: Optional[str] = None,
+                     heartbeat: float = 15.0) -> AsyncIterator[Optional[Entry]]:
+        """
+        Yields (event id, event) published after `last_id` until the run's
+        terminal event, and None as a heartbeat while idle.
+        """
+        subscription = self._subscribe(run_id, last_id or "0-0")
+        try:
+            while True:
+                if subscription.behind:
+                    # Reset first: anything published while reading is queued and de-duplicated by id
+                    subscription.catch_up()
+                    self.catch_ups += 1
+                    entries = await self.log.read_after(run_id, subscription.last_id)
+                else:
+                    try:
+                        entries = [await asyncio.wait_for(subscription.queue.get(), heartbeat)]
+                    except asyncio.TimeoutError:
+                        yield None
+                        continue
+                for entry in entries:
+                    if event_id_key(entry[0]) <= event_id_key(subscription.last_id):
+                        continue
+                    subscription.last_id = entry[0]
+                    yield entry
+                    if entry[1].get("type") in TERMINAL_EVENTS:
+                        return
+        finally:
+            self._unsubscribe(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "watched_runs": len(self._subscribers),
+            "watchers": sum(len(watchers) for watchers in self._subscribers.values()),
+            "catch_up_reads": self.catch_ups,
+        }
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
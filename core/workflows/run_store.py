@@ -0,0 +1,290 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.workflows.models import WorkflowRun
+from core.workflows.run_events import Entry, event_id_key
+
+logger = logging.getLogger(__name__)
+
+RUN_STATUSES = ("queued", "running", "completed", "failed", "started")
+# Legacy sorted set of JSON-encoded runs, read once by migrate_legacy()
+LEGACY_RUNS_KEY = "workflow_runs"
+# Change feed: a Redis Stream with one {"run_id"} entry per save or delete; entry ids are the feed cursors
+RUN_CHANGES_KEY = "runs:changes"
+RUN_CHANGES_MAXLEN = int(os.getenv("RUN_CHANGES_MAXLEN", "100000"))
+# The one channel of RunChangeLog, as passed to RunEventHub.events()
+RUN_CHANGES_CHANNEL = "runs"
+
+
+class ChangeFeedExpired(ValueError):
+    """The changes after a cursor were already trimmed from the feed; the client has to reload."""
+
+
+def encode_cursor(score: float, run_id: str) -> str:
+    return f"{score!r}:{run_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    score, _, run_id = cursor.partition(":")
+    return float(score), run_id
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def parse_run(data: Dict[Any, Any]) -> Optional[WorkflowRun]:
+    """A run from its `run:<id>` hash; None for a missing hash."""
+    if not data:
+        return None
+    return WorkflowRun(**{_decode(k): json.loads(_decode(v)) for k, v in data.items()})
+
+
+class RunStore:
+    """
+    Workflow run history in Redis.
+
+    Each run is a hash `run:<id>`, updated in place on every status change.
+    Sorted sets scored by start time index the runs overall, per flow, per
+    status and per flow+status, so any dashboard query reads one index page
+    plus one pipelined HGETALL per run, independent of history size.
+
+    Retention: at most RUN_RETENTION_PER_FLOW runs per flow and nothing older
+    than RUN_RETENTION_DAYS, enforced in small batches as runs are inserted.
+
+    Every save and delete also appends the run id to a capped change feed
+    stream in the same transaction, so dashboards can ask for what changed
+    since their last cursor instead of re-reading the list.
+    """
+
+    def __init__(self, conn, max_per_flow: Optional[int] = None, max_age_days: Optional[float] = None,
+                 prune_batch: int = 100, changes_maxlen: int = RUN_CHANGES_MAXLEN):
+        self.conn = conn
+        self.changes_maxlen = changes_maxlen
+        self.max_per_flow = max_per_flow or int(os.getenv("RUN_RETENTION_PER_FLOW", "100000"))
+        self.max_age = (max_age_days or float(os.getenv("RUN_RETENTION_DAYS", "30"))) * 24 * 3600
+        self.prune_batch = prune_batch
+
+    # --- Keys ---
+    @staticmethod
+    def _run_key(run_id: str) -> str:
+        return f"run:{run_id}"
+
+    @staticmethod
+    def _index_key(flow_id: Optional[str] = None, status: Optional[str] = None) -> str:
+        if flow_id and status:
+            return f"runs:flow:{flow_id}:status:{status}"
+        if flow_id:
+            return f"runs:flow:{flow_id}"
+        if status:
+            return f"runs:status:{status}"
+        return "runs:by_time"
+
+    # --- Writes ---
+    def save(self, run: WorkflowRun):
+        """Creates or updates a run and moves it to its current status index, in one round trip."""
+        fields = {k: json.dumps(v) for k, v in run.model_dump().items() if v is not None}
+        score = run.start_time
+        pipe = self.conn.pipeline(transaction=True)
+        pipe.hset(self._run_key(run.id), mapping=fields)
+        pipe.zadd(self._index_key(), {run.id: score})
+        pipe.zadd(self._index_key(run.flow_id), {run.id: score})
+        for status in RUN_STATUSES:
+            if status != run.status:
+                pipe.zrem(self._index_key(status=status), run.id)
+                pipe.zrem(self._index_key(run.flow_id, status), run.id)
+        pipe.zadd(self._index_key(status=run.status), {run.id: score})
+        pipe.zadd(self._index_key(run.flow_id, run.status), {run.id: score})
+        pipe.xadd(RUN_CHANGES_KEY, {"run_id": run.id}, maxlen=self.changes_maxlen, approximate=True)
+        pipe.zcard(self._index_key(run.flow_id))
+        flow_size = pipe.execute()[-1]
+
+        if flow_size > self.max_per_flow:
+            excess = self.conn.zrange(self._index_key(run.flow_id), 0, min(flow_size - self.max_per_flow, self.prune_batch) - 1)
+            self._delete([self._decode(run_id) for run_id in excess])
+        self.prune_expired()
+
+    def prune_expired(self) -> int:
+        """Deletes up to `prune_batch` runs older than the retention age."""
+        expired = self.conn.zrangebyscore(self._index_key(), "-inf", time.time() - self.max_age,
+                                          start=0, num=self.prune_batch)
+        self._delete([self._decode(run_id) for run_id in expired])
+        return len(expired)
+
+    def _delete(self, run_ids: List[str]):
+        if not run_ids:
+            return
+        pipe = self.conn.pipeline(transaction=False)
+        for run_id in run_ids:
+            pipe.hget(self._run_key(run_id), "flow_id")
+        flow_ids = [json.loads(f) if f else None for f in pipe.execute()]
+
+        pipe = self.conn.pipeline(transaction=True)
+        for run_id, flow_id in zip(run_ids, flow_ids):
+            pipe.delete(self._run_key(run_id))
+            pipe.zrem(self._index_key(), run_id)
+            if flow_id:
+                pipe.zrem(self._index_key(flow_id), run_id)
+            for status in RUN_STATUSES:
+                pipe.zrem(self._index_key(status=status), run_id)
+                if flow_id:
+                    pipe.zrem(self._index_key(flow_id, status), run_id)
+            pipe.xadd(RUN_CHANGES_KEY, {"run_id": run_id}, maxlen=self.changes_maxlen, approximate=True)
+        pipe.execute()
+
+    # --- Reads ---
+    _decode = staticmethod(_decode)
+    _parse = staticmethod(parse_run)
+
+    def get(self, run_id: str) -> Optional[WorkflowRun]:
+        return self._parse(self.conn.hgetall(self._run_key(run_id)))
+
+    def list_runs(self, flow_id: Optional[str] = None, status: Optional[str] = None,
+                  since: Optional[float] = None, until: Optional[float] = None,
+                  cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[WorkflowRun], Optional[str]]:
+        """
+        Newest-first page of runs matching the filters, and the cursor for the
+        next page (None on the last page). `since`/`until` bound start_time.
+        """
+        key = self._index_key(flow_id, status)
+        max_score: Any = "+inf" if until is None else until
+        min_score: Any = "-inf" if since is None else since
+        skip_ties = 0
+        if cursor:
+            cursor_score, cursor_id = decode_cursor(cursor)
+            if until is None or cursor_score <= until:
+                max_score = cursor_score
+                # Runs sharing the cursor's start time come first, by id descending; skip those already returned
+                ties = self.conn.zrevrangebyscore(key, cursor_score, cursor_score)
+                skip_ties = sum(1 for run_id in ties if self._decode(run_id) >= cursor_id)
+
+        entries = self.conn.zrevrangebyscore(key, max_score, min_score, start=skip_ties, num=limit + 1,
+                                             withscores=True)
+        page = entries[:limit]
+        pipe = self.conn.pipeline(transaction=False)
+        for run_id, _ in page:
+            pipe.hgetall(self._run_key(self._decode(run_id)))
+        runs = [run for run in (self._parse(data) for data in pipe.execute()) if run is not None]
+
+        next_cursor = None
+        if len(entries) > limit:
+            last_id, last_score = page[-1]
+            next_cursor = encode_cursor(last_score, self._decode(last_id))
+        return runs, next_cursor
+
+    def change_cursor(self) -> str:
+        """Id of the newest change feed entry ("0-0" when empty); it changes whenever any run does."""
+        latest = self.conn.xrevrange(RUN_CHANGES_KEY, count=1)
+        return self._decode(latest[0][0]) if latest else "0-0"
+
+    def changes(self, since: str, limit: int = 500) -> Dict[str, Any]:
+        """
+        Runs saved or deleted after change cursor `since`, each once in its
+        current state, and the cursor to ask with next time. Raises
+        ValueError for a malformed cursor and ChangeFeedExpired when changes
+        after it were already trimmed from the feed.
+        """
+        event_id_key(since)
+        pipe = self.conn.pipeline(transaction=False)
+        pipe.xrange(RUN_CHANGES_KEY, count=1)
+        pipe.xlen(RUN_CHANGES_KEY)
+        pipe.xrange(RUN_CHANGES_KEY, min=f"({since}", max="+", count=limit + 1)
+        first, length, entries = pipe.execute()
+        # Approximate trimming keeps at least maxlen entries, so a shorter feed was never trimmed
+        if first and length >= self.changes_maxlen and event_id_key(self._decode(first[0][0])) > event_id_key(since):
+            raise ChangeFeedExpired(since)
+
+        page = entries[:limit]
+        changed: Dict[str, str] = {}
+        for entry_id, fields in page:
+            changed[self._decode(fields.get(b"run_id", fields.get("run_id")))] = self._decode(entry_id)
+        pipe = self.conn.pipeline(transaction=False)
+        for run_id in changed:
+            pipe.hgetall(self._run_key(run_id))
+        runs, deleted = [], []
+        for run_id, data in zip(changed, pipe.execute()):
+            run = self._parse(data)
+            if run is None:
+                deleted.append(run_id)
+            else:
+                runs.append(run)
+        return {
+            "runs": runs,
+            "deleted": deleted,
+            "cursor": self._decode(page[-1][0]) if page else since,
+            "has_more": len(entries) > limit,
+        }
+
+    def counts(self, flow_id: Optional[str] = None) -> Dict[str, int]:
+        pipe = self.conn.pipeline(transaction=False)
+        for status in RUN_STATUSES:
+            pipe.zcard(self._index_key(flow_id, status))
+        return dict(zip(RUN_STATUSES, pipe.execute()))
+
+    def migrate_legacy(self, key: str = LEGACY_RUNS_KEY) -> int:
+        """Imports runs from the old single sorted set (last version of each run wins) and removes it."""
+        latest: Dict[str, WorkflowRun] = {}
+        for member in self.conn.zrange(key, 0, -1):
+            try:
+                data = json.loads(self._decode(member))
+                data["flow_id"] = data.get("flow_id") or "unknown"
+                run = WorkflowRun(**data)
+            except (ValueError, TypeError) as e:
+                logger.error(f"Skipping invalid legacy run: {str(e)}")
+                continue
+            if run.id not in latest or run.end_time is not None:
+                latest[run.id] = run
+        for run in latest.values():
+            self.save(run)
+        self.conn.delete(key)
+        return len(latest)
+
+
+class RunChangeLog:
+    """
+    The run change feed as a RunEventHub log (async connection), so every
+    dashboard watching it shares the hub's one blocking reader. Each batch
+    of changes is resolved to current run states once, not per watcher:
+    entries are {"type": "run", "run": {...}} or {"type": "deleted", "run_id": ...},
+    with ids from the feed, and are only read on RUN_CHANGES_CHANNEL.
+    """
+
+    def __init__(self, conn, key: str = RUN_CHANGES_KEY):
+        self.conn = conn
+        self.key = key
+
+    async def latest(self) -> str:
+        latest = await self.conn.xrevrange(self.key, count=1)
+        return _decode(latest[0][0]) if latest else "0-0"
+
+    async def _resolve(self, messages) -> List[Entry]:
+        changed: Dict[str, str] = {}
+        for entry_id, fields in messages:
+            run_id = _decode(fields.get(b"run_id", fields.get("run_id")))
+            # A run changed twice in one batch is sent once, at its later id
+            changed.pop(run_id, None)
+            changed[run_id] = _decode(entry_id)
+        if not changed:
+            return []
+        pipe = self.conn.pipeline(transaction=False)
+        for run_id in changed:
+            pipe.hgetall(RunStore._run_key(run_id))
+        entries = []
+        for (run_id, entry_id), data in zip(changed.items(), await pipe.execute()):
+            run = parse_run(data)
+            event = {"type": "deleted", "run_id": run_id} if run is None else {"type": "run", "run": run.model_dump()}
+            entries.append((entry_id, event))
+        return entries
+
+    async def read_after(self, channel: str, last_id: str = "0-0", count: Optional[int] = None) -> List[Entry]:
+        return await self._resolve(await self.conn.xrange(self.key, min=f"({last_id}", max="+", count=count))
+
+    async def wait(self, cursors: Dict[str, str], block_ms: int) -> Dict[str, List[Entry]]:
+        if RUN_CHANGES_CHANNEL not in cursors:
+            return {}
+        response = await self.conn.xread({self.key: cursors[RUN_CHANGES_CHANNEL]}, block=block_ms)
+        messages = [message for _, stream_messages in (response or []) for message in stream_messages]
+        return {RUN_CHANGES_CHANNEL: await self._resolve(messages)} if messages else {}
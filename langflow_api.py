@@ -1,34 +1,25 @@
-import asyncio
 import json
-from datetime import datetime
-from fastapi import APIRouter, Request, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Request, Response, HTTPException
 from fastapi.responses import StreamingResponse
 from core.memory.redis_client import MemoryStore
-from typing import Optional
-from pydantic import BaseModel, ValidationError
+from core.workflows.engine import WorkflowQueueFull
+from core.workflows.models import WorkflowRun
+from core.workflows.run_events import event_id_key
+from core.workflows.run_store import RUN_CHANGES_CHANNEL, ChangeFeedExpired, RunStore
+from typing import List, Optional
 import logging
-import uuid
 
 print("langflow_api.py loaded")
 
-REDIS_RUNS_KEY = "workflow_runs"
-REDIS_MAX_RUNS = 50
-
-class WorkflowRun(BaseModel):
-    id: str
-    flow_id: str
-    status: str
-    start_time: float
-    end_time: Optional[float] = None
-    duration: Optional[float] = None
+# Shares the process-wide Redis connection pool
+memory_store = MemoryStore()
+run_store = RunStore(memory_store.conn)
 
 def store_run(run: WorkflowRun):
-    memory_store = MemoryStore()
     try:
-        memory_store.conn.zadd(REDIS_RUNS_KEY, {run.json(): run.start_time})
-        memory_store.conn.zremrangebyrank(REDIS_RUNS_KEY, 0, -REDIS_MAX_RUNS)
+        run_store.save(run)
     except Exception as e:
-        print(f"Error storing run: {e}")
+        logger.error(f"Error storing run {run.id}: {str(e)}")
 
 router = APIRouter()
 
@@ -46,32 +37,119 @@ async def list_flows():
 
 logger = logging.getLogger(__name__)
 
-@router.get("/langflow/runs")
-async def list_runs():
-    memory_store = MemoryStore()
-    runs = memory_store.conn.zrevrange(REDIS_RUNS_KEY, 0, 50)
-    if not runs:
-        return []
-    
-    valid_runs = []
-    for run in runs:
-        try:
-            run_str = run.decode("utf-8") if isinstance(run, bytes) else run
-            run_dict = json.loads(run_str)
-            
-            if not run_dict.get("flow_id"):
-                run_dict["flow_id"] = "unknown"
-                
-            valid_runs.append(WorkflowRun(**run_dict))
-            
-        except (json.JSONDecodeError, ValidationError) as e:
-            logger.error(f"Invalid run format: {run_str}. Error: {str(e)}")
-            continue
-            
-    return valid_runs
+def _etag(change_cursor: str) -> str:
+    return f'W/"{change_cursor}"'
+
+def _not_modified(request: Request, etag: str) -> bool:
+    return etag in request.headers.get("if-none-match", "")
+
+@router.get("/langflow/runs", response_model=List[WorkflowRun])
+def list_runs(
+    request: Request,
+    response: Response,
+    flow_id: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+):
+    """
+    Newest-first page of runs, filtered by flow, status and start_time range.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    X-Change-Cursor is where to follow /langflow/runs/changes from; it is
+    also the ETag, so an unchanged store answers 304 without reading runs.
+    """
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    change_cursor = run_store.change_cursor()
+    etag = _etag(change_cursor)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "X-Change-Cursor": change_cursor})
+    response.headers["ETag"] = etag
+    response.headers["X-Change-Cursor"] = change_cursor
+    try:
+        runs, next_cursor = run_store.list_runs(flow_id, status, since, until, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return runs
+
+@router.get("/langflow/runs/stats")
+def run_stats(flow_id: Optional[str] = None):
+    return run_store.counts(flow_id)
+
+@router.get("/langflow/runs/changes")
+def run_changes(request: Request, response: Response, since: str, limit: int = 500):
+    """
+    Runs created, updated or deleted after change cursor `since` (the
+    X-Change-Cursor of /langflow/runs, then each response's `cursor`).
+    304 when nothing changed (If-None-Match); 410 when the cursor is older
+    than the retained feed and the list has to be reloaded.
+    """
+    if not 1 <= limit <= 5000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 5000")
+    etag = _etag(run_store.change_cursor())
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    try:
+        changes = run_store.changes(since, limit)
+    except ChangeFeedExpired:
+        raise HTTPException(status_code=410, detail="Change cursor expired, reload /langflow/runs")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid change cursor")
+    response.headers["ETag"] = etag
+    return changes
+
+@router.get("/langflow/runs/changes/stream")
+async def stream_run_changes(request: Request, since: Optional[str] = None):
+    """
+    Server-sent run changes after `since` (default: from now on), one event
+    per changed run: {"type": "run", "run": {...}} or {"type": "deleted",
+    "run_id": ...}. Reconnects resume from Last-Event-ID. All watchers share
+    one reader, so the cost follows the change rate, not the viewer count.
+    """
+    hub = request.app.state.run_change_hub
+    last_event_id = request.headers.get("last-event-id") or since or await hub.log.latest()
+    try:
+        event_id_key(last_event_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid change cursor")
+
+    async def event_generator():
+        async for entry in hub.events(RUN_CHANGES_CHANNEL, last_event_id):
+            if entry is None:
+                yield ": keep-alive\n\n"
+                continue
+            event_id, event = entry
+            yield f"id: {event_id}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/langflow/runs/{run_id}", response_model=WorkflowRun)
+def get_run(run_id: str):
+    run = run_store.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run: {run_id}")
+    return run
+
+async def submit_run(request: Request, flow_id: str, payload, trigger: str) -> dict:
+    engine = request.app.state.workflow_engine
+    try:
+        run = await engine.submit(flow_id, payload, trigger=trigger)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown flow: {flow_id}")
+    except WorkflowQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"runId": run.id, "status": run.status}
 
 @router.post("/langflow/trigger")
-async def trigger_flow(request: Request, background_tasks: BackgroundTasks):
+async def trigger_flow(request: Request):
     try:
         data = await request.json()
         
@@ -79,69 +157,59 @@ async def trigger_flow(request: Request, background_tasks: BackgroundTasks):
         if not workflow_id:
             raise HTTPException(status_code=400, detail="workflowId is required")
 
-        run_id = f"run_{workflow_id}_{uuid.uuid4()}"
-        run = WorkflowRun(
-            id=run_id,
-            flow_id=workflow_id,
-            status="started",
-            start_time=datetime.now().timestamp(),
-            end_time=None,
-            duration=None
+        return await submit_run(
+            request, workflow_id, data.get("inputPayload") or {}, data.get("triggerType", "manual")
         )
-        store_run(run)
-
-        async def run_flow():
-            await asyncio.sleep(2)
-            run.status = "completed"
-            run.end_time = datetime.now().timestamp()
-            run.duration = run.end_time - run.start_time
-            store_run(run)
-
-        background_tasks.add_task(run_flow)
-        return {"runId": run_id, "status": "started"}
 
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
 
 @router.post("/langflow/webhook/{flow_id}")
-async def webhook_trigger(
-    flow_id: str,
-    request: Request,
-    background_tasks: BackgroundTasks
-):
+async def webhook_trigger(flow_id: str, request: Request):
     try:
         data = await request.json()
-        run_id = f"run_{flow_id}_{uuid.uuid4()}"
-        run = WorkflowRun(
-            id=run_id,
-            flow_id=flow_id,
-            status="started",
-            start_time=datetime.now().timestamp(),
-            end_time=None,
-            duration=None
-        )
-        store_run(run)
-
-        async def run_flow():
-            await asyncio.sleep(2)
-            run.status = "completed"
-            run.end_time = datetime.now().timestamp()
-            run.duration = run.end_time - run.start_time
-            store_run(run)
-
-        background_tasks.add_task(run_flow)
-        return {"runId": run_id, "status": "started"}
+        payload = data if isinstance(data, dict) else {"content": data}
+        return await submit_run(request, flow_id, payload, "webhook")
     
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
 
+@router.get("/langflow/engine/stats")
+async def engine_stats(request: Request):
+    return request.app.state.workflow_engine.stats()
+
 @router.get("/langflow/runs/{run_id}/stream")
-async def stream_logs(run_id: str):
+async def stream_logs(run_id: str, request: Request):
+    """
+    Server-sent events for a run, ending after its completed/failed event.
+    Each event carries its stream id, so a reconnecting client resumes from
+    the Last-Event-ID header (or ?last_event_id=) without gaps.
+    """
+    hub = request.app.state.run_event_hub
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    if last_event_id is not None:
+        try:
+            event_id_key(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
     async def event_generator():
-        for i in range(5):
-            await asyncio.sleep(1)
-            yield f"data: Log line {i+1} for {run_id}\n\n"
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+        async for entry in hub.events(run_id, last_event_id):
+            if entry is None:
+                yield ": keep-alive\n\n"
+                continue
+            event_id, event = entry
+            yield f"id: {event_id}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/langflow/events/stats")
+async def run_event_stats(request: Request):
+    return request.app.state.run_event_hub.stats()
 
 @router.get("/test")
 async def test():
@@ -1,96 +1,94 @@
-from fastapi import FastAPI, UploadFile, Request, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, Request, HTTPException, BackgroundTasks, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from agents.classifier_agent.classifier import ClassifierAgent
+from agents.classifier_agent.scheduler import IntentBatchScheduler
 from agents.email_agent.email_agent import EmailAgent
 from agents.json_agent.json_agent import JSONAgent
 from agents.pdf_agent.pdf_agent import PDFAgent
-from core.routers.action_router import ActionRouter
-from core.memory.redis_client import MemoryStore
-from langflow_api import langflow_router
+from agents.pdf_agent.extraction import shutdown_process_pool
+from core.routers.action_router import AsyncActionRouter
+from core.routers.action_queue import DurableActionQueue, ActionDispatcher, QueuedActionRouter
+from core.memory.redis_client import MemoryStore, AsyncMemoryStore
+from core.pipeline.executor import StageExecutor
+from core.pipeline.dedup import IdempotencyKeyConflict, ProcessedResultStore
+from core.pipeline.processor import DocumentPipeline, UnsupportedFormatError
+from core.pipeline.batch import BatchProcessor
+from core.pipeline.spool import spool_upload
+from core.workflows.agent_steps import build_agent_steps
+from core.workflows.engine import WorkflowEngine
+from core.workflows.run_events import MemoryRunEventLog, RedisRunEventLog, RunEventHub
+from core.scheduling.cron import DistributedCronScheduler
+from core.observability.structured_logging import setup_logging
+from core.observability.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as metrics_registry, render_stats
+from core.workflows.run_store import RunChangeLog
+from langflow_api import langflow_router, run_store, store_run as store_langflow_run
 import os
-from typing import Optional
+from typing import List, Optional
 import json
 import logging
 import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
-from apscheduler.schedulers.background import BackgroundScheduler
-import httpx
-from pydantic import BaseModel
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Set up logging: JSON lines written by a background thread, rotated by size (LOG_FILE, LOG_MAX_BYTES).
+    # Installed here rather than at import, so importing main (tests, tooling) never writes to the log file
+    log_pipeline = setup_logging()
+    metrics_registry.register_stats("logging", log_pipeline.stats)
+    if ACTION_DISPATCH_MODE == "queue":
+        action_dispatcher.start()
+    app.state.workflow_engine = workflow_engine
+    app.state.run_event_hub = run_event_hub
+    app.state.run_change_hub = run_change_hub
+    try:
+        # One-off import of run history from the old single sorted set
+        await stage_executor.run("trace", run_store.migrate_legacy)
+    except Exception as e:
+        logger.error(f"Legacy run history migration failed: {str(e)}")
+    try:
+        await cron_scheduler.import_jobs(load_cron_jobs())
+    except Exception as e:
+        logger.error(f"Cron job import failed: {str(e)}")
+    cron_scheduler.start()
+    yield
+    await cron_scheduler.stop()
+    await workflow_engine.aclose()
+    await run_event_hub.aclose()
+    await run_change_hub.aclose()
+    await action_dispatcher.stop()
+    await pipeline.aclose()
+    shutdown_process_pool()
+    log_pipeline.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 # ===== CHANGED: Added prefix to router =====
 app.include_router(langflow_router, prefix="/api")
 
-# Set up logging
-os.makedirs("logs", exist_ok=True)
-logging.basicConfig(
-    filename="logs/processing.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
-# Redis configuration
-REDIS_RUNS_KEY = "workflow_runs"
-REDIS_MAX_RUNS = 50
+# "queue": actions go through the durable Redis stream, "direct": delivered inline
+ACTION_DISPATCH_MODE = os.getenv("ACTION_DISPATCH_MODE", "queue")
 
-# Cron job configuration
+# Cron jobs used to live in this file; it is read once to import them into Redis (see cron:imported)
 CRON_JOBS_FILE = "lib/cron-jobs.json"
 
-class WorkflowRun(BaseModel):
-    id: str
-    flow_id: str
-    status: str
-    start_time: float
-    end_time: Optional[float] = None
-    duration: Optional[float] = None
-
 def load_cron_jobs():
     if os.path.exists(CRON_JOBS_FILE):
         with open(CRON_JOBS_FILE, "r") as f:
             return json.load(f)
     return []
 
-def save_cron_jobs(jobs):
-    with open(CRON_JOBS_FILE, "w") as f:
-        json.dump(jobs, f, indent=2)
-
-def trigger_workflow(workflow_id: str):
-    try:
-        response = httpx.post(
-            "http://localhost:8000/api/langflow/trigger",
-            json={
-                "flowId": workflow_id,
-                "triggerType": "cron",
-                "inputPayload": {}
-            }
-        )
-        logger.info(f"Triggered workflow {workflow_id}: {response.json()}")
-    except Exception as e:
-        logger.error(f"Error triggering workflow {workflow_id}: {str(e)}")
-
-# Initialize scheduler
-scheduler = BackgroundScheduler()
-scheduler.start()
-
-# Load existing cron jobs on startup
-for job in load_cron_jobs():
-    scheduler.add_job(
-        trigger_workflow,
-        "cron",
-        args=[job["workflowId"]],
-        id=job["id"],
-        **job["schedule"]
-    )
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read by the dashboard to follow the run change feed and page through runs
+    expose_headers=["X-Change-Cursor", "ETag", "X-Next-Cursor"],
 )
 
 # Initialize components
@@ -98,8 +96,51 @@ classifier = ClassifierAgent()
 email_agent = EmailAgent()
 json_agent = JSONAgent()
 pdf_agent = PDFAgent()
-action_router = ActionRouter()
+action_router = AsyncActionRouter()
 memory_store = MemoryStore()
+async_memory_store = AsyncMemoryStore()
+action_queue = DurableActionQueue(async_memory_store.conn)
+action_dispatcher = ActionDispatcher(action_queue, action_router)
+stage_executor = StageExecutor()
+pipeline = DocumentPipeline(
+    classifier,
+    email_agent,
+    json_agent,
+    pdf_agent,
+    QueuedActionRouter(action_queue, action_router) if ACTION_DISPATCH_MODE == "queue" else action_router,
+    async_memory_store,
+    executor=stage_executor,
+    intent_scheduler=IntentBatchScheduler(classifier, stage_executor),
+    result_store=ProcessedResultStore(async_memory_store.conn)
+)
+batch_processor = BatchProcessor(pipeline)
+# Live run events: per-run Redis Streams, or an in-process ring buffer with RUN_EVENTS_BACKEND=memory
+run_event_hub = RunEventHub(
+    MemoryRunEventLog() if os.getenv("RUN_EVENTS_BACKEND", "redis") == "memory"
+    else RedisRunEventLog(async_memory_store.conn)
+)
+# Dashboard push channel: the RunStore change feed, fanned out by one shared reader
+run_change_hub = RunEventHub(RunChangeLog(async_memory_store.conn))
+workflow_engine = WorkflowEngine(
+    build_agent_steps(classifier, email_agent, json_agent, pdf_agent),
+    executor=stage_executor,
+    llm=classifier.llm,
+    on_update=store_langflow_run,
+    events=run_event_hub
+)
+# Runs in every worker; per-fire Redis locks make each fire happen once
+cron_scheduler = DistributedCronScheduler(async_memory_store.conn, workflow_engine)
+
+# Component counters read only when /metrics is scraped
+metrics_registry.register_stats("intent_cache", classifier.intent_cache.stats)
+metrics_registry.register_stats("pdf_extraction_cache", pdf_agent.extraction_cache.stats)
+metrics_registry.register_stats("classifier_batch", pipeline.intent_scheduler.stats)
+metrics_registry.register_stats("classifier_cascade", classifier.cascade_stats)
+metrics_registry.register_stats("action_router", action_router.stats)
+metrics_registry.register_stats("action_dispatcher", action_dispatcher.stats)
+metrics_registry.register_stats("workflow_engine", workflow_engine.stats)
+metrics_registry.register_stats("run_events", run_event_hub.stats)
+metrics_registry.register_stats("run_changes", run_change_hub.stats)
 
 flows = [
     {"id": "email", "name": "Email Agent"},
@@ -108,106 +149,114 @@ flows = [
     {"id": "classifier", "name": "Classifier Agent"}
 ]
 
-def store_run(run: WorkflowRun):
-    try:
-        memory_store.conn.zadd(REDIS_RUNS_KEY, {run.json(): run.start_time})
-        memory_store.conn.zremrangebyrank(REDIS_RUNS_KEY, 0, -REDIS_MAX_RUNS)
-    except Exception as e:
-        logger.error(f"Error storing run: {str(e)}")
-
 # Cron job management endpoints
 @app.post("/api/cron-jobs")
 async def add_cron_job(request: Request):
     try:
         data = await request.json()
-        jobs = load_cron_jobs()
-        
-        if "id" not in data or "workflowId" not in data or "schedule" not in data:
-            raise HTTPException(status_code=400, detail="Missing required fields: id, workflowId, schedule")
-        
-        jobs.append(data)
-        save_cron_jobs(jobs)
-        
-        scheduler.add_job(
-            trigger_workflow,
-            "cron",
-            args=[data["workflowId"]],
-            id=data["id"],
-            **data["schedule"]
-        )
-        
-        return {"success": True}
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+    if "id" not in data or "workflowId" not in data or "schedule" not in data:
+        raise HTTPException(status_code=400, detail="Missing required fields: id, workflowId, schedule")
+    if data["workflowId"] not in workflow_engine.flows:
+        raise HTTPException(status_code=400, detail=f"Unknown workflow: {data['workflowId']}")
+
+    try:
+        next_fire = await cron_scheduler.add_job(data)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid schedule: {str(e)}")
     except Exception as e:
         logger.error(f"Error adding cron job: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    return {"success": True, "next_fire": next_fire}
 
 @app.get("/api/cron-jobs")
 async def list_cron_jobs():
-    return load_cron_jobs()
+    """Jobs with next fire time and stats (fires, misfires, last run id, last latency)."""
+    return await cron_scheduler.list_jobs()
+
+@app.delete("/api/cron-jobs/{job_id}")
+async def delete_cron_job(job_id: str):
+    if not await cron_scheduler.remove_job(job_id):
+        raise HTTPException(status_code=404, detail=f"Unknown cron job: {job_id}")
+    return {"success": True}
 
 @app.post("/process-file")
-async def process_file(file: UploadFile):
+async def process_file(file: UploadFile, reroute: bool = False, idempotency_key: Optional[str] = Header(None)):
+    """
+    Classifies, processes and routes one document. A retry with the same
+    Idempotency-Key, or the same bytes again within PROCESS_DEDUP_WINDOW,
+    returns the stored result ("duplicate": true) without reprocessing;
+    `reroute=true` sends its action again.
+    """
+    filename = file.filename
     try:
-        filename = file.filename
-        ext = os.path.splitext(filename)[1].lower()
-        source_id = os.path.splitext(filename)[0]
-
-        logger.info(f"Started processing: {filename}")
-
-        # Read content
-        if ext == ".pdf":
-            temp_path = f"temp_{filename}"
-            with open(temp_path, "wb") as f_out:
-                content_bytes = await file.read()
-                f_out.write(content_bytes)
-            content = None
-        else:
-            content_bytes = await file.read()
-            content = content_bytes.decode("utf-8")
-            temp_path = None
-
-        # Classify
-        classification = classifier.classify(filename, content if content else "")
-        logger.info(f"Classification result: {classification}")
-
-        # Agent processing
-        if classification["format"] == "Email":
-            result = email_agent.process(filename, content, classification)
-            action = result["action"]
-        elif classification["format"] == "JSON":
-            result = json_agent.process(filename, content, classification)
-            action = "alert" if not result["valid"] else "accept"
-        elif classification["format"] == "PDF":
-            result = pdf_agent.process(temp_path, classification)
-            action = result.get("flag", "accepted")
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported format")
-
-        logger.info(f"Processing result: {result}")
-
-        # Action routing
-        payload = {"source_id": source_id, "result": result}
-        action_result = action_router.route_action(
-            action if action in action_router.endpoints else "routine", 
-            payload
-        )
-        logger.info(f"Action result: {action_result}")
-
-        # Get and log full trace
-        trace = memory_store.get_full_trace(source_id)
-        logger.info(f"Redis trace data: {trace}")
-
-        # Cleanup
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
-
-        return {
-            "classification": classification,
-            "processing_result": result,
-            "action_router_result": action_result,
-            "full_trace": trace
-        }
+        logger.info("Started processing", extra={"document": filename})
+        document = await spool_upload(file, stage_executor)
+        return await pipeline.process(filename, document, idempotency_key=idempotency_key, reroute=reroute)
 
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IdempotencyKeyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing {filename}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/process-batch")
+async def process_batch(files: List[UploadFile], workers: Optional[int] = None):
+    """
+    Processes many uploads (plain files and/or zip/tar archives) concurrently and
+    streams one NDJSON result line per document as soon as it finishes.
+    """
+    if workers is not None and workers < 1:
+        raise HTTPException(status_code=400, detail="workers must be at least 1")
+    logger.info("Started batch", extra={"documents": [f.filename for f in files]})
+    return StreamingResponse(
+        batch_processor.stream_ndjson(files, workers),
+        media_type="application/x-ndjson"
+    )
+
+@app.get("/api/classifier/cache-stats")
+async def classifier_cache_stats():
+    return classifier.intent_cache.stats()
+
+@app.get("/api/pdf/cache-stats")
+async def pdf_cache_stats():
+    return pdf_agent.extraction_cache.stats()
+
+@app.get("/api/actions/status")
+async def action_router_status():
+    return action_router.stats()
+
+@app.get("/api/actions/queue")
+async def action_queue_status(dead_letters: int = 0):
+    try:
+        status = await action_queue.stats()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Action queue unavailable: {str(e)}")
+    status["mode"] = ACTION_DISPATCH_MODE
+    status["dispatcher"] = action_dispatcher.stats()
+    if dead_letters > 0:
+        status["recent_dead_letters"] = await action_queue.dead_letters(dead_letters)
+    return status
+
+@app.get("/api/classifier/batch-stats")
+async def classifier_batch_stats():
+    return pipeline.intent_scheduler.stats()
+
+@app.get("/api/classifier/cascade-stats")
+async def classifier_cascade_stats():
+    return classifier.cascade_stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of stage latencies, counters and component stats."""
+    body = metrics_registry.render()
+    if ACTION_DISPATCH_MODE == "queue":
+        try:
+            body += render_stats("action_queue", await asyncio.wait_for(action_queue.stats(), 1.0))
+        except Exception as e:
+            body += f"# action_queue stats unavailable: {' '.join(str(e).split())}\n"
+    return Response(body, media_type=METRICS_CONTENT_TYPE)
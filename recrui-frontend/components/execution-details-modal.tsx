@@ -48,16 +48,24 @@ export function ExecutionDetailsModal({ open, onOpenChange, executionId, engine
   useEffect(() => {
     if (open && executionId && engine === 'langflow') {
       // Only connect when langflow is selected and modal is open
+      setRealtimeLogs([])
       const eventSource = new EventSource(`${process.env.NEXT_PUBLIC_API_URL}/api/langflow/runs/${executionId}/stream`)
 
-
       eventSource.onmessage = (e) => {
         setRealtimeLogs(prev => [...prev, e.data])
+        const event = JSON.parse(e.data)
+        if (event.type === "completed" || event.type === "failed") {
+          // The server ends the stream after the terminal event; refresh the run instead of reconnecting
+          eventSource.close()
+          fetchExecutionDetails(false)
+        }
       }
 
       eventSource.onerror = (e) => {
-        console.error('SSE error:', e)
-        eventSource.close()
+        // Transient errors are retried by the browser, resuming from Last-Event-ID
+        if (eventSource.readyState === EventSource.CLOSED) {
+          console.error('SSE error:', e)
+        }
       }
 
       return () => {
@@ -66,21 +74,20 @@ export function ExecutionDetailsModal({ open, onOpenChange, executionId, engine
     }
   }, [open, executionId, engine])
 
-  const fetchExecutionDetails = async () => {
+  const fetchExecutionDetails = async (showLoading = true) => {
     if (!executionId || !engine) return;
 
-    setLoading(true);
+    if (showLoading) setLoading(true);
     setError(null);
     try {
-      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/langflow/runs`);
+      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/langflow/runs/${encodeURIComponent(executionId)}`);
+      if (response.status === 404) {
+        throw new Error("Execution not found");
+      }
       if (!response.ok) {
         throw new Error(`API error: ${response.status} ${response.statusText}`);
       }
-      const runs = await response.json();
-      const execution = runs.find((run: any) => run.id === executionId);
-      if (!execution) {
-        throw new Error("Execution not found");
-      }
+      const execution = await response.json();
       setExecutionDetails(transformExecutionData(execution, engine));
     } catch (error) {
       console.error("Error fetching execution details:", error);
@@ -143,9 +150,9 @@ export function ExecutionDetailsModal({ open, onOpenChange, executionId, engine
     } else if (engine === "langflow") {
       return {
         id: data.id,
-        workflowName: data.flow_name || "Unknown Flow",
-        status: data.status === "SUCCESS" ? "success" : data.status === "ERROR" ? "error" : "running",
-        startTime: new Date(data.timestamp)
+        workflowName: data.flow_id || "Unknown Flow",
+        status: data.status === "completed" ? "success" : data.status === "failed" ? "error" : "running",
+        startTime: new Date(data.start_time * 1000)
           .toLocaleDateString("de-DE", {
             day: "2-digit",
             month: "2-digit",
@@ -155,8 +162,9 @@ export function ExecutionDetailsModal({ open, onOpenChange, executionId, engine
             second: "2-digit",
           })
           .replace(",", ""),
-        duration: data.duration ? `${data.duration.toFixed(1)}s` : "N/A",
-        triggerType: data.trigger_type || "manual",
+        endTime: data.end_time ? new Date(data.end_time * 1000).toLocaleString() : undefined,
+        duration: data.duration != null ? `${data.duration.toFixed(1)}s` : "N/A",
+        triggerType: data.trigger || "manual",
         logs: data.logs || [],
         nodes: data.outputs
           ? Object.entries(data.outputs).map(([nodeName, nodeData]: [string, any]) => ({
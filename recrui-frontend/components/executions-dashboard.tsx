@@ -1,6 +1,6 @@
 "use client"
 
-import { useState, useEffect } from "react"
+import { useState, useEffect, useRef } from "react"
 import {
   Play,
   Clock,
@@ -34,6 +34,62 @@ interface Execution {
   folderId?: string
 }
 
+interface LangflowRun {
+  id: string
+  flow_id: string
+  status: string
+  start_time: number
+  end_time?: number | null
+  duration?: number | null
+  trigger?: string | null
+  error?: string | null
+}
+
+type RunChange = { type: "run"; run: LangflowRun } | { type: "deleted"; run_id: string }
+
+const API_URL = process.env.NEXT_PUBLIC_API_URL
+// Fallback when the change stream is unavailable: ask the change feed, which answers 304 while nothing changed
+const CHANGE_POLL_INTERVAL = 30000
+
+// Backend run statuses (queued/started/running/completed/failed) in the dashboard's terms
+const toDashboardStatus = (status: string) => {
+  switch (status) {
+    case "completed":
+      return "success"
+    case "failed":
+      return "error"
+    default:
+      return "running"
+  }
+}
+
+const toExecution = (run: LangflowRun): Execution => ({
+  id: run.id,
+  workflowId: run.flow_id,
+  workflowName: run.flow_id || "Unknown",
+  engine: "langflow",
+  status: toDashboardStatus(run.status),
+  duration: run.duration != null ? `${run.duration.toFixed(1)}s` : "Running...",
+  startTime: new Date(run.start_time * 1000).toLocaleString(),
+  triggerType: run.trigger || "manual",
+  folderId: "unassigned",
+})
+
+// Upserts changed runs and drops deleted ones, keeping newest-first order
+const applyChanges = (executions: Execution[], changes: RunChange[], startTimes: Map<string, number>) => {
+  const byId = new Map(executions.map((execution) => [execution.id, execution]))
+  for (const change of changes) {
+    if (change.type === "deleted") {
+      byId.delete(change.run_id)
+      startTimes.delete(change.run_id)
+    } else {
+      byId.set(change.run.id, toExecution(change.run))
+      startTimes.set(change.run.id, change.run.start_time)
+    }
+  }
+  return [...byId.values()].sort((a, b) => (startTimes.get(b.id) ?? 0) - (startTimes.get(a.id) ?? 0))
+}
+
 interface ExecutionsDashboardProps {
   selectedFolder: string | null
 }
@@ -51,11 +107,81 @@ export function ExecutionsDashboard({ selectedFolder }: ExecutionsDashboardProps
   const [detailsModalOpen, setDetailsModalOpen] = useState(false)
   const [isUsingMockData, setIsUsingMockData] = useState(false)
 
+  // Change feed cursor: from the list's X-Change-Cursor header, then from each change received
+  const changeCursor = useRef<string | null>(null)
+  const changeEtag = useRef<string | null>(null)
+  const startTimes = useRef(new Map<string, number>())
+
   useEffect(() => {
-    fetchExecutions()
-    // Set up polling for real-time updates
-    const interval = setInterval(fetchExecutions, 30000) // Refresh every 30 seconds
-    return () => clearInterval(interval)
+    let eventSource: EventSource | null = null
+    let pollTimer: ReturnType<typeof setInterval> | null = null
+    let closed = false
+
+    let polling = false
+
+    const pollChanges = async () => {
+      if (!changeCursor.current || polling) return
+      polling = true
+      try {
+        // A backlog larger than one page is drained page by page
+        let hasMore = true
+        while (hasMore && !closed) {
+          const response = await fetch(
+            `${API_URL}/api/langflow/runs/changes?since=${encodeURIComponent(changeCursor.current)}`,
+            { headers: changeEtag.current ? { "If-None-Match": changeEtag.current } : {} },
+          )
+          if (response.status === 304) return
+          if (response.status === 410) {
+            // Cursor older than the retained feed: start over from the full list
+            await fetchExecutions(true)
+            return
+          }
+          if (!response.ok) throw new Error(`API error: ${response.status} ${response.statusText}`)
+          const feed = await response.json()
+          changeEtag.current = response.headers.get("ETag")
+          changeCursor.current = feed.cursor
+          const changes: RunChange[] = [
+            ...feed.runs.map((run: LangflowRun) => ({ type: "run", run })),
+            ...feed.deleted.map((run_id: string) => ({ type: "deleted", run_id })),
+          ]
+          setExecutions((current) => applyChanges(current, changes, startTimes.current))
+          hasMore = feed.has_more
+        }
+      } catch (error) {
+        console.error("Error polling execution changes:", error)
+      } finally {
+        polling = false
+      }
+    }
+
+    const subscribe = () => {
+      if (closed || !changeCursor.current) return
+      if (typeof EventSource === "undefined") {
+        pollTimer = setInterval(pollChanges, CHANGE_POLL_INTERVAL)
+        return
+      }
+      eventSource = new EventSource(
+        `${API_URL}/api/langflow/runs/changes/stream?since=${encodeURIComponent(changeCursor.current)}`,
+      )
+      eventSource.onmessage = (e) => {
+        changeCursor.current = e.lastEventId || changeCursor.current
+        const change: RunChange = JSON.parse(e.data)
+        setExecutions((current) => applyChanges(current, [change], startTimes.current))
+      }
+      eventSource.onerror = () => {
+        // The browser reconnects by itself (resuming from Last-Event-ID); only a closed stream falls back to polling
+        if (eventSource?.readyState === EventSource.CLOSED && !pollTimer) {
+          pollTimer = setInterval(pollChanges, CHANGE_POLL_INTERVAL)
+        }
+      }
+    }
+
+    fetchExecutions().then(subscribe)
+    return () => {
+      closed = true
+      eventSource?.close()
+      if (pollTimer) clearInterval(pollTimer)
+    }
   }, [])
 
   const fetchExecutions = async (showRefreshing = false) => {
@@ -67,62 +193,24 @@ export function ExecutionsDashboard({ selectedFolder }: ExecutionsDashboardProps
       }
       setError(null)
 
-      console.log("Fetching executions from API...")
-      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/langflow/runs`)
-
+      const response = await fetch(`${API_URL}/api/langflow/runs?limit=500`)
 
       if (!response.ok) {
         throw new Error(`API error: ${response.status} ${response.statusText}`)
       }
 
-      const data = await response.json();
-      const executions = data.map((run: any) => ({
-        id: run.id,
-        workflowId: run.flow_id || run.id,
-        workflowName: run.flowName || run.flow_id || "Unknown",
-        engine: "langflow", // or run.engine if backend provides it
-        status: run.status,
-        duration: run.duration || "0s",
-        startTime: run.start_time || run.startTime || new Date().toISOString(),
-        triggerType: run.triggerType || "manual", // optional
-        folderId: run.folderId || "unassigned" // optional
-      }));
-      setExecutions(executions);
-      setIsUsingMockData(false);
-
-      //setExecutions(data.executions || [])
-
-      console.log(`Loaded ${data.executions?.length || 0} executions`)
+      const runs: LangflowRun[] = await response.json()
+      changeCursor.current = response.headers.get("X-Change-Cursor")
+      changeEtag.current = null
+      startTimes.current = new Map(runs.map((run) => [run.id, run.start_time]))
+      setExecutions(runs.map(toExecution))
+      setIsUsingMockData(false)
+
+      console.log(`Loaded ${runs.length} executions`)
     } catch (error) {
       console.error("Error fetching executions:", error)
       setError("Failed to fetch execution data. The dashboard will show mock data.")
       setIsUsingMockData(true)
-
-      // Set some fallback mock data if the API completely fails
-      /*setExecutions([
-        {
-          id: "fallback-1",
-          workflowId: "wf-1",
-          workflowName: "Email Processor",
-          engine: "n8n",
-          status: "success",
-          duration: "2.3s",
-          startTime: "15.01.2024 14:30:22",
-          triggerType: "webhook",
-          folderId: "unassigned",
-        },
-        {
-          id: "fallback-2",
-          workflowId: "wf-5",
-          workflowName: "ETL Pipeline",
-          engine: "langflow",
-          status: "success",
-          duration: "45.2s",
-          startTime: "15.01.2024 14:20:08",
-          triggerType: "schedule",
-          folderId: "data-processing",
-        },
-      ])*/
     } finally {
       setLoading(false)
       setRefreshing(false)
@@ -196,20 +284,19 @@ export function ExecutionsDashboard({ selectedFolder }: ExecutionsDashboardProps
 
   const handleTriggerWorkflow = async (workflowId: string, engine: string) => {
     try {
-      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/langflow/trigger`, {
+      const response = await fetch(`${API_URL}/api/langflow/trigger`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
-          flowId: workflowId,
+          workflowId,
           triggerType: "manual",
           inputPayload: {}
         })
       })
 
-
-      if (response.ok) {
-        // Refresh executions after triggering
-        setTimeout(() => fetchExecutions(true), 2000)
+      // The new run and its status changes arrive through the change stream
+      if (!response.ok) {
+        console.error(`Trigger failed: ${response.status} ${response.statusText}`)
       }
     } catch (error) {
       console.error("Error triggering workflow:", error)
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import unittest
+import httpx
+from core.routers.action_router import AsyncActionRouter
+from core.routers.action_queue import ActionDispatcher, DurableActionQueue, QueuedActionRouter
+
+try:
+    import fakeredis.aioredis as fakeredis_aio
+except ImportError:
+    fakeredis_aio = None
+
+
+class FakeQueue:
+    """In-memory stand-in for DurableActionQueue that records acks and dead letters."""
+
+    def __init__(self, max_attempts=3):
+        self.max_attempts = max_attempts
+        self.messages = []
+        self.acked = []
+        self.dead = []
+        self.released = []
+
+    async def enqueue(self, action, endpoint, payload):
+        message_id = f"{len(self.messages) + 1}-0"
+        self.messages.append({"id": message_id, "action": action, "endpoint": endpoint,
+                              "payload": payload, "attempts": 1})
+        return message_id
+
+    async def ack(self, message_ids):
+        self.acked.extend(message_ids)
+
+    async def dead_letter(self, message, error):
+        self.dead.append((message["id"], error))
+
+    async def release(self, messages):
+        self.released.extend(m["id"] for m in messages)
+
+
+class TestActionDispatcher(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.requests = []
+
+    def make_router(self, status=200):
+        def handler(request):
+            self.requests.append((str(request.url), json.loads(request.content)))
+            return httpx.Response(status, json={})
+        router = AsyncActionRouter(transport=httpx.MockTransport(handler))
+        router.base_delay = 0.01
+        return router
+
+    async def test_enqueue_does_not_touch_endpoint(self):
+        queue = FakeQueue()
+        router = self.make_router()
+        result = await QueuedActionRouter(queue, router).route_action("routine", {"source_id": "a"})
+        await router.aclose()
+        self.assertEqual(result["status"], "enqueued")
+        self.assertEqual(self.requests, [])
+        self.assertEqual(queue.messages[0]["endpoint"], router.endpoints["routine"])
+
+    async def test_batches_per_endpoint_and_acks(self):
+        queue = FakeQueue()
+        router = self.make_router()
+        for i in range(3):
+            await queue.enqueue("routine", router.endpoints["routine"], {"source_id": str(i)})
+        await queue.enqueue("escalate", router.endpoints["escalate"], {"source_id": "x"})
+
+        dispatcher = ActionDispatcher(queue, router, batch_actions=["routine"])
+        await dispatcher.dispatch(queue.messages)
+        await router.aclose()
+
+        self.assertEqual(len(self.requests), 2)
+        bodies = dict(self.requests)
+        self.assertEqual([p["source_id"] for p in bodies[router.endpoints["routine"]]], ["0", "1", "2"])
+        self.assertEqual(sorted(queue.acked), ["1-0", "2-0", "3-0", "4-0"])
+
+    async def test_failures_stay_pending_then_dead_letter(self):
+        queue = FakeQueue(max_attempts=2)
+        router = self.make_router(status=503)
+        await queue.enqueue("alert", router.endpoints["alert"], {"source_id": "a"})
+        dispatcher = ActionDispatcher(queue, router)
+
+        await dispatcher.dispatch(queue.messages)
+        self.assertEqual(len(self.requests), 1)  # single attempt per dispatch
+        self.assertEqual((queue.acked, queue.dead), ([], []))
+
+        queue.messages[0]["attempts"] = 2
+        await dispatcher.dispatch(queue.messages)
+        await router.aclose()
+        self.assertEqual(queue.dead[0][0], "1-0")
+        self.assertEqual(dispatcher.stats()["dead_lettered"], 1)
+
+    async def test_open_circuit_releases_instead_of_failing(self):
+        queue = FakeQueue(max_attempts=1)
+        router = self.make_router(status=503)
+        router.breakers[router.endpoints["alert"]].failure_threshold = 1
+        await queue.enqueue("alert", router.endpoints["alert"], {"source_id": "a"})
+        await queue.enqueue("alert", router.endpoints["alert"], {"source_id": "b"})
+        dispatcher = ActionDispatcher(queue, router)
+
+        await dispatcher.dispatch(queue.messages[:1])  # fails and opens the circuit
+        await dispatcher.dispatch(queue.messages[1:])
+        await router.aclose()
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(queue.dead[0][0], "1-0")
+        self.assertEqual(queue.released, ["2-0"])
+        self.assertEqual(dispatcher.stats()["deferred_circuit_open"], 1)
+
+
+@unittest.skipIf(fakeredis_aio is None, "fakeredis is not installed")
+class TestDurableActionQueue(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.conn = fakeredis_aio.FakeRedis()
+        self.queue = DurableActionQueue(self.conn, max_attempts=2, base_backoff=0.01)
+        self.status = 503
+
+        def handler(request):
+            return httpx.Response(self.status, json={})
+        self.router = AsyncActionRouter(transport=httpx.MockTransport(handler))
+        self.dispatcher = ActionDispatcher(self.queue, self.router)
+
+    async def asyncTearDown(self):
+        await self.router.aclose()
+
+    async def delivery_counts(self):
+        pending = await self.conn.xpending_range(self.queue.stream, self.queue.group, min="-", max="+", count=10)
+        return [p["times_delivered"] for p in pending]
+
+    async def test_claim_retry_then_dead_letter(self):
+        await self.queue.enqueue("alert", self.router.endpoints["alert"], {"source_id": "a"})
+        messages = await self.queue.read("c1", 10, block_ms=10)
+        self.assertEqual([m["attempts"] for m in messages], [1])
+        await self.dispatcher.dispatch(messages)
+        self.assertEqual(await self.queue.claim_retries("c1", 10), [])  # backoff not elapsed
+
+        await asyncio.sleep(0.05)
+        retries = await self.queue.claim_retries("c2", 10)
+        self.assertEqual([m["attempts"] for m in retries], [2])
+        await self.dispatcher.dispatch(retries)
+
+        stats = await self.queue.stats()
+        self.assertEqual((stats["depth"], stats["pending"], stats["dead_letters"]), (0, 0, 1))
+        self.assertEqual((await self.queue.dead_letters())[0]["payload"], {"source_id": "a"})
+
+    async def test_retry_that_succeeds_is_acked(self):
+        await self.queue.enqueue("routine", self.router.endpoints["routine"], {"source_id": "b"})
+        await self.dispatcher.dispatch(await self.queue.read("c1", 10, block_ms=10))
+        self.status = 200
+        await asyncio.sleep(0.05)
+        await self.dispatcher.dispatch(await self.queue.claim_retries("c1", 10))
+        stats = await self.queue.stats()
+        self.assertEqual((stats["depth"], stats["pending"], stats["dead_letters"]), (0, 0, 0))
+
+    async def test_messages_backing_off_do_not_block_later_retries(self):
+        self.queue.max_attempts, self.queue.claim_page_size = 10, 2
+        for i in range(5):
+            await self.queue.enqueue("alert", self.router.endpoints["alert"], {"source_id": str(i)})
+        messages = await self.queue.read("c1", 10, block_ms=10)
+        # The four oldest have failed often enough to be in a long backoff
+        for message in messages[:4]:
+            await self.conn.xclaim(self.queue.stream, self.queue.group, "c1", 0, [message["id"]],
+                                   retrycount=6, justid=True)
+        await asyncio.sleep(0.05)
+        retries = await self.queue.claim_retries("c2", 1)
+        self.assertEqual([m["payload"]["source_id"] for m in retries], ["4"])
+
+    async def test_circuit_open_rejections_do_not_use_attempts(self):
+        breaker = self.router.breakers[self.router.endpoints["alert"]]
+        breaker.failure_threshold = 1
+        breaker.record_failure()
+        await self.queue.enqueue("alert", self.router.endpoints["alert"], {"source_id": "c"})
+        await self.dispatcher.dispatch(await self.queue.read("c1", 10, block_ms=10))
+        self.assertEqual(await self.delivery_counts(), [0])
+
+        for _ in range(3):
+            await asyncio.sleep(0.05)
+            retries = await self.queue.claim_retries("c1", 10)
+            self.assertEqual([m["attempts"] for m in retries], [1])
+            await self.dispatcher.dispatch(retries)
+        stats = await self.queue.stats()
+        self.assertEqual((stats["pending"], stats["dead_letters"]), (1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import asyncio
+import time
+import unittest
+import httpx
+from core.routers.action_router import AsyncActionRouter
+from core.routers.circuit_breaker import CircuitBreaker
+
+
+class FlakyEndpoint:
+    def __init__(self, failures=0, status=503):
+        self.failures = failures
+        self.status = status
+        self.calls = 0
+
+    def __call__(self, request):
+        self.calls += 1
+        if self.calls <= self.failures:
+            return httpx.Response(self.status, json={"error": "unavailable"})
+        return httpx.Response(200, json={"ok": True})
+
+
+class TestAsyncActionRouter(unittest.IsolatedAsyncioTestCase):
+    def make_router(self, handler):
+        router = AsyncActionRouter(transport=httpx.MockTransport(handler))
+        router.base_delay = 0.01
+        return router
+
+    async def test_retries_then_succeeds(self):
+        endpoint = FlakyEndpoint(failures=2)
+        router = self.make_router(endpoint)
+        result = await router.route_action("escalate", {"source_id": "a"})
+        await router.aclose()
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(endpoint.calls, 3)
+
+    async def test_open_circuit_fails_fast(self):
+        endpoint = FlakyEndpoint(failures=1000)
+        router = self.make_router(endpoint)
+        for breaker in router.breakers.values():
+            breaker.failure_threshold = 3
+        await router.route_action("escalate", {})
+        start = time.perf_counter()
+        result = await router.route_action("escalate", {})
+        await router.aclose()
+        self.assertIn("Circuit open", result["error"])
+        self.assertEqual(endpoint.calls, 3)
+        self.assertLess(time.perf_counter() - start, 0.05)
+        # Other endpoints are unaffected
+        self.assertEqual(router.stats()["circuits"][router.endpoints["routine"]]["state"], "closed")
+
+    async def test_fire_and_forget_returns_before_delivery(self):
+        delivered = asyncio.Event()
+
+        def handler(request):
+            delivered.set()
+            return httpx.Response(200, json={})
+
+        router = self.make_router(handler)
+        result = await router.route_action("routine", {"source_id": "b"}, wait=False)
+        self.assertEqual(result["status"], "queued")
+        await asyncio.wait_for(delivered.wait(), 1)
+        await router.aclose()
+
+    async def test_cancelled_trial_releases_half_open_circuit(self):
+        started = asyncio.Event()
+
+        async def hang(request):
+            started.set()
+            await asyncio.Event().wait()
+
+        router = self.make_router(hang)
+        breaker = router.breakers[router.endpoints["alert"]]
+        breaker.failure_threshold, breaker.reset_timeout = 1, 0
+        breaker.record_failure()
+        call = asyncio.create_task(router.route_action("alert", {}))
+        await asyncio.wait_for(started.wait(), 1)
+        call.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await call
+        await router.aclose()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+
+    async def test_unknown_action(self):
+        router = self.make_router(FlakyEndpoint())
+        result = await router.route_action("nope", {})
+        self.assertEqual(result["status"], "error")
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_half_open_allows_one_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import asyncio
+import io
+import json
+import tarfile
+import unittest
+import zipfile
+from unittest import mock
+from starlette.datastructures import UploadFile
+from core.pipeline import batch
+from core.pipeline.batch import BatchProcessor, iter_archive_members
+from core.pipeline.spool import DocumentTooLarge, spool_stream
+from core.pipeline.executor import StageExecutor
+
+
+class StubPipeline:
+    def __init__(self):
+        self.executor = StageExecutor(max_workers=4)
+
+    async def process(self, filename, content):
+        if filename.startswith("slow"):
+            await asyncio.sleep(0.2)
+        if filename.startswith("bad"):
+            raise ValueError("Unsupported format")
+        return {"filename": filename, "size": len(content)}
+
+
+def make_zip(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    buf.seek(0)
+    return buf
+
+
+def make_tar(members):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tf:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    buf.seek(0)
+    return buf
+
+
+class TestBatchProcessor(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.processor = BatchProcessor(StubPipeline(), workers=4)
+
+    async def collect(self, uploads):
+        return [result async for result in self.processor.process(uploads)]
+
+    def test_iter_tar_members(self):
+        members = dict(iter_archive_members(make_tar({"a.eml": b"abc", "b/c.json": b"{}"}), "batch.tar.gz"))
+        self.assertEqual({name: document.data for name, document in members.items()},
+                         {"a.eml": b"abc", "b/c.json": b"{}"})
+        self.assertEqual(members["b/c.json"].filename, "c.json")
+
+    def test_large_members_are_spooled(self):
+        data = b"x" * (2 * 1024 * 1024)
+        (_, document), = iter_archive_members(make_zip({"big.eml": data}), "batch.zip")
+        try:
+            self.assertTrue(document.on_disk)
+            self.assertEqual(document.size, len(data))
+        finally:
+            document.cleanup()
+
+    async def test_oversized_members_are_reported_not_unpacked(self):
+        uploads = [
+            UploadFile(file=make_zip({"bomb.eml": b"0" * 4096, "ok.eml": b"y"}), filename="batch.zip"),
+            UploadFile(file=make_tar({"bomb.eml": b"0" * 4096}), filename="batch.tgz"),
+        ]
+        with mock.patch.object(batch, "BATCH_MEMBER_MAX_SIZE", 1024):
+            results = await self.collect(uploads)
+        self.assertEqual(sorted((r["filename"], r["status"]) for r in results),
+                         [("bomb.eml", "error"), ("bomb.eml", "error"), ("ok.eml", "ok")])
+        self.assertTrue(all("larger than 1024 bytes" in r["error"] for r in results if r["status"] == "error"))
+
+    def test_member_larger_than_declared_is_cut_off(self):
+        # Stand-in for a lying header: the declared size passes, what is read does not
+        with self.assertRaises(DocumentTooLarge):
+            spool_stream("bomb.eml", io.BytesIO(b"0" * 4096), max_size=1024, chunk_size=512)
+
+    async def test_results_stream_in_completion_order(self):
+        uploads = [
+            UploadFile(file=make_zip({"slow.pdf": b"%PDF-", "fast.eml": b"From: a"}), filename="batch.zip"),
+            UploadFile(file=io.BytesIO(b"{}"), filename="order.json"),
+        ]
+        results = await self.collect(uploads)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[-1]["filename"], "slow.pdf")
+
+    async def test_member_errors_are_reported_per_file(self):
+        uploads = [UploadFile(file=make_tar({"bad.bin": b"x", "ok.eml": b"y"}), filename="batch.tgz")]
+        results = {r["filename"]: r for r in await self.collect(uploads)}
+        self.assertEqual(results["bad.bin"]["status"], "error")
+        self.assertEqual(results["ok.eml"]["status"], "ok")
+
+    async def test_corrupt_archive(self):
+        uploads = [UploadFile(file=io.BytesIO(b"not a zip"), filename="broken.zip")]
+        results = await self.collect(uploads)
+        self.assertEqual(results[0]["status"], "error")
+
+    async def test_stream_ndjson(self):
+        uploads = [UploadFile(file=io.BytesIO(b"From: a"), filename="mail.eml")]
+        lines = [line async for line in self.processor.stream_ndjson(uploads)]
+        self.assertEqual(json.loads(lines[0])["result"]["size"], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
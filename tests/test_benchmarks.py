@@ -0,0 +1,38 @@
+import json
+import os
+import tempfile
+import unittest
+from agents.pdf_agent.extraction import PDFTextExtractor
+from benchmarks.corpus import CorpusGenerator
+from benchmarks.results import compare, percentile
+
+
+class TestCorpusGenerator(unittest.TestCase):
+    def test_same_seed_same_corpus_and_documents_parse(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            manifest = CorpusGenerator(seed=5).generate(first, 6, size_kb=2)
+            self.assertEqual(CorpusGenerator(seed=5).generate(second, 6, size_kb=2), manifest)
+            self.assertEqual([entry["format"] for entry in manifest], ["email", "json", "pdf"] * 2)
+
+            with open(os.path.join(first, manifest[1]["filename"])) as f:
+                self.assertIn("customer", json.load(f))
+            with open(os.path.join(first, manifest[0]["filename"])) as f:
+                self.assertTrue(f.read().startswith("From: "))
+            text = "".join(PDFTextExtractor().iter_pages(os.path.join(first, manifest[2]["filename"])))
+            self.assertGreater(len(text), 1000)
+
+
+class TestResults(unittest.TestCase):
+    def test_percentile_is_nearest_rank(self):
+        samples = [float(i) for i in range(1, 101)]
+        self.assertEqual((percentile(samples, 50), percentile(samples, 99), percentile(samples, 100)), (50.0, 99.0, 100.0))
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_compare_reports_change(self):
+        old = {"results": {"a": {"p50_ms": 2.0}, "gone": {"p50_ms": 1.0}}}
+        new = {"results": {"a": {"p50_ms": 3.0}, "b": {"skipped": "no Redis"}}}
+        self.assertEqual(compare(old, new), [{"benchmark": "a", "before": 2.0, "after": 3.0, "change_pct": 50.0}])
+
+
+if __name__ == '__main__':
+    unittest.main()
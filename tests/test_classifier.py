@@ -1,4 +1,5 @@
 import unittest
+from unittest import mock
 from agents.classifier_agent.classifier import ClassifierAgent
 
 class TestClassifierAgent(unittest.TestCase):
@@ -36,6 +37,27 @@ class TestClassifierAgent(unittest.TestCase):
         self.assertEqual(result["format"], "Email")
         self.assertEqual(result["intent"], "Invoice")
 
+    def test_cascade_reports_deciding_tier(self):
+        clear = self.agent.classify("a.txt", "Invoice 42: the amount due is $300.")
+        self.assertEqual(clear["intent"], "Invoice")
+        self.assertEqual(clear["decision"]["tier"], "rules")
+        unclear = self.agent.decide_intent("We need a quotation for your services.")
+        self.assertIn(unclear["tier"], ("llm", "fallback"))
+        self.assertTrue(unclear["reason"].startswith(("rules inconclusive", "no LLM label")))
+        stats = self.agent.cascade_stats()
+        self.assertEqual(stats["rules_decisions"], 1)
+        self.assertEqual(stats["llm_skip_ratio"], 0.5)
+
+    def test_confident_local_model_decides_before_the_llm(self):
+        model = mock.Mock(name="model")
+        model.name = "intent-model-v1@test"
+        model.predict.return_value = ("RFQ", 0.93)
+        self.agent.intent_model = model
+        decision = self.agent.decide_intent("Could you price 40 valves for us?")
+        self.assertEqual((decision["intent"], decision["tier"]), ("RFQ", "model"))
+        model.predict.return_value = ("RFQ", 0.41)
+        self.assertNotEqual(self.agent.decide_intent("Could you price 40 valves?")["tier"], "model")
+
 if __name__ == '__main__':
     unittest.main()
 
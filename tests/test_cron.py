@@ -0,0 +1,130 @@
+import asyncio
+import time
+import unittest
+from core.scheduling.cron import CRON_NEXT_KEY, DistributedCronScheduler
+
+
+class FakeAsyncRedis:
+    """Just enough of the async hash, sorted-set and SET NX commands used by the scheduler."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        target = self.data.setdefault(key, {})
+        target.update(mapping or {field: value})
+
+    async def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def hexists(self, key, field):
+        return field in self.data.get(key, {})
+
+    async def hdel(self, key, field):
+        return 1 if self.data.get(key, {}).pop(field, None) is not None else 0
+
+    async def hincrby(self, key, field, amount):
+        target = self.data.setdefault(key, {})
+        target[field] = str(int(target.get(field, 0)) + amount)
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    async def zrem(self, key, member):
+        self.data.get(key, {}).pop(member, None)
+
+    async def zscore(self, key, member):
+        return self.data.get(key, {}).get(member)
+
+    async def zrangebyscore(self, key, min, max, withscores=False):
+        items = sorted((s, m) for m, s in self.data.get(key, {}).items() if s <= max)
+        return [(m, s) for s, m in items] if withscores else [m for _, m in items]
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def set(self, key, value, nx=False, ex=None):
+        await asyncio.sleep(0)  # let competing workers interleave
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+
+class FakePipeline:
+    def __init__(self, conn):
+        self.conn = conn
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append(getattr(self.conn, name)(*args, **kwargs))
+        return queue
+
+    async def execute(self):
+        return [await call for call in self.calls]
+
+
+class StubEngine:
+    flows = {"email": None}
+
+    def __init__(self):
+        self.runs = []
+
+    async def submit(self, flow_id, payload, trigger="manual"):
+        self.runs.append((flow_id, trigger))
+        return type("Run", (), {"id": f"run_{len(self.runs)}"})()
+
+
+class TestDistributedCronScheduler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.conn = FakeAsyncRedis()
+        self.engine = StubEngine()
+        self.workers = [DistributedCronScheduler(self.conn, self.engine, misfire_grace=60) for _ in range(4)]
+
+    async def test_each_fire_happens_once_across_workers(self):
+        next_fire = await self.workers[0].add_job({"id": "j1", "workflowId": "email", "schedule": {"minute": "*"}})
+        self.conn.data[CRON_NEXT_KEY]["j1"] = time.time() - 1  # make it due
+        claimed = await asyncio.gather(*[worker.run_due() for worker in self.workers])
+        self.assertEqual(sum(claimed), 1)
+        self.assertEqual(self.engine.runs, [("email", "cron")])
+        self.assertGreater(self.conn.data[CRON_NEXT_KEY]["j1"], time.time())
+
+        job = (await self.workers[1].list_jobs())[0]
+        self.assertEqual(job["stats"]["fires"], 1)
+        self.assertEqual(job["stats"]["last_run_id"], "run_1")
+        self.assertGreaterEqual(job["stats"]["last_latency_ms"], 1000)
+        self.assertGreaterEqual(next_fire, time.time() - 60)
+
+    async def test_late_fire_is_a_misfire(self):
+        await self.workers[0].add_job({"id": "j2", "workflowId": "email", "schedule": {"minute": "*"}})
+        self.conn.data[CRON_NEXT_KEY]["j2"] = time.time() - 3600
+        await self.workers[0].run_due()
+        self.assertEqual(self.engine.runs, [])
+        stats = (await self.workers[0].list_jobs())[0]["stats"]
+        self.assertEqual(stats["misfires"], 1)
+
+    async def test_jobs_are_imported_once(self):
+        jobs = [{"id": "legacy", "workflowId": "email", "schedule": {"hour": "3"}}]
+        self.assertEqual(await self.workers[0].import_jobs(jobs), 1)
+        await self.workers[0].remove_job("legacy")
+        # A restart must not bring the deleted job back
+        self.assertEqual(await self.workers[1].import_jobs(jobs), 0)
+        self.assertEqual(await self.workers[1].list_jobs(), [])
+
+    async def test_invalid_schedule_is_rejected(self):
+        with self.assertRaises((ValueError, TypeError)):
+            await self.workers[0].add_job({"id": "bad", "workflowId": "email", "schedule": {"minute": "99"}})
+
+
+if __name__ == '__main__':
+    unittest.main()
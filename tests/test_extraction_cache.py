@@ -0,0 +1,122 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from agents.pdf_agent.pdf_agent import PDFAgent
+from core.cache.extraction_cache import ExtractionCache, file_digest
+from test_pdf_extraction import build_pdf
+
+
+class DictRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+class CountingExtractor:
+    max_pages = None
+    max_bytes = None
+
+    def __init__(self, extractor):
+        self.extractor = extractor
+        self.calls = 0
+
+    def iter_pages(self, source):
+        self.calls += 1
+        return self.extractor.iter_pages(source)
+
+
+class TestExtractionCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip_and_signature_mismatch(self):
+        cache = ExtractionCache(directory=self.directory)
+        cache.set("ab" * 32, {"pages": ["p1"], "invoice_total": 5.0, "policy_mentions": []}, signature="v1")
+        self.assertEqual(cache.get("ab" * 32, "v1")["pages"], ["p1"])
+        self.assertIsNone(cache.get("ab" * 32, "v2"))
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+    def test_size_bounded_lru_eviction(self):
+        cache = ExtractionCache(directory=self.directory, max_bytes=300)
+        for i, digest in enumerate(["aa" * 32, "bb" * 32, "cc" * 32]):
+            cache.set(digest, {"pages": ["x" * 60]})
+            os.utime(cache._path(digest), (i, i))
+        cache.get("aa" * 32)  # refreshes "aa", so "bb" is now the oldest
+        cache.set("dd" * 32, {"pages": ["x" * 60]})
+        self.assertIsNotNone(cache.get("aa" * 32))
+        self.assertIsNone(cache.get("bb" * 32))
+        self.assertLessEqual(cache.stats()["size_bytes"], 300)
+
+    def test_eviction_frees_down_to_low_water(self):
+        cache = ExtractionCache(directory=self.directory, max_bytes=1000)
+        i = 0
+        while not cache.stats()["evictions"]:
+            cache.set(f"{i:02d}" * 32, {"pages": ["x" * 60]})
+            os.utime(cache._path(f"{i:02d}" * 32), (i, i))
+            i += 1
+        self.assertLessEqual(cache.stats()["size_bytes"], 900)
+        evictions = cache.stats()["evictions"]
+        # The freed headroom absorbs the next write without another scan
+        cache.set("ff" * 32, {"pages": ["x" * 60]})
+        self.assertEqual(cache.stats()["evictions"], evictions)
+
+    def test_workers_sharing_a_directory_stay_under_the_limit(self):
+        first, second = (ExtractionCache(directory=self.directory, max_bytes=1000) for _ in range(2))
+        # ~80 bytes per entry: eight each keeps either worker's own count under the limit, not the directory
+        for i in range(16):
+            (first if i % 2 else second).set(f"{i:02d}" * 32, {"pages": ["x" * 50]})
+            os.utime(first._path(f"{i:02d}" * 32), (i, i))
+        first.rescan_interval = 0
+        first.set("ff" * 32, {"pages": ["x" * 50]})
+        size = sum(os.path.getsize(entry.path) for entry in first._scan())
+        self.assertLessEqual(size, 1000)
+        self.assertEqual(first.stats()["size_bytes"], size)
+        self.assertIsNone(first.get("00" * 32))
+
+    def test_corrupt_entry_is_a_miss_and_deleted(self):
+        cache = ExtractionCache(directory=self.directory)
+        cache.set("ab" * 32, {"pages": ["p1"]})
+        with open(cache._path("ab" * 32), "wb") as f:
+            f.write(b'{"pages": ["p')
+        self.assertIsNone(cache.get("ab" * 32))
+        self.assertFalse(os.path.exists(cache._path("ab" * 32)))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_redis_tier_is_shared_between_directories(self):
+        redis_conn = DictRedis()
+        ExtractionCache(directory=self.directory, conn=redis_conn).set("ee" * 32, {"pages": ["shared"]})
+        other = ExtractionCache(directory=os.path.join(self.directory, "other"), conn=redis_conn)
+        self.assertEqual(other.get("ee" * 32)["pages"], ["shared"])
+        self.assertEqual(other.stats()["redis_hits"], 1)
+
+    def test_file_digest_path_and_stream_agree(self):
+        path = os.path.join(self.directory, "doc.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4 data")
+        self.assertEqual(file_digest(path), file_digest(io.BytesIO(b"%PDF-1.4 data")))
+
+    def test_repeated_pdf_skips_parsing(self):
+        agent = PDFAgent()
+        agent.extraction_cache = ExtractionCache(directory=self.directory)
+        agent.extractor = CountingExtractor(agent.extractor)
+        data = build_pdf(["Invoice Total: 12050", "GDPR applies"])
+        first = agent.load_or_extract(io.BytesIO(data))
+        second = agent.load_or_extract(io.BytesIO(data))
+        self.assertEqual(agent.extractor.calls, 1)
+        self.assertEqual(second, first)
+        self.assertEqual(second["invoice_total"], 12050.0)
+        self.assertEqual(second["policy_mentions"], ["GDPR"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from core.cache.intent_cache import IntentCache
+
+
+class DictRedis:
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        value = self.data.get(key)
+        return value.encode("utf-8") if value is not None else None
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.ttls[key] = ex
+
+
+class DownRedis:
+    def get(self, key):
+        raise ConnectionError("redis down")
+
+    def set(self, key, value, ex=None):
+        raise ConnectionError("redis down")
+
+
+class TestIntentCache(unittest.TestCase):
+    def test_key_ignores_whitespace_but_not_model_or_prompt(self):
+        cache = IntentCache(max_entries=4)
+        key = cache.make_key("Invoice  total\n$5", "gemini-2.0-flash", "v1")
+        self.assertEqual(key, cache.make_key("  Invoice total $5 ", "gemini-2.0-flash", "v1"))
+        self.assertNotEqual(key, cache.make_key("Invoice total $5", "other-model", "v1"))
+        self.assertNotEqual(key, cache.make_key("Invoice total $5", "gemini-2.0-flash", "v2"))
+
+    def test_lru_hits_misses_and_evictions(self):
+        cache = IntentCache(max_entries=2)
+        cache.set("a", "RFQ")
+        cache.set("b", "Invoice")
+        self.assertEqual(cache.get("a"), "RFQ")
+        cache.set("c", "Complaint")  # evicts "b", the least recently used
+        self.assertIsNone(cache.get("b"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (1, 1, 1))
+
+    def test_redis_tier_with_ttl(self):
+        redis_conn = DictRedis()
+        writer = IntentCache(conn=redis_conn, ttl=60)
+        writer.set("k", "Fraud Risk")
+        self.assertEqual(redis_conn.ttls["k"], 60)
+
+        reader = IntentCache(conn=redis_conn)
+        self.assertEqual(reader.get("k"), "Fraud Risk")
+        self.assertEqual(reader.get("k"), "Fraud Risk")
+        stats = reader.stats()
+        self.assertEqual((stats["redis_hits"], stats["local_hits"]), (1, 1))
+
+    def test_redis_errors_fall_back_to_local_tier(self):
+        cache = IntentCache(conn=DownRedis())
+        cache.set("k", "RFQ")
+        self.assertEqual(cache.get("k"), "RFQ")
+        self.assertIsNone(cache.get("missing"))
+
+
+if __name__ == '__main__':
+    unittest.main()
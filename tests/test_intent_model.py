@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from agents.classifier_agent.train_intent_model import is_held_out, trace_examples
+from core.text.intent_model import IntentModel, evaluate, features, train
+
+TRAINING = [
+    ("Please send a quotation for 200 valves", "RFQ"),
+    ("Requesting a quote for steel pipes and fittings", "RFQ"),
+    ("Could you quote prices for 50 pumps", "RFQ"),
+    ("Attached is the invoice for March, amount due in 30 days", "Invoice"),
+    ("Invoice 4411: payment due for the pipes we delivered", "Invoice"),
+    ("Your invoice total is 1,200 dollars, please pay", "Invoice"),
+    ("The delivery was late and the parts were broken", "Complaint"),
+    ("I am very unhappy with the broken parts you delivered", "Complaint"),
+    ("Broken valves again, this is the third late delivery", "Complaint"),
+]
+
+
+class FakeTraceRedis:
+    def __init__(self, hashes):
+        self.hashes = hashes
+
+    def scan_iter(self, match=None, count=None):
+        return iter(sorted(self.hashes))
+
+    def pipeline(self, transaction=True):
+        conn = self
+
+        class Pipeline:
+            def __init__(self):
+                self.keys = []
+
+            def hgetall(self, key):
+                self.keys.append(key)
+
+            def execute(self):
+                return [conn.hashes[key] for key in self.keys]
+
+        return Pipeline()
+
+
+class TestIntentModel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        texts, labels = zip(*TRAINING)
+        cls.model = train(list(texts) * 4, list(labels) * 4, dim=2 ** 12, epochs=40)
+
+    def test_features_are_stable_and_normalized(self):
+        indices, values = features("Invoice invoice due", dim=2 ** 12)
+        again, _ = features("invoice INVOICE due", dim=2 ** 12)
+        self.assertEqual(sorted(indices), sorted(again))
+        self.assertAlmostEqual(float(np.linalg.norm(values)), 1.0, places=5)
+        self.assertEqual(len(features("!!!")[0]), 0)
+
+    def test_predicts_unseen_phrasing(self):
+        self.assertEqual(self.model.predict("We need a quotation for valves")[0], "RFQ")
+        self.assertEqual(self.model.predict("The invoice amount is due")[0], "Invoice")
+        self.assertEqual(self.model.predict("parts arrived broken and late")[0], "Complaint")
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "models", "intent.npz")
+            self.model.save(path)
+            loaded = IntentModel.load(path)
+            self.assertEqual(loaded.labels, self.model.labels)
+            self.assertEqual(loaded.name, self.model.name)
+            np.testing.assert_allclose(loaded.predict_proba("late broken valves"),
+                                       self.model.predict_proba("late broken valves"), rtol=1e-6)
+
+            with mock.patch("core.text.intent_model.MODEL_VERSION", 99):
+                loaded.save(path)
+            with self.assertRaisesRegex(ValueError, "Unsupported intent model"):
+                IntentModel.load(path)
+
+    def test_evaluation_report(self):
+        texts = ["quotation for valves please", "invoice amount due", "broken late parts", "hello"]
+        labels = ["RFQ", "Invoice", "Complaint", "RFQ"]
+        report = evaluate(self.model, texts, labels, threshold=0.0, sources=["llm", "llm", "rules", "llm"])
+        self.assertEqual(report["documents"], 4)
+        self.assertEqual(report["coverage"], 1.0)
+        self.assertEqual(report["labels"]["Complaint"]["recall"], 1.0)
+        self.assertEqual(report["by_source"]["rules"], {"documents": 1, "accuracy": 1.0})
+        self.assertEqual(sum(sum(row.values()) for row in report["confusion"].values()), 4)
+
+    def test_trace_examples_keep_only_llm_labels(self):
+        def trace(classification, body):
+            return {b"metadata": json.dumps({"classification": classification}).encode(),
+                    b"email_agent_fields": json.dumps({"subject": "Order", "body": body}).encode()}
+
+        conn = FakeTraceRedis({
+            b"trace:a": trace({"intent": "RFQ", "decision": {"tier": "llm"}}, "quote please"),
+            b"trace:b": trace({"intent": "Invoice", "decision": {"tier": "fallback"}}, "bill"),
+            b"trace:c": trace({"intent": "Unknown"}, "hello"),
+            b"trace:d": {b"pdf_agent_fields": json.dumps({"text": "invoice"}).encode()},
+            b"trace:e": trace({"intent": "Complaint"}, "late"),
+            b"trace:f": trace({"intent": "RFQ", "decision": {"tier": "model"}}, "quote"),
+            b"trace:g": trace({"intent": "Complaint", "decision": {"tier": "rules"}}, "broken"),
+        })
+        examples = list(trace_examples(conn, batch_size=2))
+        self.assertEqual(examples, [
+            ("trace:a", "Subject: Order\n\nquote please", "RFQ", "llm"),
+            ("trace:e", "Subject: Order\n\nlate", "Complaint", "llm"),
+        ])
+        self.assertEqual(is_held_out("trace:a", 0.5), is_held_out("trace:a", 0.5))
+        self.assertFalse(is_held_out("trace:a", 0.0))
+        self.assertTrue(is_held_out("trace:a", 1.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
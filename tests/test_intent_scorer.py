@@ -0,0 +1,50 @@
+import unittest
+from core.text.intent_scorer import IntentScorer, load_intent_weights
+from core.text.keyword_matcher import KeywordMatcher
+
+RULES = {
+    "intent": {
+        "RFQ": ["rfq", "quotation"],
+        "Invoice": ["invoice", "bill", "billed"],
+        "Complaint": ["complaint", "issue"],
+    },
+}
+WEIGHTS = {"RFQ": {"rfq": 3, "quotation": 2}, "Invoice": {"invoice": 3}, "Complaint": {"complaint": 3, "issue": 0.5}}
+
+
+class TestIntentScorer(unittest.TestCase):
+    def setUp(self):
+        self.scorer = IntentScorer(KeywordMatcher(RULES), WEIGHTS, threshold=0.7, conflict_ratio=0.5)
+
+    def test_strong_keyword_is_decisive(self):
+        score = self.scorer.score("Please find the attached invoice.")
+        self.assertEqual(score.label, "Invoice")
+        self.assertTrue(score.decisive)
+        self.assertAlmostEqual(score.confidence, 0.7769, places=3)
+        self.assertIn("invoice", score.reason)
+
+    def test_weak_evidence_is_not_decisive(self):
+        score = self.scorer.score("A question about the bill.")
+        self.assertEqual(score.label, "Invoice")
+        self.assertFalse(score.decisive)
+        self.assertIn("< 0.70", score.reason)
+        self.assertEqual(self.scorer.score("Hello there").reason, "no intent keywords")
+
+    def test_conflicting_labels_are_not_decisive(self):
+        score = self.scorer.score("RFQ 12: a complaint about the last invoice")
+        self.assertTrue(score.conflict)
+        self.assertFalse(score.decisive)
+        self.assertTrue(score.reason.startswith("conflicting keywords"))
+
+    def test_overlaps_count_once_and_repeats_add_less(self):
+        # "billed" also matches "bill" at the same position
+        self.assertEqual(self.scorer.score("billed").scores, {"Invoice": 1.0})
+        self.assertEqual(self.scorer.score("invoice invoice invoice invoice").scores, {"Invoice": 6.0})
+
+    def test_default_weights_load_from_config(self):
+        weights = load_intent_weights()
+        self.assertEqual(weights["Invoice"]["invoice"], 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from core.text.keyword_matcher import KeywordMatcher, get_keyword_matcher
+
+RULES = {
+    "intent": {
+        "Invoice": ["invoice", "bill", "billed"],
+        "Fraud Risk": ["fraud", "risk"],
+    },
+    "compliance": {"GDPR": ["gdpr"], "PCI": ["pci"]},
+}
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = KeywordMatcher(RULES)
+
+    def test_positions_and_counts_across_rule_sets(self):
+        matches = self.matcher.scan("Fraud alert: the GDPR invoice was billed twice. Fraud!")
+        self.assertEqual(matches.count("intent", "Fraud Risk"), 2)
+        self.assertEqual(matches.positions("compliance", "GDPR"), [(17, "gdpr")])
+        self.assertEqual(matches.labels("intent"), ["Invoice", "Fraud Risk"])
+        self.assertEqual(matches.labels("compliance"), ["GDPR"])
+
+    def test_overlapping_keywords_are_all_reported(self):
+        matches = self.matcher.scan("You were BILLED.")
+        self.assertEqual(matches.keywords("intent", "Invoice"), ["bill", "billed"])
+
+    def test_first_label_follows_table_order(self):
+        matches = self.matcher.scan("risk of a duplicate invoice")
+        self.assertEqual(matches.first("intent"), "Invoice")
+        self.assertEqual(self.matcher.scan("nothing here").first("intent", "Unknown"), "Unknown")
+
+    def test_substring_semantics_match_plain_in(self):
+        # Same behaviour as the `kw in text.lower()` checks it replaces
+        self.assertTrue(self.matcher.scan("PCI-DSS").has("compliance", "PCI"))
+        self.assertTrue(self.matcher.scan("defraud").has("intent", "Fraud Risk"))
+
+    def test_default_rules_load_from_config(self):
+        rule_sets = get_keyword_matcher().rule_sets
+        for rule_set in ("intent", "urgency", "tone", "compliance"):
+            self.assertIn(rule_set, rule_sets)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from core.observability.metrics import MetricsRegistry, render_stats
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_series_per_label_set(self):
+        documents = self.registry.counter("documents_total", "Documents", ("format", "intent"))
+        documents.inc(format="JSON", intent="Invoice")
+        documents.inc(format="JSON", intent="Invoice")
+        documents.inc(format="Email", intent='Say "hi"')
+        text = self.registry.render()
+        self.assertIn("# TYPE documents_total counter", text)
+        self.assertIn('documents_total{format="JSON",intent="Invoice"} 2', text)
+        self.assertIn('documents_total{format="Email",intent="Say \\"hi\\""} 1', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        latency = self.registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            latency.observe(value, stage="read")
+        with latency.time(stage="route"):
+            pass
+        text = self.registry.render()
+        self.assertIn('stage_seconds_bucket{stage="read",le="0.1"} 1', text)
+        self.assertIn('stage_seconds_bucket{stage="read",le="1.0"} 3', text)
+        self.assertIn('stage_seconds_bucket{stage="read",le="+Inf"} 4', text)
+        self.assertIn('stage_seconds_sum{stage="read"} 4.05', text)
+        self.assertIn('stage_seconds_count{stage="read"} 4', text)
+        self.assertEqual(latency.count(stage="route"), 1)
+
+    def test_same_name_returns_same_metric(self):
+        first = self.registry.histogram("x_seconds", "x", ("op",))
+        self.assertIs(self.registry.histogram("x_seconds", "x", ("op",)), first)
+        with self.assertRaises(ValueError):
+            self.registry.counter("x_seconds", "x", ("op",))
+
+    def test_stats_collectors_become_gauges(self):
+        self.registry.register_stats("intent_cache", lambda: {"hits": 3, "hit_ratio": 0.75, "flows": ["email"]})
+        self.registry.register_stats("broken", lambda: 1 / 0)
+        text = self.registry.render()
+        self.assertIn("intent_cache_hits 3\n", text)
+        self.assertIn("intent_cache_hit_ratio 0.75\n", text)
+        self.assertNotIn("flows", text)
+        self.assertIn("# broken stats unavailable", text)
+        self.assertEqual(render_stats("empty", {}), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from agents.pdf_agent.extraction import PDFTextExtractor
+from agents.pdf_agent.pdf_agent import PDFAgent
+
+
+def build_pdf(page_texts, with_eof=True):
+    """Builds a minimal text PDF with one line of Helvetica text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n".encode())
+    if with_eof:
+        out.write(b"%%EOF\n")
+    return out.getvalue()
+
+
+class TestPDFTextExtractor(unittest.TestCase):
+    def setUp(self):
+        self.pages = [f"Page {i} of the policy" for i in range(20)]
+        fd, self.path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(build_pdf(self.pages))
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_sequential_and_parallel_extraction_agree(self):
+        sequential = list(PDFTextExtractor(parallel_min_pages=1000).iter_pages(self.path))
+        parallel = list(PDFTextExtractor(parallel_min_pages=2, chunk_pages=3).iter_pages(self.path))
+        self.assertEqual(len(sequential), 20)
+        self.assertEqual(sequential, parallel)
+        self.assertIn("Page 7", sequential[7])
+
+    def test_file_objects_are_spooled_for_parallel_extraction(self):
+        extractor = PDFTextExtractor(parallel_min_pages=2, chunk_pages=3)
+        with open(self.path, "rb") as f, mock.patch.object(
+                extractor, "_iter_parallel", wraps=extractor._iter_parallel) as parallel:
+            pages = list(extractor.iter_pages(f))
+            spooled = parallel.call_args[0][0]
+        self.assertEqual(len(pages), 20)
+        self.assertNotEqual(spooled, self.path)
+        self.assertFalse(os.path.exists(spooled))
+        self.assertEqual(list(extractor.iter_pages(io.BytesIO(build_pdf(self.pages)))), pages)
+
+    def test_page_and_byte_budgets(self):
+        self.assertEqual(len(list(PDFTextExtractor(max_pages=5).iter_pages(self.path))), 5)
+        self.assertEqual(len(PDFTextExtractor(max_bytes=30).extract(self.path)), 30)
+
+    def test_pages_are_yielded_lazily(self):
+        pages = PDFTextExtractor(parallel_min_pages=1000).iter_pages(self.path)
+        self.assertIn("Page 0", next(pages))
+        pages.close()
+
+    def test_file_object_and_missing_eof(self):
+        data = build_pdf(["Total: 12050"], with_eof=False)
+        self.assertIn("12050", PDFTextExtractor().extract(io.BytesIO(data)))
+
+    def test_non_pdf_yields_nothing(self):
+        self.assertEqual(PDFTextExtractor().extract(io.BytesIO(b"Invoice\nTotal: 5")), "")
+
+
+class TestPDFAgentEarlyExit(unittest.TestCase):
+    DATA = build_pdf(["Total: 12050", "GDPR and FDA", "HIPAA and PCI", "Appendix A", "Appendix B"])
+
+    def test_stops_once_total_and_a_keyword_are_found(self):
+        agent = PDFAgent()
+        text = agent.extract_text_until_complete(io.BytesIO(self.DATA))
+        self.assertIn("GDPR", text)
+        self.assertNotIn("PCI", text)
+        self.assertIn("Appendix", agent.extract_text(io.BytesIO(self.DATA)))
+
+    def test_required_keywords_are_configurable(self):
+        with mock.patch.dict(os.environ, {"PDF_EARLY_EXIT_KEYWORDS": "GDPR, PCI"}):
+            agent = PDFAgent()
+        text = agent.extract_text_until_complete(io.BytesIO(self.DATA))
+        self.assertIn("PCI", text)
+        self.assertNotIn("Appendix", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from core.pipeline import processor
+from core.pipeline.dedup import IdempotencyKeyConflict, ProcessedResultStore
+from core.pipeline.executor import StageExecutor
+from core.pipeline.processor import DocumentPipeline, UnsupportedFormatError
+from core.pipeline.spool import SpooledDocument
+
+
+class SlowClassifier:
+    FORMATS = {".eml": "Email", ".txt": "Email", ".json": "JSON"}
+
+    def classify(self, file_path, content, analysis=None):
+        time.sleep(0.2)
+        return {"format": self.FORMATS.get(os.path.splitext(file_path)[1], "Unknown"), "intent": "Complaint"}
+
+
+class StubEmailAgent:
+    def process(self, file_path, content, classification, source_id=None):
+        return {"action": "escalate", "body": content}
+
+
+class RecordingJSONClassifier:
+    def classify(self, file_path, content, analysis=None):
+        self.content, self.analysis = content, analysis
+        return {"format": "JSON", "intent": analysis.intent}
+
+
+class RecordingEmailClassifier:
+    def classify(self, file_path, content, analysis=None):
+        self.content = content
+        return {"format": "Email", "intent": "Other"}
+
+
+class StubJSONAgent:
+    def process(self, file_path, content, classification, analysis=None, source_id=None):
+        return {"valid": not analysis.anomalies, "anomalies": analysis.anomalies}
+
+
+class StubRouter:
+    endpoints = {"escalate": "http://crm/escalate", "alert": "http://risk/alert", "routine": "http://crm/log"}
+
+    async def route_action(self, action, payload):
+        return {"status": "success", "endpoint": self.endpoints[action]}
+
+    async def aclose(self):
+        pass
+
+
+class CountingRouter(StubRouter):
+    def __init__(self):
+        self.routed = []
+
+    async def route_action(self, action, payload):
+        self.routed.append((action, payload["source_id"]))
+        return await super().route_action(action, payload)
+
+
+class FakeAsyncRedis:
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    def pipeline(self, transaction=True):
+        conn = self
+
+        class Pipeline:
+            def __init__(self):
+                self.ops = []
+
+            def set(self, key, value, ex=None):
+                self.ops.append((key, value, ex))
+
+            async def execute(self):
+                for key, value, ex in self.ops:
+                    conn.data[key], conn.ttls[key] = value, ex
+
+        return Pipeline()
+
+
+class StubTraceStore:
+    async def get_full_trace(self, source_id):
+        return {"action": "escalate"}
+
+    async def close(self):
+        pass
+
+
+class TestDocumentPipeline(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.pipeline = DocumentPipeline(
+            SlowClassifier(), StubEmailAgent(), None, None, StubRouter(), StubTraceStore(),
+            executor=StageExecutor(max_workers=8)
+        )
+
+    async def asyncTearDown(self):
+        await self.pipeline.aclose()
+
+    async def test_process_email(self):
+        result = await self.pipeline.process("mail.eml", b"From: a@b.com\nSubject: Hi\n\nBody")
+        self.assertEqual(result["processing_result"]["action"], "escalate")
+        self.assertEqual(result["action_router_result"]["status"], "success")
+
+    async def test_blocking_stages_do_not_block_event_loop(self):
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            self.pipeline.process(f"mail{i}.eml", b"From: a@b.com\nSubject: Hi\n\nBody") for i in range(4)
+        ])
+        # Four 200ms classifications run side by side instead of back to back
+        self.assertLess(time.perf_counter() - start, 0.6)
+
+    async def test_stage_limit(self):
+        self.pipeline.executor.stage_limits["classify"] = 1
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            self.pipeline.process(f"mail{i}.eml", b"Body") for i in range(3)
+        ])
+        self.assertGreaterEqual(time.perf_counter() - start, 0.6)
+
+    async def test_unsupported_format(self):
+        with self.assertRaises(UnsupportedFormatError):
+            await self.pipeline.process("notes.bin", b"plain text")
+
+    async def test_large_json_is_streamed(self):
+        classifier = RecordingJSONClassifier()
+        pipeline = DocumentPipeline(classifier, None, StubJSONAgent(), None, StubRouter(), StubTraceStore())
+        document = {"order_id": 1, "customer": "ACME", "amount": 10.5, "items": ["widget"] * 5000}
+        fd, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(document, f)
+        spooled = SpooledDocument("big.json", "digest", os.path.getsize(path), path=path)
+        try:
+            with mock.patch.object(processor, "JSON_STREAM_THRESHOLD", 1024), \
+                    mock.patch.object(processor, "JSON_STREAM_HEAD", 256):
+                result = await pipeline.process("big.json", spooled)
+        finally:
+            await pipeline.aclose()
+        self.assertEqual(len(classifier.content), 256)
+        self.assertEqual(classifier.analysis.intent, "Invoice")
+        self.assertEqual(classifier.analysis.data["items"]["count"], 5000)
+        self.assertTrue(result["processing_result"]["valid"])
+        self.assertFalse(os.path.exists(path))
+
+    async def test_large_text_log_is_not_streamed_as_json(self):
+        classifier = RecordingEmailClassifier()
+        pipeline = DocumentPipeline(classifier, StubEmailAgent(), None, None, StubRouter(), StubTraceStore())
+        text = "[2024-01-01 10:00] job started\n" * 100
+        fd, path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        spooled = SpooledDocument("app.txt", "digest", len(text), path=path)
+        try:
+            with mock.patch.object(processor, "JSON_STREAM_THRESHOLD", 1024), \
+                    mock.patch.object(processor, "JSON_STREAM_HEAD", 256):
+                await pipeline.process("app.txt", spooled)
+        finally:
+            await pipeline.aclose()
+        self.assertEqual(classifier.content, text)
+
+
+class TestDocumentDeduplication(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.classifier = SlowClassifier()
+        self.router = CountingRouter()
+        self.redis = FakeAsyncRedis()
+        self.pipeline = DocumentPipeline(
+            self.classifier, StubEmailAgent(), StubJSONAgent(), None, self.router, StubTraceStore(),
+            executor=StageExecutor(max_workers=8), result_store=ProcessedResultStore(self.redis, 60, 600)
+        )
+
+    async def asyncTearDown(self):
+        await self.pipeline.aclose()
+
+    async def test_same_bytes_are_answered_from_the_stored_result(self):
+        email = b"From: a@b.com\nSubject: Hi\n\nBody"
+        with mock.patch.object(self.classifier, "classify", wraps=self.classifier.classify) as classify:
+            first = await self.pipeline.process("mail.eml", email)
+            again = await self.pipeline.process("copy.eml", email)
+        self.assertEqual(classify.call_count, 1)
+        self.assertFalse(first["duplicate"])
+        self.assertTrue(again["duplicate"])
+        self.assertEqual((again["source_id"], again["filename"]), (first["source_id"], "copy.eml"))
+        self.assertEqual(len(self.router.routed), 1)
+        key = f"processed:{first['source_id']}.eml"
+        self.assertEqual(self.redis.ttls[key], 60)
+        # The stored record leaves out the full trace and the document text, which the trace still has
+        self.assertNotIn("full_trace", json.loads(self.redis.data[key])["response"])
+        self.assertIn("body", first["processing_result"])
+        self.assertEqual(again["processing_result"], {"action": "escalate"})
+
+        rerouted = await self.pipeline.process("mail.eml", email, reroute=True)
+        self.assertTrue(rerouted["duplicate"])
+        self.assertEqual(self.router.routed, [("escalate", first["source_id"])] * 2)
+
+    async def test_same_filename_with_other_bytes_gets_its_own_trace(self):
+        first = await self.pipeline.process("mail.eml", b"From: a@b.com\nSubject: Hi\n\nOne")
+        second = await self.pipeline.process("mail.eml", b"From: a@b.com\nSubject: Hi\n\nTwo")
+        self.assertNotEqual(first["source_id"], second["source_id"])
+        self.assertFalse(second["duplicate"])
+
+    async def test_same_bytes_with_another_extension_are_processed_again(self):
+        content = b'{"order_id": 1}'
+        first = await self.pipeline.process("a.txt", content)
+        second = await self.pipeline.process("b.json", content)
+        again = await self.pipeline.process("c.JSON", content)
+        self.assertEqual([first["classification"]["format"], second["classification"]["format"]], ["Email", "JSON"])
+        self.assertFalse(second["duplicate"])
+        self.assertEqual((again["duplicate"], again["filename"]), (True, "c.JSON"))
+        self.assertEqual(again["classification"]["format"], "JSON")
+
+    async def test_concurrent_identical_uploads_are_processed_once(self):
+        results = await asyncio.gather(*[self.pipeline.process("mail.eml", b"Body") for _ in range(3)])
+        self.assertEqual(len(self.router.routed), 1)
+        self.assertEqual(sorted(r["duplicate"] for r in results), [False, True, True])
+
+    async def test_idempotency_key(self):
+        self.pipeline.result_store.window = 0
+        first = await self.pipeline.process("mail.eml", b"Body", idempotency_key="k1")
+        retry = await self.pipeline.process("mail.eml", b"Body", idempotency_key="k1")
+        self.assertTrue(retry["duplicate"])
+        self.assertEqual(retry["action_router_result"], first["action_router_result"])
+        self.assertEqual(len(self.router.routed), 1)
+        with self.assertRaises(IdempotencyKeyConflict):
+            await self.pipeline.process("mail.eml", b"Other body", idempotency_key="k1")
+        # Without the content window, the same bytes under no key are processed again
+        await self.pipeline.process("mail.eml", b"Body")
+        self.assertEqual(len(self.router.routed), 2)
+
+
+    async def test_redis_errors_disable_short_circuiting_for_a_while(self):
+        failing = mock.Mock()
+        failing.get = mock.AsyncMock(side_effect=ConnectionError("redis down"))
+        self.pipeline.result_store.conn = failing
+        await self.pipeline.process("mail.eml", b"Body")
+        again = await self.pipeline.process("mail.eml", b"Body")
+        self.assertFalse(again["duplicate"])
+        # One failed lookup, then Redis is skipped instead of being retried on every upload
+        self.assertEqual(failing.get.await_count, 1)
+        failing.pipeline.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
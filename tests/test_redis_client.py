@@ -1,5 +1,5 @@
 import unittest
-from core.memory.redis_client import MemoryStore
+from core.memory.redis_client import AsyncMemoryStore, MemoryStore
 
 class TestMemoryStore(unittest.TestCase):
     def setUp(self):
@@ -23,5 +23,62 @@ class TestMemoryStore(unittest.TestCase):
         self.assertEqual(trace["action"], "escalate")
         self.assertEqual(trace["decision_trace"]["step"], "done")
 
+
+class RecordingPipeline:
+    def __init__(self, conn):
+        self.conn = conn
+        self.commands = []
+
+    def hset(self, key, mapping):
+        self.commands.append(("hset", key, dict(mapping)))
+
+    def execute(self):
+        self.conn.round_trips += 1
+        for _, key, mapping in self.commands:
+            self.conn.hashes.setdefault(key, {}).update(mapping)
+
+
+class RecordingConn:
+    def __init__(self):
+        self.round_trips = 0
+        self.hashes = {}
+
+    def pipeline(self, transaction=True):
+        return RecordingPipeline(self)
+
+
+class TestTraceBatch(unittest.TestCase):
+    def setUp(self):
+        self.memory = MemoryStore()
+        self.memory.conn = RecordingConn()
+
+    def test_stores_share_one_connection_pool(self):
+        self.assertIs(MemoryStore().conn.connection_pool, MemoryStore().conn.connection_pool)
+        self.assertIs(AsyncMemoryStore().conn.connection_pool, AsyncMemoryStore().conn.connection_pool)
+
+    def test_trace_fields_flush_in_one_round_trip(self):
+        with self.memory.trace("doc1") as trace:
+            trace.log_metadata({"source": "email"})
+            trace.log_agent_fields("email_agent", {"sender": "a@b.com"})
+            trace.log_action("escalate")
+            trace.log_decision_trace({"step": "done"})
+        self.assertEqual(self.memory.conn.round_trips, 1)
+        self.assertEqual(
+            set(self.memory.conn.hashes["trace:doc1"]),
+            {"metadata", "email_agent_fields", "action", "decision_trace"}
+        )
+
+    def test_partial_trace_is_flushed_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.memory.trace("doc2") as trace:
+                trace.log_action("routine")
+                raise RuntimeError("agent failed")
+        self.assertEqual(self.memory.conn.hashes["trace:doc2"]["action"], "routine")
+
+    def test_empty_trace_skips_redis(self):
+        with self.memory.trace("doc3"):
+            pass
+        self.assertEqual(self.memory.conn.round_trips, 0)
+
 if __name__ == '__main__':
     unittest.main()
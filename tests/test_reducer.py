@@ -0,0 +1,87 @@
+import time
+import unittest
+from core.text.reducer import GAP, ContentReducer, count_tokens, truncate_tokens
+
+EMAIL = """From: buyer@example.com
+To: sales@company.com
+Subject: Quotation for 500 pumps
+Message-ID: <abc@example.com>
+X-Mailer: Outlook
+
+Hello,
+
+Please send a quotation for 500 pumps by Friday.
+
+Best regards,
+Anna
+--
+Anna Buyer | Procurement
+
+On Mon, 3 Jun 2024 Bob wrote:
+> We have a complaint about the last delivery.
+> It was late.
+"""
+
+
+class TestContentReducer(unittest.TestCase):
+    def setUp(self):
+        self.reducer = ContentReducer(budget=200, scan_chars=16 * 1024)
+
+    def test_token_helpers(self):
+        self.assertEqual(count_tokens("Hello, world!"), 6)
+        self.assertEqual(truncate_tokens("alpha beta gamma delta", 4), "alpha beta")
+        self.assertEqual(truncate_tokens("short", 10), "short")
+
+    def test_short_email_keeps_identifying_headers_and_drops_quoting(self):
+        reduced = self.reducer.reduce(EMAIL.replace("\n", "\r\n"))
+        self.assertTrue(reduced.text.startswith("From: buyer@example.com\nTo: sales@company.com\nSubject: Quotation"))
+        self.assertIn("Please send a quotation for 500 pumps by Friday.", reduced.text)
+        for dropped in ("Message-ID", "X-Mailer", "Best regards", "Procurement", "complaint", "wrote:"):
+            self.assertNotIn(dropped, reduced.text)
+        self.assertTrue(reduced.reduced)
+
+    def test_plain_text_is_not_taken_for_headers(self):
+        text = "Note: this is a plain document\nwith two lines\n\nand a second paragraph."
+        self.assertEqual(self.reducer.split_headers(text), ([], text))
+        self.assertEqual(self.reducer.reduce(text).text, text)
+
+    def test_long_body_fits_budget_and_keeps_informative_middle(self):
+        filler = "\n\n".join(f"Paragraph {i} describes routine shipping details at length." for i in range(300))
+        body = filler + "\n\nThis is urgent: we need a quotation immediately.\n\n" + filler
+        reduced = ContentReducer(budget=200, scan_chars=64 * 1024).reduce("Subject: Pumps\n\n" + body)
+        self.assertLessEqual(reduced.tokens, 200)
+        self.assertGreater(reduced.original_tokens, 5000)
+        self.assertTrue(reduced.text.startswith("Subject: Pumps\n\nParagraph 0 "))
+        self.assertIn("Paragraph 299 ", reduced.text)
+        self.assertIn("urgent: we need a quotation immediately", reduced.text)
+        self.assertIn(GAP, reduced.text)
+
+    def test_gap_markers_count_against_budget(self):
+        # Informative paragraphs between filler: each one chosen apart from the others adds a GAP marker
+        body = "\n\n".join(
+            "Urgent complaint, please escalate." if i % 2 else f"Paragraph {i} describes routine shipping details."
+            for i in range(600)
+        )
+        for budget in (200, 1500):
+            reduced = ContentReducer(budget=budget, scan_chars=64 * 1024).reduce("Subject: Pumps\n\n" + body)
+            self.assertLessEqual(reduced.tokens, budget)
+        self.assertGreater(reduced.text.count(GAP), 4)
+
+    def test_headers_over_budget_with_empty_body(self):
+        reduced = ContentReducer(budget=100).reduce("Subject: " + "word " * 300 + "\nFrom: a@b.c\n\n")
+        self.assertTrue(reduced.text.startswith("Subject: word word"))
+        self.assertLessEqual(reduced.tokens, 100)
+        self.assertTrue(reduced.reduced)
+
+    def test_huge_document_is_sampled_in_bounded_time(self):
+        body = "Routine text about delivery schedules and pallets. " * 300_000
+        start = time.perf_counter()
+        reduced = self.reducer.reduce(body)
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertLessEqual(reduced.tokens, 200)
+        # Extrapolated from the scanned prefix
+        self.assertAlmostEqual(reduced.original_tokens / count_tokens(body), 1, delta=0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
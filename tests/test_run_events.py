@@ -0,0 +1,53 @@
+import asyncio
+import unittest
+from core.workflows.run_events import MemoryRunEventLog, RunEventHub
+
+
+class TestRunEventHub(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.hub = RunEventHub(MemoryRunEventLog(), block_ms=50, client_buffer=4)
+
+    async def asyncTearDown(self):
+        await self.hub.aclose()
+
+    async def collect(self, run_id, last_id=None):
+        return [entry async for entry in self.hub.events(run_id, last_id, heartbeat=0.05) if entry is not None]
+
+    async def test_backfill_then_live_until_terminal(self):
+        await self.hub.publish("r1", {"type": "queued"})
+        watcher = asyncio.create_task(self.collect("r1"))
+        await asyncio.sleep(0.02)
+        await self.hub.publish("r1", {"type": "step", "node_id": "model"})
+        await self.hub.publish("r1", {"type": "completed"})
+        events = await asyncio.wait_for(watcher, 1)
+        self.assertEqual([e["type"] for _, e in events], ["queued", "step", "completed"])
+        self.assertEqual(self.hub.stats()["watchers"], 0)
+
+    async def test_resume_from_last_event_id(self):
+        first = await self.hub.publish("r2", {"type": "queued"})
+        await self.hub.publish("r2", {"type": "running"})
+        await self.hub.publish("r2", {"type": "failed"})
+        events = await asyncio.wait_for(self.collect("r2", first), 1)
+        self.assertEqual([e["type"] for _, e in events], ["running", "failed"])
+
+    async def test_many_watchers_share_one_reader(self):
+        watchers = [asyncio.create_task(self.collect("r3")) for _ in range(200)]
+        await asyncio.sleep(0.02)
+        self.assertEqual(self.hub.stats()["watchers"], 200)
+        await self.hub.publish("r3", {"type": "completed"})
+        results = await asyncio.wait_for(asyncio.gather(*watchers), 2)
+        self.assertTrue(all(len(events) == 1 for events in results))
+
+    async def test_slow_watcher_catches_up_from_log(self):
+        events = self.hub.events("r4", heartbeat=0.05)
+        self.assertIsNone(await events.__anext__())  # subscribed, nothing published yet
+        for i in range(10):  # more than the watcher's buffer while it isn't reading
+            await self.hub.publish("r4", {"type": "step", "n": i})
+        await self.hub.publish("r4", {"type": "completed"})
+        await asyncio.sleep(0.1)
+        received = [entry async for entry in events if entry is not None]
+        self.assertEqual([e.get("n") for _, e in received], list(range(10)) + [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,244 @@
+import asyncio
+import time
+import unittest
+from core.workflows.models import WorkflowRun
+from core.workflows.run_events import RunEventHub, event_id_key
+from core.workflows.run_store import RUN_CHANGES_CHANNEL, ChangeFeedExpired, RunChangeLog, RunStore
+
+
+def _score(value):
+    return {"+inf": float("inf"), "-inf": float("-inf")}.get(value, value)
+
+
+class FakeRedis:
+    """Just enough of the hash, sorted-set and stream commands used by RunStore."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.zsets = {}
+        self.streams = {}
+        self.last_id = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+        self.zsets.pop(key, None)
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, member):
+        self.zsets.get(key, {}).pop(member, None)
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def _sorted(self, key):
+        return sorted(self.zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+
+    def zrange(self, key, start, end):
+        items = self._sorted(key)
+        return [member for member, _ in items[start:None if end == -1 else end + 1]]
+
+    def zrangebyscore(self, key, min, max, start=0, num=None):
+        items = [m for m, s in self._sorted(key) if _score(min) <= s <= _score(max)]
+        return items[start:None if num is None else start + num]
+
+    def zrevrangebyscore(self, key, max, min, start=0, num=None, withscores=False):
+        items = [(m, s) for m, s in reversed(self._sorted(key)) if _score(min) <= s <= _score(max)]
+        items = items[start:None if num is None else start + num]
+        return items if withscores else [m for m, _ in items]
+
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        self.last_id += 1
+        stream = self.streams.setdefault(key, [])
+        stream.append((f"1-{self.last_id}", dict(fields)))
+        if maxlen is not None:
+            del stream[:-maxlen]
+        return stream[-1][0]
+
+    def xlen(self, key):
+        return len(self.streams.get(key, []))
+
+    def xrange(self, key, min="-", max="+", count=None):
+        after = event_id_key(min[1:]) if min.startswith("(") else (0, 0)
+        items = [entry for entry in self.streams.get(key, []) if event_id_key(entry[0]) > after]
+        return items[:count]
+
+    def xrevrange(self, key, max="+", min="-", count=None):
+        return list(reversed(self.streams.get(key, [])))[:count]
+
+
+class AsyncFakeRedis:
+    """Async view of a FakeRedis for RunChangeLog; XREAD waits until the stream grows."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def pipeline(self, transaction=True):
+        pipe = FakePipeline(self.conn)
+
+        async def execute():
+            return FakePipeline.execute(pipe)
+        pipe.execute = execute
+        return pipe
+
+    async def xrevrange(self, key, count=None):
+        return self.conn.xrevrange(key, count=count)
+
+    async def xrange(self, key, min="-", max="+", count=None):
+        return self.conn.xrange(key, min, max, count)
+
+    async def xread(self, streams, block=None):
+        deadline = time.monotonic() + (block or 0) / 1000
+        while True:
+            response = [(key, self.conn.xrange(key, f"({last_id}")) for key, last_id in streams.items()]
+            response = [(key, messages) for key, messages in response if messages]
+            if response or time.monotonic() >= deadline:
+                return response
+            await asyncio.sleep(0.005)
+
+
+class FakePipeline:
+    def __init__(self, conn):
+        self.conn = conn
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((getattr(self.conn, name), args, kwargs))
+        return queue
+
+    def execute(self):
+        return [method(*args, **kwargs) for method, args, kwargs in self.calls]
+
+
+class TestRunStore(unittest.TestCase):
+    def setUp(self):
+        self.store = RunStore(FakeRedis(), max_per_flow=1000, max_age_days=1)
+        self.now = time.time()
+
+    def make_run(self, i, flow_id="email", status="completed", age=0.0):
+        return WorkflowRun(id=f"run_{i:03d}", flow_id=flow_id, status=status, start_time=self.now - age - i)
+
+    def test_status_update_replaces_run(self):
+        run = self.make_run(1, status="queued")
+        self.store.save(run)
+        run.status, run.end_time, run.duration = "completed", run.start_time + 2, 2.0
+        self.store.save(run)
+        runs, _ = self.store.list_runs()
+        self.assertEqual([(r.id, r.status, r.duration) for r in runs], [("run_001", "completed", 2.0)])
+        self.assertEqual(self.store.counts()["queued"], 0)
+
+    def test_cursor_pagination_and_filters(self):
+        for i in range(25):
+            self.store.save(self.make_run(i, flow_id="email" if i % 2 else "json"))
+        seen, cursor = [], None
+        while True:
+            page, cursor = self.store.list_runs(flow_id="email", cursor=cursor, limit=5)
+            seen += [run.id for run in page]
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f"run_{i:03d}" for i in range(1, 25, 2)])
+
+        recent, _ = self.store.list_runs(since=self.now - 4.5)
+        self.assertEqual([run.id for run in recent], ["run_000", "run_001", "run_002", "run_003", "run_004"])
+
+    def test_cursor_handles_equal_start_times(self):
+        for i in range(6):
+            self.store.save(WorkflowRun(id=f"run_{i}", flow_id="json", status="completed", start_time=self.now))
+        first, cursor = self.store.list_runs(limit=4)
+        second, cursor = self.store.list_runs(cursor=cursor, limit=4)
+        self.assertEqual(sorted(r.id for r in first + second), [f"run_{i}" for i in range(6)])
+        self.assertIsNone(cursor)
+
+    def test_retention_by_count_and_age(self):
+        self.store.max_per_flow = 3
+        for i in range(5):
+            self.store.save(self.make_run(i))
+        self.assertEqual([run.id for run in self.store.list_runs()[0]], ["run_000", "run_001", "run_002"])
+
+        self.store.save(self.make_run(9, flow_id="pdf", age=2 * 24 * 3600))
+        self.assertIsNone(self.store.get("run_009"))
+        self.assertEqual(self.store.list_runs(flow_id="pdf")[0], [])
+
+    def test_change_feed_returns_each_changed_run_once(self):
+        self.store.save(self.make_run(1))
+        cursor = self.store.change_cursor()
+        run = self.make_run(2, status="queued")
+        self.store.save(run)
+        run.status = "running"
+        self.store.save(run)
+        self.store.save(self.make_run(3))
+
+        changes = self.store.changes(cursor)
+        self.assertEqual([(r.id, r.status) for r in changes["runs"]], [("run_002", "running"), ("run_003", "completed")])
+        self.assertEqual((changes["deleted"], changes["has_more"]), ([], False))
+        self.assertEqual(changes["cursor"], self.store.change_cursor())
+        self.assertEqual(self.store.changes(changes["cursor"])["runs"], [])
+
+        page = self.store.changes(cursor, limit=1)
+        self.assertTrue(page["has_more"])
+        self.assertEqual([r.id for r in self.store.changes(page["cursor"])["runs"]], ["run_002", "run_003"])
+
+    def test_change_feed_reports_deletions_and_expiry(self):
+        self.store.max_per_flow = 1
+        self.store.changes_maxlen = 5
+        self.store.save(self.make_run(1))
+        cursor = self.store.change_cursor()
+        self.store.save(self.make_run(0))
+        self.assertEqual(self.store.changes(cursor)["deleted"], ["run_001"])
+        for i in range(10):
+            self.store.save(self.make_run(0))
+        with self.assertRaises(ChangeFeedExpired):
+            self.store.changes(cursor)
+        with self.assertRaises(ValueError):
+            self.store.changes("not-a-cursor")
+
+
+class TestRunChangeLog(unittest.IsolatedAsyncioTestCase):
+    async def test_watchers_receive_current_run_state(self):
+        conn = FakeRedis()
+        store = RunStore(conn)
+        hub = RunEventHub(RunChangeLog(AsyncFakeRedis(conn)), block_ms=20)
+        log = hub.log
+        store.save(WorkflowRun(id="old", flow_id="json", status="completed", start_time=time.time()))
+        since = await log.latest()
+
+        async def collect(count):
+            received = []
+            async for entry in hub.events(RUN_CHANGES_CHANNEL, since, heartbeat=0.05):
+                if entry is not None:
+                    received.append(entry[1])
+                if len(received) == count:
+                    return received
+
+        watchers = [asyncio.create_task(collect(2)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        run = WorkflowRun(id="r1", flow_id="email", status="queued", start_time=time.time())
+        store.save(run)
+        await asyncio.sleep(0.05)
+        run.status = "completed"
+        store.save(run)
+        try:
+            results = await asyncio.wait_for(asyncio.gather(*watchers), 2)
+        finally:
+            await hub.aclose()
+        for received in results:
+            self.assertEqual([(e["type"], e["run"]["status"]) for e in received], [("run", "queued"), ("run", "completed")])
+
+
+if __name__ == '__main__':
+    unittest.main()
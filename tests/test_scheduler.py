@@ -0,0 +1,134 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest import mock
+from agents.classifier_agent.classifier import ClassifierAgent
+from agents.classifier_agent.scheduler import IntentBatchScheduler, TokenBucket
+from core.pipeline.executor import StageExecutor
+from core.text.reducer import count_tokens
+
+DOCUMENTS = [
+    "We need a quotation for 500 laptops.",
+    "I have a complaint about the late delivery.",
+    "Please pay the attached invoice by Friday.",
+    "We detected a suspicious login on your account.",
+]
+
+
+class TestIntentBatchScheduler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, {"CLASSIFIER_LLM": "stub"}):
+            self.classifier = ClassifierAgent()
+        self.classifier.intent_cache.conn = None
+        # Confidence never reaches 1, so every document goes past the rules tier to be batched
+        self.classifier.intent_scorer.threshold = 1.0
+        self.executor = StageExecutor(max_workers=4)
+
+    def make_scheduler(self, **kwargs):
+        kwargs.setdefault("rate_limiter", TokenBucket(rate=1000))
+        return IntentBatchScheduler(self.classifier, self.executor, max_wait_ms=20, **kwargs)
+
+    async def test_concurrent_requests_share_one_llm_call(self):
+        scheduler = self.make_scheduler(mode="multi")
+        labels = await asyncio.gather(*[scheduler.detect_intent(doc) for doc in DOCUMENTS])
+        await scheduler.aclose()
+        self.assertEqual(labels, ["RFQ", "Complaint", "Invoice", "Fraud Risk"])
+        self.assertEqual(self.classifier.llm.calls, 1)
+        self.assertEqual(scheduler.stats()["batches"], 1)
+
+    async def test_abatch_mode(self):
+        scheduler = self.make_scheduler(mode="abatch")
+        labels = await asyncio.gather(*[scheduler.detect_intent(doc) for doc in DOCUMENTS])
+        await scheduler.aclose()
+        self.assertEqual(labels, ["RFQ", "Complaint", "Invoice", "Fraud Risk"])
+        self.assertEqual(scheduler.stats()["batches"], 1)
+
+    async def test_duplicates_and_cache_hits_skip_the_llm(self):
+        scheduler = self.make_scheduler()
+        await asyncio.gather(*[scheduler.detect_intent(DOCUMENTS[0]) for _ in range(5)])
+        self.assertEqual(scheduler.stats()["documents"], 1)
+        await scheduler.detect_intent(DOCUMENTS[0])
+        await scheduler.aclose()
+        self.assertEqual(self.classifier.llm.calls, 1)
+
+    async def test_schema_match_never_reaches_the_llm(self):
+        scheduler = self.make_scheduler()
+        intent = await scheduler.detect_intent('{"order_id": 1, "customer": "A", "amount": 5}')
+        await scheduler.aclose()
+        self.assertEqual(intent, "Invoice")
+        self.assertEqual(self.classifier.llm.calls, 0)
+
+    async def test_max_batch_size(self):
+        scheduler = self.make_scheduler(max_batch=2)
+        await asyncio.gather(*[scheduler.detect_intent(doc) for doc in DOCUMENTS])
+        await scheduler.aclose()
+        self.assertEqual(scheduler.stats()["batches"], 2)
+
+    async def test_batches_are_sent_concurrently(self):
+        scheduler = self.make_scheduler(max_batch=1, mode="abatch")
+        in_flight, peak = 0, 0
+
+        async def slow_call(contents):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            return ["RFQ"] * len(contents)
+
+        with mock.patch.object(scheduler, "_call_llm", slow_call):
+            await asyncio.gather(*[scheduler.detect_intent(doc) for doc in DOCUMENTS])
+        await scheduler.aclose()
+        self.assertEqual(peak, len(DOCUMENTS))
+
+    async def test_aclose_cancels_waiting_requests(self):
+        scheduler = self.make_scheduler(max_batch=1, max_in_flight=1)
+
+        async def hang(contents):
+            await asyncio.Event().wait()
+
+        with mock.patch.object(scheduler, "_call_llm", hang):
+            waiters = [asyncio.create_task(scheduler.llm_intent(doc)) for doc in DOCUMENTS]
+            await asyncio.sleep(0.1)
+            await scheduler.aclose()
+            results = await asyncio.wait_for(asyncio.gather(*waiters, return_exceptions=True), 1)
+        self.assertTrue(all(isinstance(r, asyncio.CancelledError) for r in results))
+
+    async def test_long_documents_are_reduced_before_batching(self):
+        scheduler = self.make_scheduler()
+        document = "Routine delivery notes. " * 20000 + "\n\nWe need a quotation for 500 laptops."
+        with mock.patch.object(self.classifier.llm, "_respond", wraps=self.classifier.llm._respond) as respond:
+            intent = await scheduler.detect_intent(document)
+        await scheduler.aclose()
+        self.assertEqual(intent, "RFQ")
+        prompt = respond.call_args.args[0]
+        prompt = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+        self.assertLess(count_tokens(prompt), self.classifier.content_reducer.budget + 500)
+
+    async def test_decisive_rules_skip_the_llm(self):
+        self.classifier.intent_scorer.threshold = 0.7
+        scheduler = self.make_scheduler()
+        result = await scheduler.classify("a.txt", "Invoice INV-7: amount due is $1,200.")
+        await scheduler.aclose()
+        self.assertEqual(result["intent"], "Invoice")
+        self.assertEqual(result["decision"]["tier"], "rules")
+        self.assertEqual(self.classifier.llm.calls, 0)
+
+    def test_parse_batch_labels_tolerates_missing_lines(self):
+        labels = self.classifier.parse_batch_labels("1: RFQ\n3) invoice\n9: Complaint", 3)
+        self.assertEqual(labels, ["RFQ", None, "Invoice"])
+
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+    async def test_rate_is_enforced_after_burst(self):
+        bucket = TokenBucket(rate=20, capacity=2)
+        start = time.perf_counter()
+        for _ in range(4):
+            await bucket.acquire()
+        # Two tokens are available immediately, the other two take 50ms each
+        self.assertGreaterEqual(time.perf_counter() - start, 0.09)
+
+
+if __name__ == '__main__':
+    unittest.main()
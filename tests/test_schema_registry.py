@@ -0,0 +1,77 @@
+import json
+import unittest
+from core.schemas.registry import SchemaCompileError, SchemaRegistry, get_schema_registry, looks_like_json
+
+
+class TestSchemaRegistry(unittest.TestCase):
+    def test_repo_schemas_match_by_discriminator(self):
+        registry = get_schema_registry()
+        invoice = registry.analyze('{"order_id": "x1", "customer": "A", "amount": 5, "items": ["a"]}')
+        self.assertEqual((invoice.schema.name, invoice.intent), ("Invoice", "Invoice"))
+        self.assertEqual(invoice.anomalies, ["$.order_id: expected integer, got string"])
+        # Discriminators default to the required keys: an order-status payload is not an invoice
+        self.assertIsNone(registry.analyze('{"order_id": 5, "status": "shipped"}').schema)
+        self.assertIsNone(registry.analyze('{"order_id": 5, "customer": "A", "items": []}').schema)
+        rfq = registry.analyze('{"rfq_id": 7, "customer": "B", "items": []}')
+        self.assertEqual((rfq.intent, rfq.anomalies), ("RFQ", []))
+        self.assertIsNone(registry.analyze('{"name": "x"}').schema)
+        self.assertFalse(registry.analyze('{name: x}').valid_json)
+
+    def test_only_candidate_schemas_are_checked(self):
+        registry = SchemaRegistry([
+            {"name": f"Partner{i}", "discriminator": [f"partner_{i}_id"], "schema": {"type": "object"}}
+            for i in range(200)
+        ])
+        self.assertEqual([s.name for s in registry.candidates(["partner_42_id", "amount"])], ["Partner42"])
+        self.assertEqual(registry.match({"partner_42_id": 1}).name, "Partner42")
+
+    def test_most_specific_schema_wins(self):
+        registry = SchemaRegistry([
+            {"name": "Order", "discriminator": ["order_id"], "schema": {}},
+            {"name": "Return", "discriminator": ["order_id", "return_id"], "schema": {}},
+        ])
+        self.assertEqual(registry.match({"order_id": 1, "return_id": 2}).name, "Return")
+        self.assertEqual(registry.match({"order_id": 1}).name, "Order")
+
+    def test_nested_anomalies_have_json_paths(self):
+        registry = SchemaRegistry([{
+            "name": "Shipment",
+            "discriminator": ["shipment_id"],
+            "schema": {
+                "type": "object",
+                "additionalProperties": False,
+                "properties": {
+                    "shipment_id": {"type": "string", "pattern": "^SH-\\d+$"},
+                    "status": {"enum": ["open", "closed"]},
+                    "lines": {"type": "array", "maxItems": 2, "items": {
+                        "type": "object", "required": ["sku"],
+                        "properties": {"qty": {"type": "integer", "minimum": 1}, "unit price": {"type": "number"}}
+                    }}
+                }
+            }
+        }])
+        document = {"shipment_id": "X-1", "status": "lost", "carrier": "Z",
+                    "lines": [{"sku": "a", "qty": 0}, {"qty": 2.5, "unit price": "9"}, {"sku": "c"}]}
+        self.assertEqual(registry.analyze(json.dumps(document)).anomalies, [
+            "$.shipment_id: does not match ^SH-\\d+$",
+            "$.status: must be one of [\"open\", \"closed\"]",
+            "$.lines: more than 2 items",
+            "$.lines[0].qty: 0 is below minimum 1",
+            "$.lines[1].sku: missing required field",
+            "$.lines[1].qty: expected integer, got number",
+            "$.lines[1][\"unit price\"]: expected number, got string",
+            "$.carrier: unexpected field",
+        ])
+
+    def test_invalid_schema_fails_at_load(self):
+        with self.assertRaises(SchemaCompileError):
+            SchemaRegistry([{"name": "Bad", "discriminator": ["a"], "schema": {"type": "decimal"}}])
+
+    def test_looks_like_json(self):
+        self.assertTrue(looks_like_json('  \n{"a": 1}'))
+        self.assertFalse(looks_like_json("From: a@b.c"))
+        self.assertFalse(looks_like_json(""))
+
+
+if __name__ == '__main__':
+    unittest.main()
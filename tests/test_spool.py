@@ -0,0 +1,83 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from starlette.datastructures import UploadFile
+from core.pipeline.spool import SpooledDocument, spool_upload
+
+
+class TestSpoolUpload(unittest.IsolatedAsyncioTestCase):
+    async def test_small_upload_stays_in_memory(self):
+        document = await spool_upload(UploadFile(file=io.BytesIO(b"From: a"), filename="a.eml"), threshold=1024)
+        self.assertIsNone(document.path)
+        self.assertEqual(document.text(), "From: a")
+        self.assertEqual(document.digest, hashlib.sha256(b"From: a").hexdigest())
+
+    async def test_large_upload_is_spooled_and_hashed(self):
+        data = "héllo wörld\n".encode() * 5000
+        document = await spool_upload(
+            UploadFile(file=io.BytesIO(data), filename="big.eml"), threshold=1024, chunk_size=4096
+        )
+        try:
+            self.assertTrue(os.path.exists(document.path))
+            self.assertEqual(document.size, len(data))
+            self.assertEqual(document.digest, hashlib.sha256(data).hexdigest())
+            self.assertEqual(document.text(), data.decode())
+        finally:
+            document.cleanup()
+        self.assertIsNone(document.path)
+
+    async def test_same_filename_does_not_collide(self):
+        documents = await asyncio.gather(*[
+            spool_upload(UploadFile(file=io.BytesIO(bytes([i]) * 2048), filename="report.pdf"), threshold=100)
+            for i in range(2)
+        ])
+        try:
+            self.assertNotEqual(documents[0].path, documents[1].path)
+            with documents[1].view() as view:
+                self.assertEqual(view[0], 1)
+        finally:
+            for document in documents:
+                document.cleanup()
+
+    async def test_rolled_over_upload_is_used_in_place(self):
+        data = b'{"items": [1, 2, 3]}' * 1000
+        spooled = tempfile.SpooledTemporaryFile(max_size=1024)
+        spooled.write(data)
+        with tempfile.TemporaryDirectory() as directory:
+            document = await spool_upload(UploadFile(file=spooled, filename="big.json"), directory=directory)
+            self.assertEqual(os.listdir(directory), [])
+        try:
+            self.assertIsNone(document.path)
+            self.assertTrue(document.on_disk)
+            self.assertEqual((document.size, document.digest), (len(data), hashlib.sha256(data).hexdigest()))
+            self.assertEqual(document.head(10), data[:10].decode())
+            with document.open_text() as fp:
+                self.assertEqual(fp.read(), data.decode())
+            self.assertEqual(document.source.read(5), data[:5])
+        finally:
+            document.cleanup()
+        self.assertTrue(spooled._file.closed)
+
+    async def test_in_memory_spooled_upload_is_copied(self):
+        spooled = tempfile.SpooledTemporaryFile(max_size=1024)
+        spooled.write(b"From: a")
+        spooled.seek(0)
+        document = await spool_upload(UploadFile(file=spooled, filename="a.eml"), threshold=1024)
+        self.assertFalse(spooled._rolled)
+        self.assertEqual(document.data, b"From: a")
+
+    def test_from_bytes_source_is_file_object(self):
+        document = SpooledDocument.from_bytes("a.pdf", b"%PDF-")
+        self.assertEqual(document.source.read(), b"%PDF-")
+
+    def test_head_drops_cut_character(self):
+        document = SpooledDocument.from_bytes("a.json", '{"name": "Zoë"}'.encode("utf-8"))
+        self.assertEqual(document.head(13), '{"name": "Zo')
+        self.assertEqual(document.head(100), '{"name": "Zoë"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
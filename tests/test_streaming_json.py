@@ -0,0 +1,108 @@
+import io
+import json
+import unittest
+from core.schemas.registry import SchemaRegistry
+from core.schemas.streaming import StreamingJSONAnalyzer, iter_events
+
+SCHEMAS = [{
+    "name": "Manifest",
+    "discriminator": ["manifest_id"],
+    "schema": {
+        "type": "object",
+        "required": ["manifest_id", "lines"],
+        "additionalProperties": False,
+        "properties": {
+            "manifest_id": {"type": "integer"},
+            "carrier": {"type": "object", "required": ["name"]},
+            "lines": {
+                "type": "array",
+                "maxItems": 50,
+                "items": {"type": "object", "required": ["sku"], "properties": {"qty": {"type": "integer"}}}
+            },
+            "tags": {"type": "string"}
+        }
+    }
+}]
+
+
+class TestStreamingJSON(unittest.TestCase):
+    def setUp(self):
+        self.registry = SchemaRegistry(SCHEMAS)
+        # Tiny chunks so values, numbers and strings straddle chunk boundaries
+        self.streamer = StreamingJSONAnalyzer(self.registry, chunk_size=7, preview_items=2)
+
+    def analyze(self, document):
+        return self.streamer.analyze_stream(io.StringIO(json.dumps(document)))
+
+    def test_events_across_chunk_boundaries(self):
+        text = '{"id": 123456789, "name": "a long string value", "lines": [1.25, {"x": [1, 2]}, 300000], "z": null}'
+        events = list(iter_events(io.StringIO(text), chunk_size=3))
+        self.assertEqual(events, [
+            ("field", "id", 123456789),
+            ("field", "name", "a long string value"),
+            ("array_start", "lines"),
+            ("item", "lines", 0, 1.25),
+            ("item", "lines", 1, {"x": [1, 2]}),
+            ("item", "lines", 2, 300000),
+            ("array_end", "lines", 3),
+            ("field", "z", None),
+        ])
+        self.assertEqual(list(iter_events(io.StringIO("42"), chunk_size=1)), [("value", None, 42)])
+        # Numbers cut right after "." or "e" are completed from the next chunk
+        for chunk_size in range(1, 12):
+            events = list(iter_events(io.StringIO('[-1.5e-3, 2E+10, false]'), chunk_size=chunk_size))
+            self.assertEqual([e[3] for e in events if e[0] == "item"], [-1.5e-3, 2e10, False], chunk_size)
+
+    def test_syntax_error_does_not_read_the_rest_of_the_file(self):
+        stream = io.StringIO('{"lines": [{"a": 1 "b": 2}' + ', {"a": 1}' * 10000 + ']}')
+        with self.assertRaises(ValueError):
+            list(iter_events(stream, chunk_size=64))
+        self.assertLess(stream.tell(), 1024)
+
+    def test_anomalies_match_in_memory_validation(self):
+        document = {
+            "manifest_id": "M-1",
+            "carrier": {},
+            "lines": [{"sku": "a", "qty": 1}, {"qty": "two"}] + [{"sku": str(i)} for i in range(60)],
+            "extra": True,
+        }
+        streamed = self.analyze(document)
+        in_memory = self.registry.analyze(json.dumps(document))
+        self.assertEqual(streamed.schema.name, "Manifest")
+        self.assertEqual(streamed.anomalies, in_memory.anomalies)
+        self.assertIn("$.lines[1].qty: expected integer, got string", streamed.anomalies)
+
+        wrong_type = self.analyze({"manifest_id": 1, "lines": [], "tags": ["a"]})
+        self.assertEqual(wrong_type.anomalies, ["$.tags: expected string, got array"])
+
+    def test_streamed_arrays_are_summarized(self):
+        analysis = self.analyze({"manifest_id": 1, "lines": [{"sku": str(i)} for i in range(10)]})
+        self.assertEqual(analysis.anomalies, [])
+        self.assertEqual(analysis.data["lines"], {"count": 10, "preview": [{"sku": "0"}, {"sku": "1"}]})
+        top_level = self.analyze([1, 2, 3])
+        self.assertIsNone(top_level.schema)
+        self.assertEqual(top_level.data, {"count": 3, "preview": [1, 2]})
+
+    def test_validation_stops_at_anomaly_limit(self):
+        registry = SchemaRegistry(SCHEMAS, max_anomalies=3)
+        streamer = StreamingJSONAnalyzer(registry, chunk_size=64)
+        document = {"manifest_id": 1, "lines": [{"qty": i} for i in range(1000)]}
+        analysis = streamer.analyze_stream(io.StringIO(json.dumps(document)))
+        self.assertEqual(analysis.anomalies, [
+            "$.lines: more than 50 items",
+            "$.lines[0].sku: missing required field",
+            "$.lines[1].sku: missing required field",
+            "$: more anomalies not reported (limit 3)",
+        ])
+        self.assertEqual(analysis.anomalies, registry.analyze(json.dumps(document)).anomalies)
+        self.assertEqual(analysis.data["lines"]["count"], 1000)
+
+    def test_invalid_json(self):
+        for text in ('{"manifest_id": 1, "lines": [1, 2', '{"a": 1} {"b": 2}', '{"a" 1}', '[1,]', ""):
+            analysis = self.streamer.analyze_stream(io.StringIO(text))
+            self.assertFalse(analysis.valid_json, text)
+            self.assertTrue(analysis.error.startswith("Invalid JSON"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+import queue
+import tempfile
+import unittest
+from core.observability.structured_logging import (
+    DebugSampler, JsonFormatter, NonBlockingQueueHandler, setup_logging, summarize
+)
+
+
+class TestSummarize(unittest.TestCase):
+    def test_bounds_strings_bytes_and_collections(self):
+        summary = summarize({"text": "x" * 5000, "raw": b"%PDF" * 10, "items": list(range(50)),
+                             "deep": {"a": {"b": {"c": {"d": 1}}}}}, max_chars=10, max_items=4)
+        self.assertEqual(summary["text"], "xxxxxxxxxx... [5000 chars]")
+        self.assertEqual(summary["raw"], "<40 bytes>")
+        self.assertEqual(summary["items"], [0, 1, 2, 3, "... 46 more items"])
+        self.assertEqual(summary["deep"], {"a": {"b": {"c": "<dict with 1 keys>"}}})
+
+
+class TestJsonFormatter(unittest.TestCase):
+    def test_extra_fields_are_summarized(self):
+        logger = logging.getLogger("test.structured")
+        record = logger.makeRecord("test.structured", logging.INFO, __file__, 1, "Processing result", (), None,
+                                   extra={"document": "a.pdf", "result": {"text": "y" * 1000}})
+        entry = json.loads(JsonFormatter(max_chars=20).format(record))
+        self.assertEqual((entry["level"], entry["message"], entry["document"]), ("INFO", "Processing result", "a.pdf"))
+        self.assertEqual(entry["result"]["text"], "y" * 20 + "... [1000 chars]")
+        self.assertNotIn("pathname", entry)
+
+
+class TestLoggingPipeline(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = logging.getLogger()
+        self.saved = (self.root.level, list(self.root.handlers))
+
+    def tearDown(self):
+        self.root.setLevel(self.saved[0])
+        self.root.handlers = self.saved[1]
+        self.directory.cleanup()
+
+    def test_background_writer_rotates_by_size(self):
+        path = os.path.join(self.directory.name, "processing.log")
+        pipeline = setup_logging(path, level="DEBUG", max_bytes=2000, backup_count=2, debug_sample_rate=0.0)
+        logger = logging.getLogger("test.rotation")
+        for i in range(50):
+            logger.info("Processing result", extra={"n": i, "result": "z" * 5000})
+            logger.debug("Redis trace data", extra={"n": i})
+        pipeline.stop()
+        self.assertNotIn(pipeline.handler, self.root.handlers)
+
+        self.assertTrue(os.path.exists(path + ".1"))
+        self.assertFalse(os.path.exists(path + ".3"))
+        with open(path) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(entries[-1]["n"], 49)
+        self.assertTrue(all(entry["level"] == "INFO" for entry in entries))
+        self.assertEqual(pipeline.stats()["dropped"], 0)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.makeLogRecord({"msg": "hi"})
+        handler.handle(record)
+        handler.handle(record)
+        self.assertEqual(handler.stats(), {"queued": 1, "dropped": 1})
+
+    def test_debug_sampler(self):
+        sampler = DebugSampler(0.0)
+        self.assertFalse(sampler.filter(logging.makeLogRecord({"levelno": logging.DEBUG})))
+        self.assertTrue(sampler.filter(logging.makeLogRecord({"levelno": logging.WARNING})))
+
+
+if __name__ == '__main__':
+    unittest.main()
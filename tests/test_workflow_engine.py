@@ -0,0 +1,166 @@
+import asyncio
+import base64
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from core.pipeline.executor import StageExecutor
+from core.workflows import agent_steps
+from core.workflows.agent_steps import build_agent_steps
+from core.workflows.run_events import MemoryRunEventLog, RunEventHub
+from core.workflows.engine import (
+    FlowCompileError, WorkflowEngine, WorkflowQueueFull, compile_flow, load_flows
+)
+
+
+def make_definition(edges, types=None):
+    types = types or {"in": "ChatInput", "model": "GoogleGenerativeAIModel", "out": "ChatOutput"}
+    return {
+        "name": "test",
+        "data": {
+            "nodes": [{"id": node_id, "data": {"type": node_type, "node": {"template": {}}}}
+                      for node_id, node_type in types.items()],
+            "edges": [{"source": source, "target": target} for source, target in edges],
+        },
+    }
+
+
+class TestFlowCompilation(unittest.TestCase):
+    def test_repo_flows_compile_in_dependency_order(self):
+        flows = load_flows("flows")
+        self.assertEqual(sorted(flows), ["classifier", "email", "json", "pdf"])
+        for flow in flows.values():
+            self.assertEqual([s.node_type for s in flow.steps],
+                             ["ChatInput", "GoogleGenerativeAIModel", "ChatOutput"])
+        self.assertIn("email information extractor", flows["email"].steps[1].config["system_message"])
+        self.assertNotIn("api_key", flows["email"].steps[1].config)
+
+    def test_cycle_is_rejected(self):
+        with self.assertRaises(FlowCompileError):
+            compile_flow("loop", make_definition([("in", "model"), ("model", "out"), ("out", "model")]))
+
+    def test_unknown_node_type_is_rejected(self):
+        with self.assertRaises(FlowCompileError):
+            compile_flow("bad", make_definition([], types={"x": "PythonREPL"}))
+
+
+class RecordingPDFAgent:
+    def process(self, source, classification, filename=None):
+        data = open(source, "rb").read() if isinstance(source, str) else source.read()
+        return {"text": data.decode(), "filename": filename}
+
+
+class TestPDFStep(unittest.TestCase):
+    def setUp(self):
+        self.pdf = build_agent_steps(None, None, None, RecordingPDFAgent())["pdf"]
+
+    def test_base64_content(self):
+        result = self.pdf({"content_base64": base64.b64encode(b"%PDF-1.4").decode(), "filename": "a.pdf"})
+        self.assertEqual(result, {"text": "%PDF-1.4", "filename": "a.pdf"})
+        with self.assertRaises(ValueError):
+            self.pdf({"content_base64": "not base64!"})
+
+    def test_only_spooled_paths_are_opened(self):
+        with tempfile.TemporaryDirectory() as spool, tempfile.NamedTemporaryFile(suffix=".pdf") as outside:
+            inside = os.path.join(spool, "upload.pdf")
+            with open(inside, "wb") as f:
+                f.write(b"%PDF-1.4")
+            with mock.patch.object(agent_steps, "UPLOAD_SPOOL_DIR", spool):
+                self.assertEqual(self.pdf({"path": inside})["text"], "%PDF-1.4")
+                for path in (outside.name, os.path.join(spool, "..", os.path.basename(outside.name)), "/etc/passwd"):
+                    with self.assertRaises(ValueError):
+                        self.pdf({"path": path})
+
+
+class TestWorkflowEngine(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.updates = []
+        self.active = 0
+        self.peak = 0
+
+        def slow_agent(payload):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            time.sleep(0.05)
+            self.active -= 1
+            if payload.get("fail"):
+                raise ValueError("bad document")
+            return {"action": "routine", "echo": payload["content"]}
+
+        flows = {"email": compile_flow("email", make_definition([("in", "model"), ("model", "out")]))}
+        self.engine = WorkflowEngine(
+            {"email": slow_agent}, executor=StageExecutor(max_workers=8), flows=flows,
+            workers=8, queue_size=4, flow_limit=2, on_update=lambda run: self.updates.append(run)
+        )
+
+    async def asyncTearDown(self):
+        await self.engine.aclose()
+        self.engine.executor.shutdown()
+
+    async def test_execute_returns_output_step(self):
+        result = await self.engine.execute("email", {"content": "hi"})
+        self.assertEqual(result, {"action": "routine", "echo": "hi"})
+
+    async def test_runs_record_status_and_respect_flow_limit(self):
+        runs = [await self.engine.submit("email", {"content": str(i)}) for i in range(4)]
+        await self.engine.join()
+        final = {run.id: run for run in self.updates if run.status == "completed"}
+        self.assertEqual(set(final), {run.id for run in runs})
+        self.assertTrue(all(run.duration > 0 for run in final.values()))
+        self.assertLessEqual(self.peak, 2)
+        self.assertEqual([u.status for u in self.updates if u.id == runs[0].id], ["queued", "running", "completed"])
+
+    async def test_failed_run_records_error(self):
+        run = await self.engine.submit("email", {"content": "x", "fail": True})
+        await self.engine.join()
+        last = [u for u in self.updates if u.id == run.id][-1]
+        self.assertEqual((last.status, last.error), ("failed", "bad document"))
+
+    async def test_run_publishes_status_and_step_events(self):
+        log = MemoryRunEventLog()
+        self.engine.events = RunEventHub(log)
+        run = await self.engine.submit("email", {"content": "hi"})
+        await self.engine.join()
+        events = [event for _, event in await log.read_after(run.id)]
+        self.assertEqual([e["type"] for e in events], ["queued", "running", "step", "completed"])
+        self.assertEqual(events[2]["output"]["echo"], "hi")
+
+    async def test_step_events_carry_a_summary_of_the_output(self):
+        log = MemoryRunEventLog()
+        self.engine.events = RunEventHub(log)
+        run = await self.engine.submit("email", {"content": "x" * 100_000})
+        await self.engine.join()
+        step = [event for _, event in await log.read_after(run.id) if event["type"] == "step"][0]
+        self.assertLess(len(step["output"]["echo"]), 1000)
+
+    async def test_saturated_flow_does_not_starve_others(self):
+        release = threading.Event()
+        flows = {flow_id: compile_flow(flow_id, make_definition([("in", "model"), ("model", "out")]))
+                 for flow_id in ("pdf", "email")}
+        engine = WorkflowEngine(
+            {"pdf": lambda payload: release.wait(2), "email": lambda payload: {"action": "routine"}},
+            executor=self.engine.executor, flows=flows, workers=2, queue_size=10, flow_limit=1
+        )
+        for _ in range(3):
+            await engine.submit("pdf", {})
+        await engine.submit("email", {})
+        await asyncio.sleep(0.1)
+        # One worker runs the capped pdf flow, the other is free for email
+        self.assertEqual((engine.completed, engine.stats()["running"]), (1, {"pdf": 1}))
+        release.set()
+        await asyncio.wait_for(engine.join(), 2)
+        await engine.aclose()
+        self.assertEqual(engine.completed, 4)
+
+    async def test_unknown_flow_and_full_queue(self):
+        with self.assertRaises(KeyError):
+            await self.engine.submit("nope", {})
+        with self.assertRaises(WorkflowQueueFull):
+            for i in range(20):
+                await self.engine.submit("email", {"content": str(i)})
+
+
+if __name__ == '__main__':
+    unittest.main()